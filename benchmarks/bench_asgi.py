@@ -0,0 +1,101 @@
+# Copyright 2023 NoPause
+
+# Time to first byte of an HTTP client streaming llm tokens to the ASGI app (driven in process,
+# no HTTP server needed) against a local fake server, compared with the websocket TTFA of
+# Synthesis.astream and with a handler buffering the whole utterance before responding.
+#      python benchmarks/bench_asgi.py
+
+import time
+import asyncio
+import statistics
+from nopause.recording import FakeSynthesisServer
+
+from nopause.asgi import create_app
+from nopause.sdk.synthesis import Synthesis
+
+N_REQUESTS = 20
+TOKENS = ['Sure, ', 'here ', 'is ', 'the ', 'answer ', 'to ', 'your ', 'question. '] * 3
+TOKEN_DELAY = 0.01
+
+async def tokens():
+    for token in TOKENS:
+        await asyncio.sleep(TOKEN_DELAY)
+        yield token
+
+async def websocket_ttfa(synthesizer):
+    start = time.perf_counter()
+    result = await synthesizer.astream(tokens())
+    ttfa = None
+    async for _ in result:
+        if ttfa is None:
+            ttfa = time.perf_counter() - start
+    return ttfa * 1000
+
+async def http_ttfb(app, buffered=False):
+    body = tokens()
+    start = time.perf_counter()
+    first_byte = None
+    done = asyncio.Event()
+
+    body_done = False
+
+    async def receive():
+        nonlocal body_done
+        if body_done:
+            # like a server, block until the response is over
+            await done.wait()
+            return {'type': 'http.disconnect'}
+        try:
+            return {'type': 'http.request', 'body': (await body.__anext__()).encode(), 'more_body': True}
+        except StopAsyncIteration:
+            body_done = True
+            return {'type': 'http.request', 'body': b'', 'more_body': False}
+
+    async def send(message):
+        nonlocal first_byte
+        if message['type'] == 'http.response.body':
+            if first_byte is None:
+                first_byte = time.perf_counter() - start
+            if not message.get('more_body', False):
+                done.set()
+
+    if buffered:
+        # what a hand written handler does: collect the audio, then respond
+        chunks = []
+        text = []
+        while True:
+            message = await receive()
+            text.append(message['body'].decode())
+            if not message['more_body']:
+                break
+        async for chunk in await app.astream(iter_once(''.join(text))):
+            chunks.append(chunk.data)
+        await send({'type': 'http.response.body', 'body': b''.join(chunks)})
+    else:
+        await app({'type': 'http', 'method': 'POST', 'query_string': b'format=pcm', 'headers': []}, receive, send)
+    return first_byte * 1000
+
+async def iter_once(text):
+    yield text
+
+async def run():
+    synthesizer = await Synthesis().aconnect()
+    app = create_app()
+    for name, measure in [
+        ('websocket TTFA', lambda: websocket_ttfa(synthesizer)),
+        ('ASGI app TTFB', lambda: http_ttfb(app)),
+        ('buffered TTFB', lambda: http_ttfb(synthesizer, buffered=True)),
+    ]:
+        await measure() # warm up
+        times = sorted([await measure() for _ in range(N_REQUESTS)])
+        print(f'{name:<15} p50 {statistics.median(times):7.1f} ms, p95 {times[int(len(times) * 0.95) - 1]:7.1f} ms')
+    await synthesizer.aclose()
+    await app.aclose()
+
+def main():
+    with FakeSynthesisServer(rtf=0.5) as server:
+        server.configure_env()
+        asyncio.run(run())
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,77 @@
+# Copyright 2023 NoPause
+
+# Barge-in under load: every stream is cancelled after its first audio chunk while the text
+# producer (a slow LLM) is blocked, against a local fake server. Reports the cancel-to-idle
+# latency and what is left behind.
+#      python benchmarks/bench_cancel.py
+
+import time
+import asyncio
+import threading
+import statistics
+from nopause.recording import FakeSynthesisServer
+
+import nopause
+
+N_STREAMS = 200
+
+def blocked_text(release: threading.Event):
+    yield 'Sure, let me think about that for a second. '
+    release.wait() # the LLM is still thinking when the user barges in
+    yield 'This is never synthesized.'
+
+async def ablocked_text(release: asyncio.Event):
+    yield 'Sure, let me think about that for a second. '
+    await release.wait()
+    yield 'This is never synthesized.'
+
+def percentiles(latencies):
+    latencies = sorted(latencies)
+    return statistics.median(latencies) * 1000, latencies[int(len(latencies) * 0.99) - 1] * 1000
+
+def run_sync():
+    synthesizer = nopause.Synthesis().connect()
+    release = threading.Event()
+    latencies = []
+    for _ in range(N_STREAMS):
+        result = synthesizer.stream(blocked_text(release))
+        next(result)
+        result.terminate()
+        latencies.append(result.cancel_to_idle)
+        synthesizer.connect()
+    blocked_threads = sum(1 for thread in threading.enumerate() if type(thread).__name__ == 'SendTextTask')
+    release.set()
+    time.sleep(0.2)
+    left_threads = sum(1 for thread in threading.enumerate() if type(thread).__name__ == 'SendTextTask')
+    synthesizer.close()
+    return latencies, blocked_threads, left_threads
+
+async def run_async():
+    synthesizer = await nopause.Synthesis().aconnect()
+    release = asyncio.Event()
+    latencies = []
+    for _ in range(N_STREAMS):
+        result = await synthesizer.astream(ablocked_text(release))
+        await result.__anext__()
+        await result.aterminate()
+        latencies.append(result.cancel_to_idle)
+        await synthesizer.aconnect()
+    await synthesizer.aclose()
+    await asyncio.sleep(0.1)
+    pending = len([task for task in asyncio.all_tasks() if task is not asyncio.current_task()])
+    return latencies, pending
+
+def main():
+    with FakeSynthesisServer() as server:
+        server.configure_env()
+        latencies, blocked, left = run_sync()
+        p50, p99 = percentiles(latencies)
+        print(f'sync:  cancel-to-idle p50 {p50:6.2f} ms, p99 {p99:6.2f} ms; '
+              f'{blocked} senders still blocked in the producer (no socket held), {left} left once it returns')
+        latencies, pending = asyncio.run(run_async())
+        p50, p99 = percentiles(latencies)
+        print(f'async: cancel-to-idle p50 {p50:6.2f} ms, p99 {p99:6.2f} ms; {pending} tasks left')
+        print(f'{N_STREAMS} streams each, {server.sessions} connections opened in total')
+
+if __name__ == '__main__':
+    main()
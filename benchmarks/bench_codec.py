@@ -0,0 +1,45 @@
+# Copyright 2023 NoPause
+
+# Compare the JSON backends of nopause.core.codec on the frames of a session: decoding a 200 ms
+# audio response (24 kHz), encoding a text frame, and the pretty export of 1000 timestamp events.
+#      python benchmarks/bench_codec.py
+
+import json
+import base64
+import timeit
+
+from nopause.core.codec import BACKENDS, available_codecs, create_codec
+
+def per_call_us(function, repeat: int = 7) -> float:
+    timer = timeit.Timer(function)
+    number, _ = timer.autorange()
+    return min(timer.repeat(repeat=repeat, number=number)) / number * 1e6
+
+def main():
+    response = json.dumps({
+        'code': 0,
+        'status': 'ok',
+        'audio_content': base64.b64encode(b'\x10\x00' * 4800).decode(),
+        'tts_response_chunk_meta': {'chunk_id': 0, 'rtf': 0.1, 'chunk_size_us': 200000},
+        'is_end': False,
+    })
+    text_frame = {'content': {'text': 'streaming ', 'is_end': False}}
+    events = [
+        {'group': 'tts', 'event': 'chunk', 'content': '', 'start': 1000.0 + i * 0.01, 'end': None, 'elapsed': f'{i * 10:.2f} ms'}
+        for i in range(1000)
+    ]
+    available = available_codecs()
+    print(f'{"backend":<8} {"decode response":>16} {"encode text":>12} {"pretty 1k":>10}')
+    for name in BACKENDS:
+        if name not in available:
+            print(f'{name:<8} not installed')
+            continue
+        codec = create_codec(name)
+        decode_us = per_call_us(lambda: codec.decode_response(response))
+        encode_us = per_call_us(lambda: codec.dumps(text_frame))
+        pretty_ms = per_call_us(lambda: codec.dumps_pretty(events), repeat=3) / 1000
+        print(f'{name:<8} {decode_us:13.2f} us {encode_us:9.3f} us {pretty_ms:7.2f} ms')
+    print(f'selected: {available[0]}')
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,58 @@
+# Copyright 2023 NoPause
+
+# Measure the latency added by the nopause daemon relay hop against a local fake server.
+#      python benchmarks/bench_daemon.py
+
+import os
+import time
+import asyncio
+import tempfile
+from nopause.recording import FakeSynthesisServer
+
+import nopause
+from nopause.daemon import DaemonSynthesis, SynthesisDaemon
+
+ROUNDS = 200
+TEXT = ['Hello ', 'world, ', 'this is ', 'a relay ', 'benchmark.']
+
+async def text_stream():
+    for text in TEXT:
+        yield text
+
+async def measure(stream_factory):
+    ttfa, total = [], []
+    for _ in range(ROUNDS):
+        start = time.perf_counter()
+        chunks = await stream_factory()
+        first = None
+        async for _ in chunks:
+            if first is None:
+                first = time.perf_counter()
+        ttfa.append(first - start)
+        total.append(time.perf_counter() - start)
+    ttfa.sort()
+    total.sort()
+    return ttfa[ROUNDS // 2] * 1000, total[ROUNDS // 2] * 1000
+
+async def main():
+    socket_path = os.path.join(tempfile.mkdtemp(), 'nopause.sock')
+    daemon = await SynthesisDaemon(socket_path, pool_size=1).start()
+    await daemon.warmup(1)
+    try:
+        synthesizer = await nopause.Synthesis().aconnect()
+        direct = await measure(lambda: synthesizer.astream(text_stream()))
+        await synthesizer.aclose()
+
+        relayed = await measure(lambda: DaemonSynthesis.astream(text_stream(), socket_path=socket_path))
+    finally:
+        await daemon.close()
+
+    print(f'rounds: {ROUNDS} (median)')
+    print(f'direct (warm websocket): ttfa {direct[0]:6.3f} ms, total {direct[1]:6.3f} ms')
+    print(f'daemon (warm pool):      ttfa {relayed[0]:6.3f} ms, total {relayed[1]:6.3f} ms')
+    print(f'relay hop:               ttfa {relayed[0] - direct[0]:+6.3f} ms, total {relayed[1] - direct[1]:+6.3f} ms')
+
+if __name__ == '__main__':
+    with FakeSynthesisServer() as server:
+        server.configure_env()
+        asyncio.run(main())
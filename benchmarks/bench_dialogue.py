@@ -0,0 +1,63 @@
+# Copyright 2023 NoPause
+
+# Render a 3-speaker script against a local fake server (rtf 0.3): one turn after the other with
+# a Synthesis per voice, then concatenated, vs DialogueRenderer. Reports the time to the first
+# mixed audio and to the whole dialogue.
+#      python benchmarks/bench_dialogue.py
+
+import time
+import numpy as np
+from nopause.recording import FakeSynthesisServer
+
+import nopause
+from nopause.dialogue import DialogueRenderer, Turn
+
+SPEAKERS = ['host', 'guest', 'caller']
+SCRIPT = [
+    Turn(SPEAKERS[i % 3], 'This is what one speaker says in a single turn of the show. ', overlap=0.2)
+    for i in range(24)
+]
+
+def sequential():
+    synthesizers = {speaker: nopause.Synthesis(voice_id=speaker).connect() for speaker in SPEAKERS}
+    start = time.perf_counter()
+    turns = []
+    for turn in SCRIPT:
+        data = b''.join(chunk.data for chunk in synthesizers[turn.speaker].stream(iter([turn.text])))
+        turns.append(np.frombuffer(data, dtype='<i2'))
+    # the mix can only start once every turn is known
+    overlap = int(0.2 * 24000)
+    timeline = np.zeros(sum(len(samples) for samples in turns), dtype=np.int32)
+    position = 0
+    for samples in turns:
+        position = max(position - overlap, 0)
+        timeline[position:position + len(samples)] += samples
+        position += len(samples)
+    mixed = np.clip(timeline[:position], -32768, 32767).astype('<i2').tobytes()
+    elapsed = time.perf_counter() - start
+    for synthesizer in synthesizers.values():
+        synthesizer.close()
+    return elapsed, elapsed, len(mixed)
+
+def rendered():
+    renderer = DialogueRenderer().connect(SPEAKERS)
+    start = time.perf_counter()
+    first, n_bytes = None, 0
+    for chunk in renderer.render(SCRIPT):
+        if first is None:
+            first = time.perf_counter() - start
+        n_bytes += len(chunk.data)
+    elapsed = time.perf_counter() - start
+    renderer.close()
+    return first, elapsed, n_bytes
+
+def main():
+    with FakeSynthesisServer(rtf=0.3) as server:
+        server.configure_env()
+        for name, function in [('sequential', sequential), ('DialogueRenderer', rendered)]:
+            first, elapsed, n_bytes = function()
+            print(f'{name:<17} first audio {first * 1000:7.1f} ms, all {elapsed * 1000:7.1f} ms '
+                  f'({n_bytes / 48000:.1f} s of audio)')
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,59 @@
+# Copyright 2023 NoPause
+
+# Throughput of the streaming post-processing chain in audio-seconds per CPU-second.
+#      python benchmarks/bench_dsp.py
+
+import time
+import numpy as np
+from nopause.core.audio import AudioChunk
+from nopause.dsp import Chain, DCBlocker, SilenceTrimmer, LoudnessNormalizer, Fade, Limiter
+
+SAMPLE_RATE = 24000
+CHUNK_MS = 200
+AUDIO_SECONDS = 600
+
+def chunks():
+    n = SAMPLE_RATE * CHUNK_MS // 1000
+    rng = np.random.default_rng(0)
+    t = np.arange(n) / SAMPLE_RATE
+    for i in range(AUDIO_SECONDS * 1000 // CHUNK_MS):
+        samples = 0.3 * np.sin(2 * np.pi * 220 * t) * (1 + 0.5 * np.sin(i)) + 0.01 * rng.standard_normal(n) + 0.02
+        yield AudioChunk(
+            data=(samples * 32767).astype('<i2').tobytes(), chunk_id=i, sample_rate=SAMPLE_RATE,
+            channels=1, rtf=0.1, chunk_size_us=CHUNK_MS * 1000,
+        )
+
+def python_loop_gain(chunk_iter, gain=0.8):
+    # the per-sample loop this chain replaces, for reference
+    import array
+    for chunk in chunk_iter:
+        samples = array.array('h', chunk.data)
+        for i in range(len(samples)):
+            samples[i] = max(-32768, min(32767, int(samples[i] * gain)))
+        yield samples
+
+def measure(name, consume, chunk_list):
+    start = time.process_time()
+    consume(chunk_list)
+    cpu = time.process_time() - start
+    audio_seconds = len(chunk_list) * CHUNK_MS / 1000
+    print(f'{name:32s} {audio_seconds / cpu:10.0f} audio-s / cpu-s')
+
+def main():
+    chunk_list = list(chunks())
+    chains = {
+        'dc blocker': lambda: Chain(DCBlocker()),
+        'loudness normalizer': lambda: Chain(LoudnessNormalizer()),
+        'silence trimmer': lambda: Chain(SilenceTrimmer()),
+        'fade': lambda: Chain(Fade()),
+        'limiter': lambda: Chain(Limiter()),
+        'full chain': lambda: Chain(DCBlocker(), SilenceTrimmer(), LoudnessNormalizer(), Fade(), Limiter()),
+    }
+    for name, factory in chains.items():
+        measure(name, lambda chunk_list: list(factory().attach(iter(chunk_list))), chunk_list)
+    # the python loop is timed on 1/20 of the audio, the rate is of the audio it processed
+    measure('python per-sample gain loop', lambda chunk_list: list(python_loop_gain(chunk_list)),
+            chunk_list[:len(chunk_list) // 20])
+
+if __name__ == '__main__':
+    main()
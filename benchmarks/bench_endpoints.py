@@ -0,0 +1,60 @@
+# Copyright 2023 NoPause
+
+# Connect + time to first audio of new connections with three local endpoints standing in for
+# regions at different network distances (handshakes held 120, 10 and 40 ms), the distant one
+# configured first: a single api_base vs the list with probing, then the list while the near
+# endpoint goes down halfway.
+#      python benchmarks/bench_endpoints.py
+
+import time
+import statistics
+from nopause.recording import FakeSynthesisServer
+
+import nopause
+
+N_REQUESTS = 20
+
+def connect_ttfa_ms(api_base) -> float:
+    start = time.perf_counter()
+    synthesizer = nopause.Synthesis(api_base=api_base).connect()
+    result = synthesizer.stream(iter(['Hello there, how are you doing today?']))
+    next(result)
+    elapsed = (time.perf_counter() - start) * 1000
+    for _ in result:
+        pass
+    synthesizer.close()
+    return elapsed
+
+def report(name, timings):
+    timings = sorted(timings)
+    print(f'{name:<24} p50 {statistics.median(timings):7.1f} ms, p95 {timings[int(len(timings) * 0.95) - 1]:7.1f} ms')
+
+def main():
+    servers = [FakeSynthesisServer(handshake_delay=delay).start() for delay in (0.12, 0.01, 0.04)]
+    servers[0].configure_env()
+    api_bases = [server.api_base for server in servers]
+    try:
+        report('single api_base', [connect_ttfa_ms(api_bases[0]) for _ in range(N_REQUESTS)])
+
+        selector = nopause.Synthesis(api_base=api_bases).endpoints
+        selector.probe_interval = 0.5
+        selector.start()
+        time.sleep(0.5) # the first round of probes
+        report('api_base list', [connect_ttfa_ms(api_bases) for _ in range(N_REQUESTS)])
+
+        timings = []
+        for i in range(N_REQUESTS):
+            if i == N_REQUESTS // 2:
+                servers[1].stop()
+            timings.append(connect_ttfa_ms(api_bases))
+        report('list, near one down', timings)
+        print('endpoints:', ', '.join(
+            f'{stats["url"].split("/")[2]} {stats["rtt_ms"]:.0f} ms{"" if stats["healthy"] else " (down)"}' for stats in selector.stats()
+        ))
+        selector.stop()
+    finally:
+        for server in (servers[0], servers[2]):
+            server.stop()
+
+if __name__ == '__main__':
+    main()
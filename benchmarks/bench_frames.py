@@ -0,0 +1,57 @@
+# Copyright 2023 NoPause
+
+# Cut 10 minutes of 24 kHz audio, in server chunks of varying size, into 10 ms frames: the
+# usual hand-written `buffer = buffer[n:]` re-slicing vs FrameSplitter.
+#      python benchmarks/bench_frames.py
+
+import time
+import random
+from nopause.core.audio import AudioChunk, FrameSplitter
+
+SAMPLE_RATE = 24000
+FRAME_SAMPLES = 240
+
+def chunks(chunk_ms):
+    rng = random.Random(0)
+    remaining = SAMPLE_RATE * 600
+    while remaining > 0:
+        n = min(remaining, rng.randint(chunk_ms // 2, chunk_ms * 3 // 2) * SAMPLE_RATE // 1000)
+        remaining -= n
+        yield AudioChunk(data=b'\x10\x00' * n, chunk_id=0, sample_rate=SAMPLE_RATE, channels=1, rtf=0.1,
+                         chunk_size_us=n * 1000000 // SAMPLE_RATE)
+
+def by_hand(data):
+    frame_bytes = FRAME_SAMPLES * 2
+    buffer = b''
+    n_frames = 0
+    for chunk in data:
+        buffer += chunk.data
+        while len(buffer) >= frame_bytes:
+            frame, buffer = buffer[:frame_bytes], buffer[frame_bytes:]
+            n_frames += 1
+    if buffer:
+        frame = buffer + bytes(frame_bytes - len(buffer))
+        n_frames += 1
+    return n_frames
+
+def with_splitter(data):
+    splitter = FrameSplitter(SAMPLE_RATE, samples=FRAME_SAMPLES)
+    n_frames = 0
+    for chunk in data:
+        n_frames += len(splitter.push(chunk))
+    if splitter.flush() is not None:
+        n_frames += 1
+    return n_frames
+
+def main():
+    for chunk_ms in [200, 2000, 10000]:
+        data = list(chunks(chunk_ms))
+        for name, function in [('by hand', by_hand), ('FrameSplitter', with_splitter)]:
+            start = time.perf_counter()
+            n_frames = function(data)
+            elapsed = time.perf_counter() - start
+            print(f'{chunk_ms:5d} ms chunks, {name:<13} {n_frames} frames in {elapsed * 1000:7.1f} ms '
+                  f'({elapsed / n_frames * 1e6:.2f} us per frame)')
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,48 @@
+# Copyright 2023 NoPause
+
+# Time to first audio when 5% of the sessions are queued 1 s on the server, against a local
+# fake server: plain Synthesis vs HedgedSynthesis with the adaptive (p95) and a fixed delay.
+#      python benchmarks/bench_hedging.py
+
+import time
+import statistics
+from nopause.recording import FakeSynthesisServer
+
+import nopause
+
+N_REQUESTS = 300
+TEXT = ['Sure, here is the answer to your question. ']
+
+def percentiles(ttfas):
+    ttfas = sorted(ttfas)
+    return statistics.median(ttfas), ttfas[int(len(ttfas) * 0.99) - 1]
+
+def measure(synthesizer):
+    ttfas = []
+    for _ in range(N_REQUESTS):
+        start = time.perf_counter()
+        result = synthesizer.stream(iter(TEXT))
+        next(result)
+        ttfas.append((time.perf_counter() - start) * 1000)
+        for _ in result:
+            pass
+    return percentiles(ttfas)
+
+def main():
+    for name, factory in [
+        ('Synthesis', lambda: nopause.Synthesis()),
+        ('Hedged (p95)', lambda: nopause.HedgedSynthesis(initial_hedge_after=0.05)),
+        ('Hedged (50 ms)', lambda: nopause.HedgedSynthesis(hedge_after=0.05)),
+    ]:
+        with FakeSynthesisServer(first_chunk_delay=0.0, rtf=0.05, tail_probability=0.05, tail_delay=1.0) as server:
+            server.configure_env()
+            synthesizer = factory().connect()
+            p50, p99 = measure(synthesizer)
+            counters = ''
+            if isinstance(synthesizer, nopause.HedgedSynthesis):
+                counters = f', hedged {synthesizer.hedge_rate:.1%}, hedge won {synthesizer.win_rate:.1%}'
+            print(f'{name:<15} TTFA p50 {p50:7.1f} ms, p99 {p99:7.1f} ms{counters}')
+            synthesizer.close()
+
+if __name__ == '__main__':
+    main()
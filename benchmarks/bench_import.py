@@ -0,0 +1,44 @@
+# Copyright 2023 NoPause
+
+# Measure the cold start of `import nopause` with `python -X importtime`.
+#      python benchmarks/bench_import.py
+
+import re
+import sys
+import subprocess
+
+ROUNDS = 10
+
+def top_level_imports(statement: str) -> dict:
+    """The cumulative time (us) of each top-level import triggered by the statement."""
+    result = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', statement],
+        capture_output=True, text=True, check=True,
+    )
+    timings = {}
+    for line in result.stderr.splitlines():
+        match = re.match(r'import time:\s+\d+ \|\s+(\d+) \| (\S.*)$', line)
+        if match:
+            timings[match.group(2)] = int(match.group(1))
+    return timings
+
+def import_time_us(statement: str, startup: set = frozenset()) -> int:
+    """Sum of the top-level imports triggered by the statement, except the interpreter startup ones."""
+    return sum(us for name, us in top_level_imports(statement).items() if name not in startup)
+
+def median_ms(statement: str) -> float:
+    # the interpreter startup (site, encodings, ...) is noisier than what is measured
+    startup = set(top_level_imports('pass'))
+    timings = sorted(import_time_us(statement, startup) for _ in range(ROUNDS))
+    return timings[ROUNDS // 2] / 1000
+
+def main():
+    for statement in [
+        'import nopause',
+        'import nopause; nopause.Voice',
+        'import nopause; nopause.Synthesis',
+    ]:
+        print(f'{statement:40s} median: {median_ms(statement):8.2f} ms')
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,47 @@
+# Copyright 2023 NoPause
+
+# Simulate a jittery chunk arrival and compare fixed prebuffering with the adaptive jitter buffer:
+# time to first audio played and underruns.
+#      python benchmarks/bench_jitter.py
+
+import time
+import random
+from nopause.core.audio import AudioChunk
+from nopause.playback import NullSink, play
+
+SAMPLE_RATE = 24000
+CHUNK_MS = 200
+N_CHUNKS = 25
+
+def jittery_chunks(rtf: float, jitter: float, seed: int = 0):
+    rng = random.Random(seed)
+    n_samples = SAMPLE_RATE * CHUNK_MS // 1000
+    for i in range(N_CHUNKS):
+        # production time at the given rtf, plus random network/LLM stalls
+        time.sleep(CHUNK_MS / 1000 * rtf + (rng.random() * jitter if rng.random() < 0.3 else 0))
+        yield AudioChunk(data=b'\x01\x00' * n_samples, chunk_id=i, sample_rate=SAMPLE_RATE,
+                         channels=1, rtf=rtf, chunk_size_us=CHUNK_MS * 1000)
+
+class TimedNullSink(NullSink):
+    def open(self):
+        self.opened_at = time.perf_counter()
+        super().open()
+
+def run(rtf, jitter, **kwargs):
+    start = time.perf_counter()
+    sink = play(jittery_chunks(rtf, jitter), sink=TimedNullSink, **kwargs)
+    return (sink.opened_at - start) * 1000, sink.underruns
+
+def main():
+    for rtf, jitter in [(0.2, 0.0), (0.5, 0.3), (0.8, 0.4)]:
+        print(f'rtf {rtf}, stalls up to {jitter * 1000:.0f} ms:')
+        for name, kwargs in [
+            ('prebuffer 1 chunk', dict(prebuffer_chunks=1)),
+            ('prebuffer 3 chunks', dict(prebuffer_chunks=3)),
+            ('adaptive', dict()),
+        ]:
+            first_audio_ms, underruns = run(rtf, jitter, **kwargs)
+            print(f'  {name:20s} first audio {first_audio_ms:7.1f} ms, underruns {underruns}')
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,84 @@
+# Copyright 2023 NoPause
+
+# Streams whose consumer fails after the first chunk, against a local fake server: the open file
+# descriptors (both ends, the server runs in process), pending tasks and busy synthesizers left
+# behind, with bare astream() vs `async with`, and the overhead of the leak detector on complete
+# sessions.
+#      python benchmarks/bench_lifecycle.py
+
+import os
+import time
+import asyncio
+from nopause.recording import FakeSynthesisServer
+
+import nopause
+from nopause.sdk import leaks
+
+N_SESSIONS = 200
+TEXT = ['Hello there, ', 'how are you doing today?']
+
+def open_fds() -> int:
+    return len(os.listdir('/proc/self/fd'))
+
+async def texts():
+    for text in TEXT:
+        yield text
+    await asyncio.Event().wait() # an llm that stalls
+
+async def failing_consumers(use_context: bool):
+    fds = open_fds()
+    synthesizers = []
+    results = [] # a dropped result would let its pending sender task be garbage collected
+    for _ in range(N_SESSIONS):
+        synthesizer = nopause.Synthesis()
+        synthesizers.append(synthesizer)
+        try:
+            if use_context:
+                async with await synthesizer.astream(texts()) as result:
+                    await result.__anext__()
+                    raise RuntimeError('the consumer failed')
+            else:
+                result = await synthesizer.astream(texts())
+                results.append(result)
+                await result.__anext__()
+                raise RuntimeError('the consumer failed')
+        except RuntimeError:
+            pass
+    await asyncio.sleep(0.1)
+    tasks = len(asyncio.all_tasks()) - 1
+    busy = sum(synthesizer._in_use for synthesizer in synthesizers)
+    leaked_fds = open_fds() - fds
+    for result in results:
+        await result.aterminate()
+    for synthesizer in synthesizers:
+        await synthesizer.aclose()
+    return leaked_fds, tasks, busy
+
+async def complete_sessions_ms() -> float:
+    synthesizer = await nopause.Synthesis().aconnect()
+    start = time.perf_counter()
+    for _ in range(N_SESSIONS):
+        async with await synthesizer.astream(aiter_list(TEXT)) as result:
+            async for _ in result:
+                pass
+    elapsed = (time.perf_counter() - start) * 1000 / N_SESSIONS
+    await synthesizer.aclose()
+    return elapsed
+
+async def aiter_list(items):
+    for item in items:
+        yield item
+
+def main():
+    with FakeSynthesisServer() as server:
+        server.configure_env()
+        for name, use_context in [('bare astream()', False), ('async with', True)]:
+            fds, tasks, busy = asyncio.run(failing_consumers(use_context))
+            print(f'{name:<15} after {N_SESSIONS} failed consumers: {fds:4d} fds, {tasks:4d} tasks, {busy:4d} busy synthesizers')
+        plain_ms = asyncio.run(complete_sessions_ms())
+        detector = leaks.enable_leak_detection(grace=0)
+        detected_ms = asyncio.run(complete_sessions_ms())
+        print(f'session time {plain_ms:.3f} ms, with the leak detector {detected_ms:.3f} ms, leaks found: {len(detector.check())}')
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,47 @@
+# Copyright 2023 NoPause
+
+# Compare a single connection with pipelined synthesis on a long answer against a local fake
+# server that synthesizes at a fixed real time factor.
+#      python benchmarks/bench_pipeline.py
+
+import time
+import asyncio
+from nopause.recording import FakeSynthesisServer
+
+import nopause
+
+RTF = 0.2
+SENTENCE = 'This sentence is one of many in a long answer from the assistant. '
+N_SENTENCES = 60
+
+async def text_stream():
+    for word in (SENTENCE * N_SENTENCES).split(' '):
+        yield word + ' '
+
+async def consume(chunks):
+    start = time.perf_counter()
+    duration = 0.0
+    async for chunk in chunks:
+        duration += chunk.duration
+    return time.perf_counter() - start, duration
+
+async def main():
+    synthesizer = await nopause.Synthesis().aconnect()
+    single = await consume(await synthesizer.astream(text_stream()))
+    await synthesizer.aclose()
+
+    results = {}
+    for n_connections in [2, 4, 8]:
+        pipelined = await nopause.PipelinedSynthesis(n_connections=n_connections).aconnect()
+        results[n_connections] = await consume(await pipelined.astream(text_stream()))
+        await pipelined.aclose()
+
+    print(f'audio: {single[1]:.1f} s, server rtf: {RTF}')
+    print(f'single connection:    {single[0]:6.2f} s until the tail is ready')
+    for n_connections, (elapsed, duration) in results.items():
+        print(f'pipelined ({n_connections} conns):  {elapsed:6.2f} s until the tail is ready ({duration:.1f} s audio)')
+
+if __name__ == '__main__':
+    with FakeSynthesisServer(rtf=RTF) as server:
+        server.configure_env()
+        asyncio.run(main())
@@ -0,0 +1,67 @@
+# Copyright 2023 NoPause
+
+# Read the pcm of a long synthesis as a file, against a local fake server: the usual BytesIO
+# wrapper (chunks appended, then read back) vs readinto() on the result generator.
+#      python benchmarks/bench_readinto.py
+
+import io
+import time
+import tracemalloc
+from nopause.recording import FakeSynthesisServer
+
+import nopause
+
+WORDS = ['streaming '] * 3000 # ~5 minutes of audio
+BLOCK = 4096 # the reads of a typical consumer (an encoder, a pipe)
+
+def with_bytesio(synthesizer):
+    buffer = io.BytesIO()
+    total = 0
+    for chunk in synthesizer.stream(iter(WORDS)):
+        position = buffer.tell()
+        buffer.seek(0, io.SEEK_END)
+        buffer.write(chunk.data)
+        buffer.seek(position)
+        while True:
+            data = buffer.read(BLOCK)
+            total += len(data)
+            if len(data) < BLOCK:
+                buffer.seek(-len(data), io.SEEK_CUR) # wait for the rest of the block
+                total -= len(data)
+                break
+    return total + len(buffer.read())
+
+def with_readinto(synthesizer):
+    result = synthesizer.stream(iter(WORDS))
+    block = bytearray(BLOCK)
+    total = 0
+    while True:
+        n = result.readinto(block)
+        if n == 0:
+            return total
+        total += n
+
+def measure(function, synthesizer):
+    start, cpu = time.perf_counter(), time.process_time()
+    total = function(synthesizer)
+    elapsed, cpu = time.perf_counter() - start, time.process_time() - cpu
+    # the peak memory is taken on a separate run, tracing slows every allocation down
+    tracemalloc.start()
+    function(synthesizer)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return total, elapsed, cpu, peak
+
+def main():
+    with FakeSynthesisServer() as server:
+        server.configure_env()
+        synthesizer = nopause.Synthesis().connect()
+        for name, function in [('BytesIO', with_bytesio), ('readinto', with_readinto)]:
+            measure(function, synthesizer) # warm up
+            total, elapsed, cpu, peak = measure(function, synthesizer)
+            print(f'{name:<9} {total / 48000:6.1f} s of audio in {elapsed * 1000:7.1f} ms '
+                  f'({cpu * 1000:7.1f} ms cpu), peak memory {peak / 1024:8.1f} KiB')
+        synthesizer.close()
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,51 @@
+# Copyright 2023 NoPause
+
+# Run the client against a recorded session: the recorded text is sent again and the recorded
+# audio is replayed, so client-side changes are measured on real traffic without the network.
+#      python benchmarks/bench_replay.py sessions.nprec [--speed 1|2|max] [--rounds 5]
+
+import json
+import time
+import argparse
+import statistics
+
+import nopause
+from nopause.recording import ReplayServer
+from nopause.recording.recorder import SEND
+from nopause.recording.replay import load_connections
+
+def recorded_texts(frames):
+    texts = []
+    for frame in frames:
+        if frame.kind == SEND:
+            content = json.loads(frame.payload).get('content')
+            if content is not None and not content['is_end']:
+                texts.append(content['text'])
+    return texts
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('path')
+    parser.add_argument('--speed', default='max')
+    parser.add_argument('--rounds', type=int, default=5)
+    args = parser.parse_args()
+
+    connections = load_connections(args.path)
+    speed = None if args.speed == 'max' else float(args.speed)
+    ttfa, cpu = [], []
+    with ReplayServer(args.path, speed=speed) as server:
+        server.configure_env()
+        for _ in range(args.rounds):
+            for frames in connections:
+                start, start_cpu = time.perf_counter(), time.process_time()
+                result = nopause.Synthesis.stream(iter(recorded_texts(frames)))
+                for index, _ in enumerate(result):
+                    if index == 0:
+                        ttfa.append((time.perf_counter() - start) * 1000)
+                cpu.append((time.process_time() - start_cpu) * 1000)
+    print(f'{len(connections)} recorded connection(s) x {args.rounds} rounds at speed {args.speed}')
+    print(f'first audio:  median {statistics.median(ttfa):7.2f} ms')
+    print(f'client CPU:   median {statistics.median(cpu):7.2f} ms per connection (including the server thread)')
+
+if __name__ == '__main__':
+    main()
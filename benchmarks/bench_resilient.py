@@ -0,0 +1,74 @@
+# Copyright 2023 NoPause
+
+# A connection drop in the middle of a long answer: restarting the utterance from scratch
+# vs ResilientSynthesis resuming from the last acknowledged sentence, against a local fake
+# server that drops the connection once.
+#      python benchmarks/bench_resilient.py
+
+import time
+from nopause.recording import FakeSynthesisServer
+
+import nopause
+from nopause.sdk.error import InvalidRequestError
+from nopause.sdk.resilient import ResilientSynthesis
+
+RTF = 0.2
+SENTENCE = 'This sentence is one of many in a long answer from the assistant. '
+N_SENTENCES = 20
+DROP_AFTER_MS = 6000
+
+class Words:
+    """The text as words, counting the characters sent to the server."""
+    def __init__(self):
+        self.chars = 0
+
+    def __call__(self):
+        for word in (SENTENCE * N_SENTENCES).split(' '):
+            self.chars += len(word) + 1
+            yield word + ' '
+
+def restart_from_scratch():
+    words = Words()
+    delivered = 0
+    last_chunk_at = None
+    try:
+        for chunk in nopause.Synthesis.stream(words()):
+            delivered += len(chunk.data)
+            last_chunk_at = time.perf_counter()
+    except InvalidRequestError:
+        pass
+    # the caller starts over and throws away the audio that was already played
+    received = 0
+    recovered_at = None
+    for chunk in nopause.Synthesis.stream(words()):
+        received += len(chunk.data)
+        if recovered_at is None and received > delivered:
+            recovered_at = time.perf_counter()
+    return words.chars, recovered_at - last_chunk_at
+
+def resume():
+    words = Words()
+    synthesizer = ResilientSynthesis(retry_backoff=0.0)
+    previous_at = None
+    recovery = 0.0
+    reconnects = 0
+    for chunk in synthesizer.stream(words()):
+        now = time.perf_counter()
+        if synthesizer.reconnects != reconnects:
+            reconnects = synthesizer.reconnects
+            recovery = now - previous_at
+        previous_at = now
+    synthesizer.close()
+    return words.chars + synthesizer.resent_chars, recovery
+
+def main():
+    total = len(SENTENCE * N_SENTENCES)
+    for name, scenario in [('restart from scratch', restart_from_scratch), ('resilient resume', resume)]:
+        with FakeSynthesisServer(rtf=RTF, first_chunk_delay=0.1, drop_after_ms=DROP_AFTER_MS) as server:
+            server.configure_env()
+            sent, recovery = scenario()
+        print(f'{name:<22} {sent:6d} chars synthesized for {total} ({sent / total - 1:5.0%} wasted), '
+              f'{recovery * 1000:7.1f} ms from the drop to new audio')
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,65 @@
+# Copyright 2023 NoPause
+
+# Measure NoPauseResponse creation on a large voice listing.
+#      python benchmarks/bench_response.py
+
+import time
+import tracemalloc
+from nopause.core.base import NoPauseResponse
+
+N_VOICES = 10000
+ROUNDS = 20
+
+def voice_listing(n_voices: int):
+    return {
+        'voices': [
+            {
+                'voice_id': f'voice-{i}',
+                'voice_name': f'Voice {i}',
+                'language': 'en',
+                'description': 'A custom voice',
+                'gender': 'female' if i % 2 else 'male',
+                'meta': {'created_at': 1690000000 + i, 'samples': 3},
+            }
+            for i in range(n_voices)
+        ],
+        'total': n_voices,
+        'page': 1,
+        'page_size': n_voices,
+        'trace_id': 'bench',
+    }
+
+def main():
+    data = voice_listing(N_VOICES)
+
+    start = time.perf_counter()
+    for _ in range(ROUNDS):
+        response = NoPauseResponse.create(data, name='Voices')
+    create_ms = (time.perf_counter() - start) * 1000 / ROUNDS
+
+    start = time.perf_counter()
+    for _ in range(ROUNDS):
+        response = NoPauseResponse.create(data, name='Voices')
+        names = [voice.voice_name for voice in response.voices]
+    access_ms = (time.perf_counter() - start) * 1000 / ROUNDS
+
+    start = time.perf_counter()
+    for _ in range(ROUNDS):
+        NoPauseResponse.create(data, name='Voices').to_dict()
+    to_dict_ms = (time.perf_counter() - start) * 1000 / ROUNDS
+
+    tracemalloc.start()
+    response = NoPauseResponse.create(data, name='Voices')
+    names = [voice.meta.created_at for voice in response.voices]
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    print(f'voices: {N_VOICES}, rounds: {ROUNDS}')
+    print(f'create:                {create_ms:8.3f} ms')
+    print(f'create + access all:   {access_ms:8.3f} ms')
+    print(f'create + to_dict:      {to_dict_ms:8.3f} ms')
+    print(f'peak memory (access):  {peak / 1024:8.1f} KiB')
+    assert len(names) == N_VOICES
+
+if __name__ == '__main__':
+    main()
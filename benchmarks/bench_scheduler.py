@@ -0,0 +1,63 @@
+# Copyright 2023 NoPause
+
+# Interactive turns while batch jobs saturate 4 streams, against a local fake server (rtf 0.5):
+# one FIFO queue for everybody vs the interactive/batch priority classes of SynthesisScheduler,
+# without and with a stream reserved for interactive turns.
+# Reports the time to first audio of the interactive turns and the queue wait per class.
+#      python benchmarks/bench_scheduler.py
+
+import time
+import statistics
+import threading
+from nopause.recording import FakeSynthesisServer
+
+from nopause.sdk.scheduler import SynthesisScheduler
+
+N_BATCH_WORKERS = 8
+N_INTERACTIVE = 20
+BATCH_TEXT = ['A long paragraph of a document that is converted to speech in the background. '] * 2
+
+def run(priorities, interactive, batch, reserved_streams=None):
+    scheduler = SynthesisScheduler(max_streams=4, priorities=priorities, reserved_streams=reserved_streams)
+    stop = threading.Event()
+
+    def batch_worker(tenant):
+        while not stop.is_set():
+            for _ in scheduler.stream(iter(BATCH_TEXT), priority=batch, tenant=tenant):
+                pass
+
+    workers = [threading.Thread(target=batch_worker, args=(f'job-{i % 2}',)) for i in range(N_BATCH_WORKERS)]
+    for worker in workers:
+        worker.start()
+    time.sleep(0.5) # the batch jobs fill every slot
+    ttfas = []
+    for _ in range(N_INTERACTIVE):
+        start = time.perf_counter()
+        result = scheduler.stream(iter(['Sure, here is the answer. ']), priority=interactive, tenant='user')
+        next(result)
+        ttfas.append((time.perf_counter() - start) * 1000)
+        for _ in result:
+            pass
+        time.sleep(0.05)
+    stop.set()
+    for worker in workers:
+        worker.join()
+    scheduler.close()
+    ttfas.sort()
+    return statistics.median(ttfas), ttfas[int(len(ttfas) * 0.95) - 1], scheduler.wait_stats()
+
+def main():
+    with FakeSynthesisServer(rtf=0.5) as server:
+        server.configure_env()
+        for name, priorities, interactive, batch, reserved_streams in [
+            ('FIFO', ('all',), 'all', 'all', None),
+            ('priority classes', ('interactive', 'batch'), 'interactive', 'batch', None),
+            ('+ 1 reserved', ('interactive', 'batch'), 'interactive', 'batch', {'interactive': 1}),
+        ]:
+            p50, p95, stats = run(priorities, interactive, batch, reserved_streams)
+            print(f'{name:<17} interactive TTFA p50 {p50:7.1f} ms, p95 {p95:7.1f} ms')
+            for priority, wait in stats.items():
+                print(f'    {priority:<12} {wait["requests"]:4d} requests, queue wait p50 {wait["p50_ms"]:7.1f} ms, p95 {wait["p95_ms"]:7.1f} ms')
+
+if __name__ == '__main__':
+    main()
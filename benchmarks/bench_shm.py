@@ -0,0 +1,74 @@
+# Copyright 2023 NoPause
+
+# Hand 200 ms chunks to a consumer process: multiprocessing.Queue (pickled) vs the shared-memory ring.
+#      python benchmarks/bench_shm.py
+
+import time
+import multiprocessing as mp
+from nopause.core.audio import AudioChunk
+from nopause.shm import SharedAudioReader, SharedAudioWriter
+
+N_CHUNKS = 5000
+CHUNK_BYTES = 9600 # 200 ms at 24 kHz
+
+def chunks():
+    data = b'\x10\x00' * (CHUNK_BYTES // 2)
+    for i in range(N_CHUNKS):
+        yield AudioChunk(data=data, chunk_id=i, sample_rate=24000, channels=1, rtf=0.1, chunk_size_us=200000)
+
+def queue_consumer(queue, done):
+    total = 0
+    while True:
+        chunk = queue.get()
+        if chunk is None:
+            break
+        total += len(chunk.data)
+    done.put((total, time.process_time()))
+
+def shm_consumer(name, done):
+    total = 0
+    with SharedAudioReader(name) as reader:
+        for chunk in reader:
+            total += len(chunk.data)
+    done.put((total, time.process_time()))
+
+def run_queue():
+    queue, done = mp.Queue(maxsize=64), mp.Queue()
+    process = mp.Process(target=queue_consumer, args=(queue, done))
+    process.start()
+    data = list(chunks())
+    start, cpu = time.perf_counter(), time.process_time()
+    for chunk in data:
+        queue.put(chunk)
+    queue.put(None)
+    cpu = time.process_time() - cpu
+    total, consumer_cpu = done.get()
+    elapsed = time.perf_counter() - start
+    process.join()
+    return elapsed, cpu, consumer_cpu, total
+
+def run_shm():
+    writer = SharedAudioWriter(capacity=64 * CHUNK_BYTES, slots=64)
+    done = mp.Queue()
+    process = mp.Process(target=shm_consumer, args=(writer.name, done))
+    process.start()
+    data = list(chunks())
+    start, cpu = time.perf_counter(), time.process_time()
+    writer.consume(data)
+    cpu = time.process_time() - cpu
+    total, consumer_cpu = done.get()
+    elapsed = time.perf_counter() - start
+    process.join()
+    writer.close()
+    return elapsed, cpu, consumer_cpu, total
+
+def main():
+    for name, run in [('multiprocessing.Queue', run_queue), ('shared memory ring', run_shm)]:
+        elapsed, cpu, consumer_cpu, total = run()
+        assert total == N_CHUNKS * CHUNK_BYTES
+        print(f'{name:<22} {elapsed / N_CHUNKS * 1e6:6.1f} us per chunk, CPU per chunk: '
+              f'producer {cpu / N_CHUNKS * 1e6:6.1f} us, consumer {consumer_cpu / N_CHUNKS * 1e6:6.1f} us')
+    print(f'({N_CHUNKS} chunks of {CHUNK_BYTES} bytes, the consumer CPU includes its start-up)')
+
+if __name__ == '__main__':
+    main()
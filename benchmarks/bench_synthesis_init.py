@@ -0,0 +1,37 @@
+# Copyright 2023 NoPause
+
+# Measure the cost of creating many Synthesis instances (no connection is made).
+#      python benchmarks/bench_synthesis_init.py
+
+import gc
+import time
+import tracemalloc
+import nopause
+
+N_INSTANCES = 10000
+
+nopause.api_key = 'bench-api-key'
+
+def main():
+    # warm up imports and caches
+    nopause.Synthesis(voice_id='Zoe')
+
+    gc.collect()
+    start = time.perf_counter()
+    instances = [nopause.Synthesis(voice_id='Zoe') for _ in range(N_INSTANCES)]
+    elapsed = time.perf_counter() - start
+    del instances
+
+    gc.collect()
+    tracemalloc.start()
+    instances = [nopause.Synthesis(voice_id='Zoe') for _ in range(N_INSTANCES)]
+    current, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    print(f'instances: {N_INSTANCES}')
+    print(f'creation:  {elapsed * 1000:8.2f} ms total, {elapsed * 1e6 / N_INSTANCES:6.2f} us per instance')
+    print(f'memory:    {current / 1024:8.1f} KiB total, {current / N_INSTANCES:6.0f} B per instance')
+    assert len(instances) == N_INSTANCES
+
+if __name__ == '__main__':
+    main()
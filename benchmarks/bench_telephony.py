@@ -0,0 +1,51 @@
+# Copyright 2023 NoPause
+
+# CPU cost of G.711 telephony output per call-minute, lookup table vs a per-sample Python loop.
+#      python benchmarks/bench_telephony.py
+
+import time
+import numpy as np
+from nopause.core.audio import AudioChunk
+from nopause.telephony import TelephonyStream
+
+SAMPLE_RATE = 8000
+CHUNK_MS = 200
+CALL_SECONDS = 60
+
+def chunks():
+    n = SAMPLE_RATE * CHUNK_MS // 1000
+    rng = np.random.default_rng(0)
+    for i in range(CALL_SECONDS * 1000 // CHUNK_MS):
+        samples = (rng.standard_normal(n) * 3000).clip(-32768, 32767)
+        yield AudioChunk(
+            data=samples.astype('<i2').tobytes(), chunk_id=i, sample_rate=SAMPLE_RATE,
+            channels=1, rtf=0.1, chunk_size_us=CHUNK_MS * 1000,
+        )
+
+def python_loop_mulaw(chunk_iter):
+    # the per-sample encoder the lookup table replaces, for reference
+    import array
+    for chunk in chunk_iter:
+        out = bytearray()
+        for sample in array.array('h', chunk.data):
+            mask = 0x7F if sample < 0 else 0xFF
+            value = min(abs(sample >> 2), 8159) + 0x21
+            segment = next((i for i, end in enumerate((0x3F, 0x7F, 0xFF, 0x1FF, 0x3FF, 0x7FF, 0xFFF, 0x1FFF)) if value <= end), 8)
+            out.append((0x7F if segment >= 8 else (segment << 4) | ((value >> (segment + 1)) & 0xF)) ^ mask)
+        yield bytes(out)
+
+def measure(label, consume):
+    data = list(chunks())
+    start = time.process_time()
+    consume(iter(data))
+    elapsed = time.process_time() - start
+    print(f'{label:<24} {elapsed * 1000:8.1f} ms CPU per call-minute')
+    return elapsed
+
+def main():
+    table = measure('lookup table + framing', lambda it: [frame.base64() for frame in TelephonyStream(it)])
+    loop = measure('python loop', lambda it: list(python_loop_mulaw(it)))
+    print(f'speedup: {loop / table:.0f}x')
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,244 @@
+# Copyright 2023 NoPause
+
+# Hot-path benchmark suite gated against a stored baseline (lower is better for every metric).
+#      python benchmarks/suite.py                     # compare with benchmarks/baseline.json, exit 1 on regressions
+#      python benchmarks/suite.py --save-baseline     # record the baseline of this machine
+#      python benchmarks/suite.py --only parse,ttfa   # run a subset
+# Timings are machine specific: record the baseline on the machine (or dedicated CI runner) that
+# gates, shared runners are too noisy for a 25% threshold.
+
+import gc
+import io
+import os
+import sys
+import json
+import time
+import base64
+import timeit
+import argparse
+import platform
+import tempfile
+import statistics
+import contextlib
+import tracemalloc
+from types import SimpleNamespace
+
+from nopause.recording import FakeSynthesisServer
+
+BASELINE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'baseline.json')
+DEFAULT_THRESHOLD = 0.25
+
+BENCHMARKS = []
+
+def benchmark(name: str, unit: str = 'us', floor: float = 0.0):
+    """Register a benchmark, the function returns the measured value.
+    A result regresses when it exceeds both baseline * (1 + threshold) and baseline + floor."""
+    def register(function):
+        BENCHMARKS.append((name, unit, floor, function))
+        return function
+    return register
+
+def per_call_us(function, repeat: int = 7) -> float:
+    """The best time of one call over `repeat` rounds of ~0.2 s."""
+    timer = timeit.Timer(function)
+    number, _ = timer.autorange()
+    return min(timer.repeat(repeat=repeat, number=number)) / number * 1e6
+
+def audio_message(chunk_id: int = 0, n_samples: int = 4800) -> dict:
+    return {
+        'code': 0,
+        'status': 'ok',
+        'audio_content': base64.b64encode(b'\x10\x00' * n_samples).decode(),
+        'tts_response_chunk_meta': {'chunk_id': chunk_id, 'rtf': 0.1, 'chunk_size_us': n_samples * 1000000 // 24000},
+        'is_end': False,
+    }
+
+
+# -- micro benchmarks of the hot paths ---------------------------------------------------------
+
+@benchmark('parse_result')
+def bench_parse_result():
+    from nopause.sdk.synthesis import SynthesisResultGenerator
+    result = SimpleNamespace(_synthesizer=SimpleNamespace(audio_config=SimpleNamespace(sample_rate=24000)))
+    data = audio_message()
+    return per_call_us(lambda: SynthesisResultGenerator.parse_result(result, data))
+
+@benchmark('decode_response')
+def bench_decode_response():
+    # the whole receive path of a frame: decoding with the selected codec, then parse_result
+    from nopause.core.codec import get_codec
+    from nopause.sdk.synthesis import SynthesisResultGenerator
+    result = SimpleNamespace(_synthesizer=SimpleNamespace(audio_config=SimpleNamespace(sample_rate=24000)))
+    message = json.dumps(audio_message())
+    codec = get_codec()
+    return per_call_us(lambda: SynthesisResultGenerator.parse_result(result, codec.decode_response(message)))
+
+@benchmark('text_message')
+def bench_text_message():
+    from nopause.sdk.synthesis import text_message
+    return per_call_us(lambda: text_message('streaming '))
+
+@benchmark('audio_chunk')
+def bench_audio_chunk():
+    from nopause.core.audio import AudioChunk
+    data = b'\x10\x00' * 4800
+    return per_call_us(lambda: AudioChunk(data=data, chunk_id=0, sample_rate=24000, channels=1, rtf=0.1, chunk_size_us=200000))
+
+@benchmark('timestamp_add')
+def bench_timestamp_add():
+    from nopause.utils.timestamp import EventTimeStamp
+    time_stamp = EventTimeStamp()
+
+    def add():
+        time_stamp.add(group='tts', event='chunk', use_point=True)
+        if len(time_stamp.data) > 1000:
+            time_stamp.data.clear()
+    return per_call_us(add)
+
+@benchmark('timestamp_export_1k', unit='ms')
+def bench_timestamp_export():
+    from nopause.utils.timestamp import EventTimeStamp
+    time_stamp = EventTimeStamp()
+    for i in range(1000):
+        time_stamp.add(group='tts', group_index=i % 4, event='chunk', start=1000.0 + i * 0.01)
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, 'events.json')
+        with contextlib.redirect_stdout(io.StringIO()):
+            return per_call_us(lambda: time_stamp.export(path), repeat=3) / 1000
+
+@benchmark('response_create')
+def bench_response_create():
+    from nopause.core.base import NoPauseResponse
+    data = {'voice_id': 'Zoe', 'voice_name': 'Zoe', 'language': 'en', 'meta': {'samples': 3}, 'trace_id': 'bench'}
+    return per_call_us(lambda: NoPauseResponse.create(data, name='Voice').meta.samples)
+
+@benchmark('import_nopause', unit='ms', floor=0.5)
+def bench_import_nopause():
+    from bench_import import median_ms
+    return median_ms('import nopause')
+
+
+# -- end to end against the in-process fake server ---------------------------------------------
+
+_server = None
+
+def fake_server() -> FakeSynthesisServer:
+    global _server
+    if _server is None:
+        _server = FakeSynthesisServer().start().configure_env()
+    return _server
+
+def connected_synthesis():
+    import nopause
+    fake_server()
+    return nopause.Synthesis().connect()
+
+@benchmark('ttfa', unit='ms', floor=0.5)
+def bench_ttfa():
+    synthesizer = connected_synthesis()
+    timings = []
+    for _ in range(50):
+        start = time.perf_counter()
+        result = synthesizer.stream(iter(['Hello there, how are you doing today?']))
+        next(result)
+        timings.append((time.perf_counter() - start) * 1000)
+        for _ in result:
+            pass
+    synthesizer.close()
+    return statistics.median(timings)
+
+@benchmark('throughput_per_chunk')
+def bench_throughput():
+    synthesizer = connected_synthesis()
+    words = ['word '] * 4000
+    start = time.perf_counter()
+    n_chunks = sum(1 for _ in synthesizer.stream(iter(words)))
+    elapsed = time.perf_counter() - start
+    synthesizer.close()
+    return elapsed / n_chunks * 1e6
+
+@benchmark('session_memory_growth', unit='KiB', floor=64)
+def bench_session_memory():
+    synthesizer = connected_synthesis()
+    sentence = ['This is one sentence ', 'of a long session. ']
+
+    def sessions(n):
+        for _ in range(n):
+            for _ in synthesizer.stream(iter(sentence)):
+                pass
+
+    # collected before each reading: only memory that is still referenced counts as growth
+    tracemalloc.start()
+    sessions(20)
+    gc.collect()
+    before, _ = tracemalloc.get_traced_memory()
+    sessions(300)
+    gc.collect()
+    after, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    synthesizer.close()
+    return max(after - before, 0) / 1024
+
+
+# -- runner ------------------------------------------------------------------------------------
+
+def load_baseline(path: str) -> dict:
+    if not os.path.exists(path):
+        return {}
+    with open(path) as f:
+        return json.load(f)['results']
+
+def save_baseline(path: str, results: dict):
+    with open(path, 'w') as f:
+        json.dump({
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'results': results,
+        }, f, indent=2, sort_keys=True)
+        f.write('\n')
+
+def main():
+    parser = argparse.ArgumentParser(description='NoPause hot-path benchmark suite')
+    parser.add_argument('--baseline', default=BASELINE_PATH, help='the baseline file')
+    parser.add_argument('--save-baseline', action='store_true', help='store the results as the new baseline')
+    parser.add_argument('--threshold', type=float, default=DEFAULT_THRESHOLD, help='allowed relative slowdown (default: 0.25)')
+    parser.add_argument('--runs', type=int, default=3, help='runs of each benchmark, the best one counts (default: 3)')
+    parser.add_argument('--only', default=None, help='comma separated substrings of the benchmarks to run')
+    args = parser.parse_args()
+
+    selected = BENCHMARKS
+    if args.only:
+        patterns = args.only.split(',')
+        selected = [item for item in BENCHMARKS if any(pattern in item[0] for pattern in patterns)]
+
+    baseline = load_baseline(args.baseline)
+    results = {}
+    regressions = []
+    try:
+        for name, unit, floor, function in selected:
+            # the best of several runs filters out the slowdowns caused by other processes
+            value = results[name] = min(function() for _ in range(args.runs))
+            reference = baseline.get(name)
+            if reference is None:
+                status = 'new'
+            else:
+                limit = max(reference * (1 + args.threshold), reference + floor)
+                status = 'REGRESSION' if value > limit else 'ok'
+                if value > limit:
+                    regressions.append(name)
+            change = f'{(value / reference - 1) * 100:+7.1f}%' if reference else ''
+            reference_text = f'{reference:10.3f}' if reference is not None else ' ' * 10
+            print(f'{name:<24} {value:10.3f} {unit:<4} baseline {reference_text} {change:>8}  {status}', flush=True)
+    finally:
+        if _server is not None:
+            _server.stop()
+
+    if args.save_baseline:
+        save_baseline(args.baseline, {**baseline, **results})
+        print(f'baseline saved to {args.baseline}')
+    elif regressions:
+        print(f'{len(regressions)} regression(s) above {args.threshold:.0%}: {", ".join(regressions)}')
+        sys.exit(1)
+
+if __name__ == '__main__':
+    main()
@@ -1,9 +1,9 @@
 # Copyright 2023 NoPause
 
 import asyncio
-import pyaudio
 import openai
 import nopause
+from nopause.playback import PyAudioSink, play
 
 # Install sdk packages first:
 #      pip install openai nopause
@@ -57,21 +57,9 @@ async def main():
 
     audio_chunks = await nopause.Synthesis.astream(text_agenerator, voice_id="Zoe")
 
-    p = pyaudio.PyAudio()
-    stream = p.open(
-        format=pyaudio.paInt16,
-        channels=1,
-        rate=24000,
-        output=True,
-    )
-
-    async for chunk in audio_chunks:
-        stream.write(chunk.data)
-
-    await asyncio.sleep(1)
-
-    stream.close()
-    p.terminate()
+    sink = await play(audio_chunks, sink=PyAudioSink)
+    if sink is not None:
+        print('underruns: {}, overruns: {}'.format(sink.underruns, sink.overruns))
 
     print('Play done.')
 
@@ -3,7 +3,7 @@
 import asyncio
 import openai
 import nopause
-import sounddevice as sd
+from nopause.playback import SoundDeviceSink, play
 
 # Install sdk packages first:
 #      pip install openai nopause
@@ -53,16 +53,9 @@ async def main():
 
     audio_chunks = await nopause.Synthesis.astream(text_agenerator, voice_id="Zoe")
 
-    stream = sd.RawOutputStream(
-        samplerate=24000, blocksize=4800,
-        device=sd.query_devices(kind="output")['index'],
-        channels=1, dtype='int16',
-        )
-
-    with stream:
-        async for chunk in audio_chunks:
-            stream.write(chunk.data)
-        await asyncio.sleep(1)
+    sink = await play(audio_chunks, sink=SoundDeviceSink)
+    if sink is not None:
+        print('underruns: {}, overruns: {}'.format(sink.underruns, sink.overruns))
 
     print('Play done.')
 
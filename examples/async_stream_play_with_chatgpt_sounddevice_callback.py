@@ -1,10 +1,9 @@
 # Copyright 2023 NoPause
 
-import queue
 import asyncio
 import openai
 import nopause
-import sounddevice as sd
+from nopause.playback import SoundDeviceSink, play
 
 # Install sdk packages first:
 #      pip install openai nopause
@@ -55,43 +54,9 @@ async def main():
 
         audio_chunks = await nopause.Synthesis.astream(text_agenerator, voice_id="Zoe")
 
-        q = queue.Queue()
-        loop = asyncio.get_event_loop()
-        event = asyncio.Event() # For non-async, just use threading.Event
-        input_done = False
-
-        def callback(outdata, frames, time, status):
-            nonlocal input_done
-            if q.empty():
-                outdata[:] = b'\x00' * len(outdata)
-                if input_done:
-                    loop.call_soon_threadsafe(event.set)
-                return
-            chunk_data = q.get()
-            # single channel
-            outdata[:len(chunk_data)] = chunk_data
-            if len(chunk_data) < len(outdata):
-                outdata[len(chunk_data):] = b'\x00' * (len(outdata) - len(chunk_data))
-            if input_done and q.empty():
-                loop.call_soon_threadsafe(event.set)
-
-        samplerate = 24000
-        blocksize = 4800
-        stream = sd.RawOutputStream(
-            samplerate=samplerate, blocksize=blocksize,
-            device=sd.query_devices(kind="output")['index'],
-            channels=1, dtype='int16',
-            callback=callback)
-
-        with stream:
-            async for chunk in audio_chunks:
-                # Note, a block of int16 (blocksize*1 16-bit) = two blocks of bytes (blocksize*2 8-bit)
-                for i in range(0, len(chunk.data), blocksize*2):
-                    q.put_nowait(chunk.data[i:i+blocksize*2])
-            input_done = True
-
-            await event.wait()
-            await asyncio.sleep(1)
+        sink = await play(audio_chunks, sink=SoundDeviceSink)
+        if sink is not None:
+            print('underruns: {}, overruns: {}'.format(sink.underruns, sink.overruns))
 
         print('Play done.')
 
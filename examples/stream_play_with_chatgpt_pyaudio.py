@@ -1,9 +1,9 @@
 # Copyright 2023 NoPause
 
 import time
-import pyaudio
 import openai
 import nopause
+from nopause.playback import PyAudioSink, play
 
 # Install sdk packages first:
 #      pip install openai nopause
@@ -57,21 +57,9 @@ def main():
 
     audio_chunks = nopause.Synthesis.stream(text_generator, voice_id="Zoe")
 
-    p = pyaudio.PyAudio()
-    stream = p.open(
-        format=pyaudio.paInt16,
-        channels=1,
-        rate=24000,
-        output=True,
-    )
-
-    for chunk in audio_chunks:
-        stream.write(chunk.data)
-
-    time.sleep(1) # wait for playing
-
-    stream.close()
-    p.terminate()
+    sink = play(audio_chunks, sink=PyAudioSink)
+    if sink is not None:
+        print('underruns: {}, overruns: {}'.format(sink.underruns, sink.overruns))
 
     print('Play done.')
 
@@ -3,7 +3,7 @@
 import time
 import openai
 import nopause
-import sounddevice as sd
+from nopause.playback import SoundDeviceSink, play
 
 # Install sdk packages first:
 #      pip install openai nopause
@@ -53,16 +53,10 @@ def main():
 
     audio_chunks = nopause.Synthesis.stream(text_generator, voice_id="Zoe")
 
-    stream = sd.RawOutputStream(
-        samplerate=24000, blocksize=4800,
-        device=sd.query_devices(kind="output")['index'],
-        channels=1, dtype='int16',
-        )
-
-    with stream:
-        for chunk in audio_chunks:
-            stream.write(chunk.data)
-        time.sleep(1)
+    # play returns once all the audio has been played, or None without audio (see nopause/playback.py)
+    sink = play(audio_chunks, sink=SoundDeviceSink)
+    if sink is not None:
+        print('underruns: {}, overruns: {}'.format(sink.underruns, sink.overruns))
 
     print('Play done.')
 
@@ -1,28 +1,56 @@
 """ NoPause Python SDK
 """
+from typing import TYPE_CHECKING
 
-from .core import AudioChunk, TextChunk
-from .sdk import (
-    Synthesis,
-    Voice,
-    AudioConfig,
-    ModelConfig,
-    DualStreamConfig,
-    APIError,
-    InvalidRequestError,
-    NoPauseError,
-)
+from ._lazy import lazy_module
 from .version import VERSION
 
+if TYPE_CHECKING:
+    from .core import AudioChunk, TextChunk
+    from .sdk import (
+        Synthesis,
+        Voice,
+        PipelinedSynthesis,
+        ResilientSynthesis,
+        SynthesisScheduler,
+        HedgedSynthesis,
+        AudioConfig,
+        ModelConfig,
+        DualStreamConfig,
+        APIError,
+        InvalidRequestError,
+        NoPauseError,
+    )
+
 api_key = None
 api_base = 'api.nopause.io'
 api_version = 'v1'
 
 __version__ = VERSION
 
+# Public names are resolved on first access (PEP 562), so that `import nopause`
+# does not pull in websockets/requests/pydantic until they are actually used.
+_LAZY_ATTRS = {
+    "AudioChunk": ".core",
+    "TextChunk": ".core",
+    "Synthesis": ".sdk",
+    "Voice": ".sdk",
+    "PipelinedSynthesis": ".sdk",
+    "ResilientSynthesis": ".sdk",
+    "SynthesisScheduler": ".sdk",
+    "HedgedSynthesis": ".sdk",
+    "AudioConfig": ".sdk",
+    "ModelConfig": ".sdk",
+    "DualStreamConfig": ".sdk",
+    "APIError": ".sdk",
+    "InvalidRequestError": ".sdk",
+    "NoPauseError": ".sdk",
+}
+
+__getattr__, __dir__ = lazy_module(__name__, _LAZY_ATTRS)
+
 __all__ = [
     "APIError",
-    "AudioConfig",
     "AudioChunk",
     "TextChunk",
     "AudioConfig",
@@ -32,6 +60,10 @@ __all__ = [
     "NoPauseError",
     "Synthesis",
     "Voice",
+    "PipelinedSynthesis",
+    "ResilientSynthesis",
+    "SynthesisScheduler",
+    "HedgedSynthesis",
     "api_base",
     "api_key",
     "api_version",
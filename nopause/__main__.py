@@ -0,0 +1,7 @@
+""" python -m nopause, the same as the nopause command.
+"""
+import sys
+
+from nopause.cli import main
+
+sys.exit(main())
@@ -0,0 +1,34 @@
+""" Public names of a package resolved on first access (PEP 562).
+
+A package imports its submodules only when one of their names is used:
+
+    _LAZY_ATTRS = {"Synthesis": ".synthesis"}
+    __getattr__, __dir__ = lazy_module(__name__, _LAZY_ATTRS)
+"""
+import sys
+import importlib
+from typing import Callable, Dict, List, Tuple
+
+
+def lazy_module(name: str, attrs: Dict[str, str]) -> Tuple[Callable[[str], object], Callable[[], List[str]]]:
+    """
+    Create the module-level __getattr__ and __dir__ of a package.
+    Args:
+        name: The name of the package (its __name__).
+        attrs: The module each lazy name is imported from, relative to the package.
+    Returns:
+        The __getattr__ and __dir__ functions, to be assigned in the package namespace.
+    """
+    def __getattr__(attr: str):
+        module_name = attrs.get(attr)
+        if module_name is None:
+            raise AttributeError(f"module {name!r} has no attribute {attr!r}")
+        value = getattr(importlib.import_module(module_name, name), attr)
+        # the next access does not go through __getattr__
+        setattr(sys.modules[name], attr, value)
+        return value
+
+    def __dir__() -> List[str]:
+        return sorted(set(vars(sys.modules[name])) | set(attrs))
+
+    return __getattr__, __dir__
@@ -0,0 +1,258 @@
+""" Serve synthesis over HTTP from any ASGI server or framework, without extra dependencies.
+
+    # uvicorn
+    app = nopause.asgi.create_app(voice_id='Zoe')
+    # FastAPI / Starlette
+    api.mount('/tts', nopause.asgi.create_app(voice_id='Zoe'))
+
+A POST request carries the text as its body, which may itself be streamed (e.g. the tokens of
+an LLM relayed as they come), or as JSON {"text": ...}. The audio is streamed back as chunked
+audio/wav (default) or raw 16-bit little-endian pcm as soon as it arrives, from pooled warm
+connections. The response starts with the first audio chunk, so that a failed synthesis still
+gets an error status, and a client disconnecting terminates the synthesis upstream.
+
+Query parameters (or JSON fields): voice_id, format (wav or pcm), sample_rate.
+"""
+import codecs
+import asyncio
+from typing import AsyncIterator, Dict, List, Optional, Set, Tuple
+from urllib.parse import parse_qs
+
+from nopause.core.audio import wav_header
+from nopause.core.codec import get_codec
+from nopause.sdk.config import AudioConfig, DEFAULT_VOICE_ID
+from nopause.sdk.error import APIError
+from nopause.sdk.synthesis import DEFAULT_AUDIO_CONFIG, Synthesis
+
+WAV = 'wav'
+PCM = 'pcm'
+
+
+class _Request:
+    """ The body of a request as a text iterator, and whether the client went away.
+    """
+    def __init__(self, receive):
+        self.receive = receive
+        self.texts: asyncio.Queue = asyncio.Queue()
+        self.disconnected = asyncio.Event()
+        self.body_done = False
+        self.decoder = codecs.getincrementaldecoder('utf-8')(errors='replace')
+
+    async def read_body(self) -> bytes:
+        body = b''
+        while True:
+            message = await self.receive()
+            if message['type'] == 'http.disconnect':
+                self.disconnected.set()
+                return body
+            body += message.get('body', b'')
+            if not message.get('more_body', False):
+                self.body_done = True
+                return body
+
+    async def pump(self):
+        """Feed the streamed body to `texts`, then wait for the disconnect of the client."""
+        while True:
+            message = await self.receive()
+            if message['type'] == 'http.disconnect':
+                # the text is left unfinished, the synthesis is terminated rather than completed
+                self.disconnected.set()
+                return
+            if self.body_done:
+                continue
+            more_body = message.get('more_body', False)
+            text = self.decoder.decode(message.get('body', b''), final=not more_body)
+            if text:
+                self.texts.put_nowait(text)
+            if not more_body:
+                self.body_done = True
+                self.texts.put_nowait(None)
+
+    async def text_iter(self) -> AsyncIterator[str]:
+        while True:
+            text = await self.texts.get()
+            if text is None:
+                return
+            yield text
+
+
+class SynthesisApp:
+    """ An ASGI application streaming synthesized audio, see the module documentation.
+    """
+    def __init__(self, default_format: str = WAV, max_idle_connections: int = 8, **kwargs):
+        """
+        Args:
+            default_format: The format of the responses without a `format` parameter, wav or pcm.
+            max_idle_connections: The warm connections kept per (voice, sample rate) between requests.
+            **kwargs: The configurations of Synthesis (voice_id, audio_config, api_key, ...).
+        """
+        self.default_format = default_format
+        self.max_idle_connections = max_idle_connections
+        self.kwargs = kwargs
+        self.default_voice_id = kwargs.pop('voice_id', DEFAULT_VOICE_ID)
+        self.default_sample_rate = (kwargs.pop('audio_config', None) or DEFAULT_AUDIO_CONFIG).sample_rate
+        self._idle: Dict[Tuple[str, int], List[Synthesis]] = {}
+        # the closes of the connections not kept, referenced until they are done
+        self._closing: Set[asyncio.Task] = set()
+
+    async def _acquire(self, voice_id: str, sample_rate: int) -> Synthesis:
+        idle = self._idle.get((voice_id, sample_rate))
+        if idle:
+            return idle.pop()
+        return Synthesis(voice_id=voice_id, audio_config=AudioConfig(sample_rate=sample_rate), **self.kwargs)
+
+    def _release(self, synthesizer: Synthesis, reusable: bool):
+        idle = self._idle.setdefault((synthesizer.voice_id, synthesizer.audio_config.sample_rate), [])
+        if reusable and len(idle) < self.max_idle_connections:
+            idle.append(synthesizer)
+        else:
+            task = asyncio.ensure_future(synthesizer.aclose())
+            self._closing.add(task)
+            task.add_done_callback(self._closed)
+
+    def _closed(self, task: asyncio.Task):
+        self._closing.discard(task)
+        if not task.cancelled():
+            task.exception() # a connection that fails to close cleanly is dropped anyway
+
+    async def aclose(self):
+        """Close the pooled connections, and wait for the connections being closed."""
+        idle, self._idle = self._idle, {}
+        for synthesizers in idle.values():
+            for synthesizer in synthesizers:
+                await synthesizer.aclose()
+        if self._closing:
+            await asyncio.wait(set(self._closing))
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] == 'lifespan':
+            return await self._lifespan(receive, send)
+        if scope['type'] != 'http':
+            raise ValueError(f"nopause.asgi does not serve {scope['type']} requests.")
+        if scope['method'] != 'POST':
+            return await self._respond(send, 405, 'Use POST with the text as the body.', [(b'allow', b'POST')])
+        await self._synthesize(scope, receive, send)
+
+    async def _lifespan(self, receive, send):
+        while True:
+            message = await receive()
+            if message['type'] == 'lifespan.startup':
+                await send({'type': 'lifespan.startup.complete'})
+            elif message['type'] == 'lifespan.shutdown':
+                await self.aclose()
+                await send({'type': 'lifespan.shutdown.complete'})
+                return
+
+    @staticmethod
+    async def _respond(send, status: int, text: str, headers: list = ()):
+        body = text.encode()
+        await send({'type': 'http.response.start', 'status': status, 'headers': [
+            (b'content-type', b'text/plain; charset=utf-8'), (b'content-length', str(len(body)).encode()), *headers,
+        ]})
+        await send({'type': 'http.response.body', 'body': body})
+
+    def _options(self, scope, fields: Optional[dict]) -> Tuple[str, str, int]:
+        params = {key: values[-1] for key, values in parse_qs(scope.get('query_string', b'').decode()).items()}
+        if fields:
+            params.update({key: str(value) for key, value in fields.items() if key != 'text'})
+        audio_format = params.get('format', self.default_format)
+        if audio_format not in (WAV, PCM):
+            raise ValueError(f'Unknown format {audio_format!r}, use wav or pcm.')
+        sample_rate = int(params.get('sample_rate', self.default_sample_rate))
+        AudioConfig(sample_rate=sample_rate) # validated before anything is sent upstream
+        return params.get('voice_id', self.default_voice_id), audio_format, sample_rate
+
+    def _headers(self, audio_format: str, sample_rate: int) -> list:
+        if audio_format == WAV:
+            return [(b'content-type', b'audio/wav')]
+        return [
+            (b'content-type', b'application/octet-stream'),
+            (b'x-sample-rate', str(sample_rate).encode()),
+            (b'x-sample-format', b's16le'),
+            (b'x-channels', b'1'),
+        ]
+
+    async def _synthesize(self, scope, receive, send):
+        request = _Request(receive)
+        headers = {key.decode().lower(): value.decode() for key, value in scope.get('headers', [])}
+        fields = None
+        try:
+            if headers.get('content-type', '').startswith('application/json'):
+                fields = get_codec().loads(await request.read_body())
+                request.texts.put_nowait(str(fields.get('text', '')))
+                request.texts.put_nowait(None)
+            voice_id, audio_format, sample_rate = self._options(scope, fields)
+        except Exception as e:
+            return await self._respond(send, 400, f'Bad request: {e}')
+
+        # one task reads the body and then watches for the disconnect, for the whole response
+        pump = asyncio.ensure_future(request.pump())
+
+        async def emit(message: dict):
+            try:
+                await send(message)
+            except OSError:
+                # some servers raise instead of sending http.disconnect
+                request.disconnected.set()
+                raise
+
+        synthesizer = await self._acquire(voice_id, sample_rate)
+        result = None
+        started = False
+        watcher = None
+        try:
+            result = await synthesizer.astream(request.text_iter())
+
+            async def watch():
+                await request.disconnected.wait()
+                if not result.terminated:
+                    await result.aterminate()
+
+            watcher = asyncio.ensure_future(watch())
+            async for chunk in result:
+                if not started:
+                    started = True
+                    await self._start(emit, audio_format, sample_rate)
+                await emit({'type': 'http.response.body', 'body': chunk.data, 'more_body': True})
+        except (APIError, OSError) as e:
+            if request.disconnected.is_set():
+                return # the synthesis was terminated because of the client
+            if not started:
+                return await self._respond(send, 502, f'Synthesis failed: {e}')
+            # the status is already sent, the truncated body tells the client
+            return await send({'type': 'http.response.body', 'body': b'', 'more_body': False})
+        finally:
+            pump.cancel()
+            if watcher is not None:
+                if request.disconnected.is_set():
+                    await watcher # let the termination finish
+                else:
+                    watcher.cancel()
+            # only a connection whose session completed is clean for the next request
+            reusable = result is not None and result.is_end and not result.terminated
+            if result is not None and not reusable and not result.terminated:
+                await result.aterminate()
+            self._release(synthesizer, reusable)
+        if request.disconnected.is_set():
+            return
+        if not started:
+            await self._start(emit, audio_format, sample_rate, n_bytes=0)
+        await emit({'type': 'http.response.body', 'body': b'', 'more_body': False})
+
+    async def _start(self, emit, audio_format: str, sample_rate: int, n_bytes: int = None):
+        await emit({'type': 'http.response.start', 'status': 200, 'headers': self._headers(audio_format, sample_rate)})
+        if audio_format == WAV:
+            # the sizes are unknown while streaming, players read a wav like this up to its end
+            await emit({'type': 'http.response.body', 'body': wav_header(sample_rate, n_bytes=n_bytes), 'more_body': True})
+
+def create_app(default_format: str = WAV, max_idle_connections: int = 8, **kwargs) -> SynthesisApp:
+    """
+    Create the ASGI application.
+    Args:
+        default_format: The format of the responses without a `format` parameter, wav or pcm.
+        max_idle_connections: The warm connections kept per (voice, sample rate) between requests.
+        **kwargs: The configurations of Synthesis (voice_id, audio_config, api_key, ...).
+    Returns:
+        An ASGI application, to run with an ASGI server or to mount in a framework.
+    """
+    return SynthesisApp(default_format=default_format, max_idle_connections=max_idle_connections, **kwargs)
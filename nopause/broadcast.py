@@ -0,0 +1,251 @@
+""" Fan out one synthesis stream to several consumers without copying chunk data.
+
+The source generator is pumped once into a shared window of AudioChunk objects, and
+every subscriber reads the same objects through its own cursor:
+
+    broadcast = Broadcast(nopause.Synthesis.stream(text_iterator))
+    speaker = broadcast.subscribe()                      # block the stream if it lags
+    recorder = broadcast.subscribe(policy='drop')        # skip chunks if it lags
+    relay = broadcast.subscribe(policy='disconnect')     # raise SlowConsumerError if it lags
+    broadcast.start()
+    # iterate each subscription in its own thread (or task, for async result generators)
+"""
+import asyncio
+import threading
+from collections import deque
+from typing import AsyncIterable, Iterable, List, Union
+
+from nopause.core.audio import AudioChunk
+from nopause.sdk.error import NoPauseError, SlowConsumerError
+
+BLOCK = 'block'
+DROP = 'drop'
+DISCONNECT = 'disconnect'
+
+
+class Subscription:
+    """ A cursor over the chunks of a Broadcast, iterated like the source (sync or async).
+    """
+    def __init__(self, broadcast: 'Broadcast', cursor: int, policy: str, max_lag: int):
+        self.broadcast = broadcast
+        self.cursor = cursor
+        self.policy = policy
+        self.max_lag = max_lag
+        self.dropped = 0
+        self.disconnected = False
+        self.closed = False
+
+    def _take(self):
+        """Return the next chunk, or None when nothing is available yet (lock held by the caller)."""
+        if self.disconnected:
+            raise SlowConsumerError(f'The subscriber lagged more than {self.max_lag} chunks behind and was disconnected.')
+        if self.closed:
+            # its chunks may have been trimmed from the window already
+            raise StopIteration
+        broadcast = self.broadcast
+        if self.cursor < broadcast.head:
+            chunk = broadcast.chunks[self.cursor - broadcast.base]
+            self.cursor += 1
+            broadcast._trim()
+            return chunk
+        if broadcast.done:
+            if broadcast.error is not None:
+                raise broadcast.error
+            raise StopIteration
+        return None
+
+    def __next__(self) -> AudioChunk:
+        condition = self.broadcast.condition
+        with condition:
+            while True:
+                chunk = self._take()
+                if chunk is not None:
+                    condition.notify_all()
+                    return chunk
+                condition.wait()
+
+    async def __anext__(self) -> AudioChunk:
+        condition = self.broadcast.condition
+        async with condition:
+            while True:
+                try:
+                    chunk = self._take()
+                except StopIteration:
+                    raise StopAsyncIteration
+                if chunk is not None:
+                    condition.notify_all()
+                    return chunk
+                await condition.wait()
+
+    def __iter__(self):
+        return self
+
+    def __aiter__(self):
+        return self
+
+    def close(self):
+        """Unsubscribe (sync broadcast)."""
+        with self.broadcast.condition:
+            self.broadcast._remove(self)
+            self.broadcast.condition.notify_all()
+
+    async def aclose(self):
+        """Unsubscribe (async broadcast)."""
+        async with self.broadcast.condition:
+            self.broadcast._remove(self)
+            self.broadcast.condition.notify_all()
+
+
+class Broadcast:
+    """ Share one result generator among several subscribers, each with its own cursor and lag policy.
+
+    Only the window between the slowest subscriber and the head is kept, and the chunks
+    are handed out as the same objects to everyone (no per-subscriber copy).
+    """
+    def __init__(self, result_generator: Union[Iterable[AudioChunk], AsyncIterable[AudioChunk]], max_lag: int = 64):
+        """
+        Args:
+            result_generator: A sync or async result generator (e.g. from Synthesis.stream/astream).
+            max_lag: The default number of chunks a subscriber may lag behind the head.
+        """
+        self.source = result_generator
+        self.use_async = hasattr(result_generator, '__anext__')
+        self.max_lag = max_lag
+        self.chunks = deque()
+        self.base = 0 # sequence number of chunks[0]
+        self.head = 0 # sequence number of the next chunk
+        self.subscribers: List[Subscription] = []
+        self.done = False
+        self.error = None
+        self._condition = None if self.use_async else threading.Condition()
+        self._pump = None
+
+    @property
+    def condition(self):
+        if self._condition is None:
+            # created lazily so that it binds to the running loop
+            self._condition = asyncio.Condition()
+        return self._condition
+
+    def subscribe(self, policy: str = BLOCK, max_lag: int = None) -> Subscription:
+        """
+        Add a subscriber reading from the current head.
+        Args:
+            policy: What happens when the subscriber lags `max_lag` chunks behind:
+                'block' holds the stream back, 'drop' skips its oldest chunks,
+                'disconnect' ends it with SlowConsumerError.
+            max_lag: The lag limit in chunks, at least 1 (default: the broadcast max_lag).
+        """
+        if policy not in (BLOCK, DROP, DISCONNECT):
+            raise NoPauseError(f'Unknown lag policy: {policy}')
+        if max_lag is None:
+            max_lag = self.max_lag
+        if max_lag < 1:
+            raise NoPauseError(f'The lag limit must be at least 1 chunk, got {max_lag}.')
+        subscription = Subscription(self, self.head, policy, max_lag)
+        self.subscribers.append(subscription)
+        return subscription
+
+    def _remove(self, subscription: Subscription):
+        subscription.closed = True
+        if subscription in self.subscribers:
+            self.subscribers.remove(subscription)
+        self._trim()
+
+    def _trim(self):
+        oldest = min((subscription.cursor for subscription in self.subscribers), default=self.head)
+        while self.base < oldest:
+            self.chunks.popleft()
+            self.base += 1
+
+    def _blocked(self) -> bool:
+        """Apply the lag policies before publishing, return whether the pump has to wait."""
+        blocked = False
+        for subscription in list(self.subscribers):
+            if self.head - subscription.cursor < subscription.max_lag:
+                continue
+            if subscription.policy == BLOCK:
+                blocked = True
+            elif subscription.policy == DROP:
+                target = self.head - subscription.max_lag + 1
+                subscription.dropped += target - subscription.cursor
+                subscription.cursor = target
+            else:
+                subscription.disconnected = True
+                self.subscribers.remove(subscription)
+        self._trim()
+        return blocked
+
+    def _publish(self, chunk: AudioChunk):
+        self.chunks.append(chunk)
+        self.head += 1
+
+    def _finish(self, error: Exception = None):
+        if not self.done:
+            # a terminated broadcast ends without the error its source may raise afterwards
+            self.done = True
+            self.error = error
+
+    def run(self):
+        """Pump the source into the subscribers (sync), returns at the end of the stream."""
+        condition = self.condition
+        try:
+            for chunk in self.source:
+                with condition:
+                    # terminate() ends the broadcast while the pump waits for a blocking subscriber
+                    while not self.done and self._blocked():
+                        condition.wait()
+                    if self.done:
+                        break
+                    self._publish(chunk)
+                    condition.notify_all()
+            error = None
+        except Exception as e:
+            error = e
+        with condition:
+            self._finish(error)
+            condition.notify_all()
+
+    async def arun(self):
+        """Pump the source into the subscribers (async), returns at the end of the stream."""
+        condition = self.condition
+        try:
+            async for chunk in self.source:
+                async with condition:
+                    while not self.done and self._blocked():
+                        await condition.wait()
+                    if self.done:
+                        break
+                    self._publish(chunk)
+                    condition.notify_all()
+            error = None
+        except Exception as e:
+            error = e
+        async with condition:
+            self._finish(error)
+            condition.notify_all()
+
+    def start(self):
+        """Run the pump in a daemon thread (sync) or a task (async)."""
+        if self.use_async:
+            self._pump = asyncio.ensure_future(self.arun())
+        else:
+            self._pump = threading.Thread(target=self.run, daemon=True)
+            self._pump.start()
+        return self
+
+    def terminate(self):
+        assert not self.use_async
+        if hasattr(self.source, 'terminate'):
+            self.source.terminate()
+        with self.condition:
+            self._finish()
+            self.condition.notify_all()
+
+    async def aterminate(self):
+        assert self.use_async
+        if hasattr(self.source, 'aterminate'):
+            await self.source.aterminate()
+        async with self.condition:
+            self._finish()
+            self.condition.notify_all()
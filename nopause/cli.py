@@ -0,0 +1,143 @@
+""" The nopause command line: synthesize the text of stdin to stdout.
+
+    llm-client | nopause say --voice Zoe --rate 16000 | aplay -f S16_LE -r 16000 -c 1
+    echo "Hello there." | nopause say --format wav | ffmpeg -i - hello.mp3
+
+The text is fed to the synthesis as soon as it arrives on stdin, and each audio chunk is
+written to stdout as soon as it is received, without buffering on either side.
+"""
+import os
+import sys
+import time
+import codecs
+import argparse
+from typing import Iterator, Optional
+
+from nopause.core.audio import wav_header
+from nopause.sdk.config import DEFAULT_LANGUAGE, DEFAULT_MODEL_NAME, DEFAULT_VOICE_ID, AudioConfig
+from nopause.sdk.synthesis import Synthesis
+
+# stdin is read in whatever pieces the writer flushes, up to this many bytes at a time
+READ_SIZE = 4096
+
+
+class SayStats:
+    """ The timings of one `nopause say`, printed on stderr with --stats.
+    """
+    def __init__(self):
+        self.first_text: Optional[float] = None
+        self.end_of_text: Optional[float] = None
+        self.first_audio: Optional[float] = None
+        self.end: Optional[float] = None
+        self.chars = 0
+        self.chunks = 0
+        self.audio_bytes = 0
+
+    def report(self, sample_rate: int, channels: int = 1) -> str:
+        audio_seconds = self.audio_bytes / 2 / channels / sample_rate
+        lines = [f'text: {self.chars} chars, audio: {self.chunks} chunks, {audio_seconds:.2f} s']
+        if self.first_text is not None and self.first_audio is not None:
+            lines.append(f'first text -> first audio: {(self.first_audio - self.first_text) * 1000:.1f} ms')
+        if self.end_of_text is not None and self.end is not None:
+            lines.append(f'end of text -> end of audio: {(self.end - self.end_of_text) * 1000:.1f} ms')
+        if self.first_text is not None and self.end is not None and audio_seconds > 0:
+            elapsed = self.end - self.first_text
+            lines.append(f'total: {elapsed:.2f} s, {audio_seconds / elapsed:.1f}x realtime')
+        return '\n'.join(lines)
+
+
+def read_text(fd: int, stats: SayStats, read_size: int = READ_SIZE) -> Iterator[str]:
+    """Yield the text of a file descriptor as soon as it is readable, across split utf-8 characters."""
+    decoder = codecs.getincrementaldecoder('utf-8')(errors='replace')
+    while True:
+        data = os.read(fd, read_size)
+        text = decoder.decode(data, final=not data)
+        if text:
+            if stats.first_text is None:
+                stats.first_text = time.perf_counter()
+            stats.chars += len(text)
+            yield text
+        if not data:
+            stats.end_of_text = time.perf_counter()
+            return
+
+
+def write_all(fd: int, data: bytes):
+    view = memoryview(data)
+    while view:
+        view = view[os.write(fd, view):]
+
+
+def say(args, stdin_fd: int = 0, stdout_fd: int = 1) -> SayStats:
+    stats = SayStats()
+    synthesizer = Synthesis(
+        voice_id=args.voice,
+        model_name=args.model,
+        language=args.language,
+        audio_config=AudioConfig(sample_rate=args.rate),
+        api_key=args.api_key,
+        api_base=args.api_base,
+        api_version=args.api_version,
+    )
+    # connect before the first text arrives, so that it does not count in the latency
+    synthesizer.connect()
+    if args.format == 'wav':
+        write_all(stdout_fd, wav_header(args.rate))
+    result = synthesizer.stream(read_text(stdin_fd, stats))
+    try:
+        for chunk in result:
+            if stats.first_audio is None:
+                stats.first_audio = time.perf_counter()
+            write_all(stdout_fd, chunk.data)
+            stats.chunks += 1
+            stats.audio_bytes += len(chunk.data)
+    finally:
+        if not result.terminated:
+            result.terminate()
+        synthesizer.close()
+    stats.end = time.perf_counter()
+
+    if args.format == 'wav':
+        # a file gets the real sizes, a pipe keeps the "unknown length" header
+        try:
+            os.lseek(stdout_fd, 0, os.SEEK_SET)
+            write_all(stdout_fd, wav_header(args.rate, n_bytes=stats.audio_bytes))
+            os.lseek(stdout_fd, 0, os.SEEK_END)
+        except OSError:
+            pass
+    return stats
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog='nopause', description='NoPause text-to-speech from the command line.')
+    commands = parser.add_subparsers(dest='command', required=True)
+    say_parser = commands.add_parser('say', help='synthesize the text of stdin, write the audio to stdout')
+    say_parser.add_argument('--voice', default=DEFAULT_VOICE_ID, help=f'the voice id (default: {DEFAULT_VOICE_ID})')
+    say_parser.add_argument('--rate', type=int, default=24000, help='sample rate in Hz, 8000 to 24000 (default: 24000)')
+    say_parser.add_argument('--format', choices=['pcm', 'wav'], default='pcm',
+                            help='raw 16-bit little-endian mono pcm, or wav with a streaming header (default: pcm)')
+    say_parser.add_argument('--stats', action='store_true', help='print the latency and realtime factor on stderr')
+    say_parser.add_argument('--model', default=DEFAULT_MODEL_NAME)
+    say_parser.add_argument('--language', default=DEFAULT_LANGUAGE)
+    say_parser.add_argument('--api-key', default=None)
+    say_parser.add_argument('--api-base', default=None)
+    say_parser.add_argument('--api-version', default=None)
+    args = parser.parse_args(argv)
+
+    if os.isatty(1):
+        parser.error('the audio is written to stdout, pipe it to a player or redirect it to a file')
+    try:
+        stats = say(args)
+    except KeyboardInterrupt:
+        return 130
+    except BrokenPipeError:
+        # the reader of stdout went away (e.g. `| head -c`), which is not an error for a pipeline
+        devnull = os.open(os.devnull, os.O_WRONLY)
+        os.dup2(devnull, 1)
+        return 0
+    if args.stats:
+        print(stats.report(args.rate), file=sys.stderr, flush=True)
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
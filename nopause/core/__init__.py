@@ -1,6 +1,21 @@
-from .audio import AudioChunk, TextChunk
+from typing import TYPE_CHECKING
+
+from .._lazy import lazy_module
+
+if TYPE_CHECKING:
+    from .audio import AudioChunk, AudioFrame, TextChunk
+
+# Loaded on first access, see nopause/__init__.py
+_LAZY_ATTRS = {
+    "AudioChunk": ".audio",
+    "TextChunk": ".audio",
+    "AudioFrame": ".audio",
+}
+
+__getattr__, __dir__ = lazy_module(__name__, _LAZY_ATTRS)
 
 __all__ = [
     "AudioChunk",
     "TextChunk",
+    "AudioFrame",
 ]
@@ -1,5 +1,8 @@
 """ A simple wrapper of returned audio data from NoPause
 """
+import struct
+from typing import List, NamedTuple, Optional
+
 from pydantic import BaseModel
 
 class AudioChunk(BaseModel):
@@ -26,3 +29,107 @@ class AudioChunk(BaseModel):
 class TextChunk(BaseModel):
     text: str
     is_end: bool = False
+
+
+class AudioFrame(NamedTuple):
+    """A fixed-size frame of 16-bit mono pcm with its presentation timestamp."""
+    data: bytes
+    index: int
+    pts_us: int # the time of the first sample from the start of the stream
+    duration_us: int
+    sample_rate: int
+    padding: int = 0 # silent samples appended to the last frame
+
+    @property
+    def n_samples(self) -> int:
+        return len(self.data) // 2
+
+
+class FrameSplitter:
+    """ Cut AudioChunks of any size into frames of exactly `frame_samples`, carrying the rest over.
+
+    The carried-over part is always shorter than a frame, so every sample is copied once.
+    Timestamps follow `chunk_size_us` of the chunks, the position inside a chunk follows its samples.
+    """
+    def __init__(self, sample_rate: int, frame_ms: float = 20, samples: int = None):
+        """
+        Args:
+            sample_rate: The sample rate of the chunks.
+            frame_ms: The duration of the frames.
+            samples: The number of samples of the frames, instead of frame_ms (e.g. a sounddevice blocksize).
+        """
+        self.sample_rate = sample_rate
+        self.frame_samples = samples if samples is not None else int(sample_rate * frame_ms / 1000)
+        if self.frame_samples <= 0:
+            raise ValueError('A frame holds at least one sample.')
+        self.frame_bytes = self.frame_samples * 2
+        self.frame_duration_us = self.frame_samples * 1000000 // sample_rate
+        self.carry = bytearray()
+        self.carry_pts_us = 0
+        self.chunk_pts_us = 0 # the start of the next chunk
+        self.index = 0
+
+    def _frame(self, data: bytes, pts_us: int, padding: int = 0) -> AudioFrame:
+        frame = AudioFrame(data, self.index, pts_us, self.frame_duration_us, self.sample_rate, padding)
+        self.index += 1
+        return frame
+
+    def push(self, chunk: AudioChunk) -> List[AudioFrame]:
+        data = chunk.data
+        start_us = self.chunk_pts_us
+        self.chunk_pts_us += chunk.chunk_size_us
+        frames = []
+        offset = 0
+        frame_bytes = self.frame_bytes
+        if self.carry:
+            offset = min(frame_bytes - len(self.carry), len(data))
+            self.carry += data[:offset]
+            if len(self.carry) < frame_bytes:
+                return frames
+            frames.append(self._frame(bytes(self.carry), self.carry_pts_us))
+            self.carry.clear()
+        # the hot loop, with the frame fields as locals
+        n_frames = (len(data) - offset) // frame_bytes
+        index, duration_us, sample_rate = self.index, self.frame_duration_us, self.sample_rate
+        new = tuple.__new__
+        for i in range(n_frames):
+            position = offset + i * frame_bytes
+            frames.append(new(AudioFrame, (
+                data[position:position + frame_bytes], index + i,
+                start_us + position // 2 * 1000000 // sample_rate, duration_us, sample_rate, 0,
+            )))
+        self.index += n_frames
+        offset += n_frames * frame_bytes
+        if offset < len(data):
+            self.carry_pts_us = start_us + offset // 2 * 1000000 // sample_rate
+            self.carry += data[offset:]
+        return frames
+
+    def flush(self, pad: bool = True) -> Optional[AudioFrame]:
+        """Return the last partial frame (padded with silence to the full size), if any."""
+        if not self.carry:
+            return None
+        data = bytes(self.carry)
+        self.carry.clear()
+        padding = 0
+        if pad:
+            padding = (self.frame_bytes - len(data)) // 2
+            data += bytes(padding * 2)
+        frame = self._frame(data, self.carry_pts_us, padding)
+        if not pad:
+            frame = frame._replace(duration_us=len(data) // 2 * 1000000 // self.sample_rate)
+        return frame
+
+# the sizes of a wav header written before the length of the audio is known, read as "until the end of the stream"
+WAV_UNKNOWN_SIZE = 0xFFFFFFFF
+
+def wav_header(sample_rate: int, channels: int = 1, n_bytes: int = None) -> bytes:
+    """Return the 44-byte header of 16-bit pcm wav audio, of unknown length when n_bytes is None."""
+    data_size = WAV_UNKNOWN_SIZE if n_bytes is None else n_bytes
+    riff_size = WAV_UNKNOWN_SIZE if n_bytes is None else 36 + n_bytes
+    return struct.pack(
+        '<4sI4s4sIHHIIHH4sI',
+        b'RIFF', riff_size, b'WAVE',
+        b'fmt ', 16, 1, channels, sample_rate, sample_rate * channels * 2, channels * 2, 16,
+        b'data', data_size,
+    )
@@ -1,42 +1,97 @@
-import json
+import copy
+from functools import lru_cache
 from typing import Dict
 
+from nopause.core.codec import get_codec
+
+
+@lru_cache(maxsize=512)
+def _derived_type(base: type, name: str) -> type:
+    # the type for a name is created once and shared by every response afterwards
+    return type(name, (base,), {'__slots__': ()})
+
+
 class NoPauseObject(object):
+    """A read-mostly view over a raw response dict.
+
+    Attributes are materialized on first access: nested dicts are wrapped in a
+    (cached) subclass named after their key and lists are converted once, so
+    listing large responses does not pay for fields that are never touched.
+
+    The object is a view, not a copy: attribute assignments and deletions write
+    into the dict it was created from (nested objects into the nested dicts),
+    and `to_dict` returns a deep copy.
+    """
+    __slots__ = ('_data', '_cache')
+
     def __init__(self, data: Dict):
-        for key, value in data.items():
-            if isinstance(value, dict):
-                cls = type(key, (type(self),), {})
-                setattr(self, key, cls(value))
-            elif isinstance(value, list):
-                lst = []
-                for item in value:
-                    if isinstance(item, dict):
-                        lst.append(NoPauseObject(item))
-                    else:
-                        lst.append(item)
-                setattr(self, key, lst)
-            else:
-                setattr(self, key, value)
+        object.__setattr__(self, '_data', data)
+        object.__setattr__(self, '_cache', {})
+
+    def __getattr__(self, key):
+        if key.startswith('__') or key in NoPauseObject.__slots__:
+            raise AttributeError(key)
+        cache = self._cache
+        if key in cache:
+            return cache[key]
+        try:
+            value = self._data[key]
+        except KeyError:
+            raise AttributeError(f"'{type(self).__name__}' object has no attribute '{key}'") from None
+
+        if isinstance(value, dict):
+            value = _derived_type(type(self), key)(value)
+        elif isinstance(value, list):
+            value = [NoPauseObject(item) if isinstance(item, dict) else item for item in value]
+        else:
+            # plain values are not cached, they are read from the dict directly
+            return value
+        cache[key] = value
+        return value
+
+    def __setattr__(self, key, value):
+        self._data[key] = value.to_dict() if isinstance(value, NoPauseObject) else value
+        self._cache.pop(key, None)
+
+    def __delattr__(self, key):
+        try:
+            del self._data[key]
+        except KeyError:
+            raise AttributeError(key) from None
+        self._cache.pop(key, None)
+
+    def __dir__(self):
+        return list(super().__dir__()) + list(self._data.keys())
+
+    def __getstate__(self):
+        return self._data
+
+    def __setstate__(self, state):
+        object.__setattr__(self, '_data', state)
+        object.__setattr__(self, '_cache', {})
 
     @classmethod
     def create(cls, data: Dict, name: str = None):
         if name is not None:
-            custom_cls = type(f'{name}{cls.class_suffix()}', (cls,), {})
+            custom_cls = _derived_type(cls, f'{name}{cls.class_suffix()}')
             return custom_cls(data)
         else:
             return cls(data)
 
     def __str__(self):
-        return f'{type(self)}' + '\n' + json.dumps(self, default=lambda o: o.__dict__, indent=2)
+        return f'{type(self)}' + '\n' + get_codec().dumps_pretty(self._data)
 
     def to_dict(self):
-        return json.loads(json.dumps(self, default=lambda o: o.__dict__, indent=2))
+        """Return a deep copy of the underlying response dict."""
+        return copy.deepcopy(self._data)
 
     @classmethod
     def class_suffix(cls):
         return ''
 
 class NoPauseResponse(NoPauseObject):
+    __slots__ = ()
+
     @classmethod
     def class_suffix(cls):
         return 'Response'
@@ -0,0 +1,180 @@
+""" The JSON codec of the SDK, on the fastest installed backend.
+
+The websocket frames are small and encoded or decoded once per text piece and audio chunk, so
+the backend matters: orjson is picked first, then msgspec, ujson and the standard library.
+Override it with set_codec('ujson') (or a JSONCodec instance), or with the NO_PAUSE_JSON_CODEC
+environment variable.
+
+    from nopause.core.codec import get_codec, set_codec
+    set_codec('msgspec')
+    get_codec().dumps({'content': {'text': 'Hello', 'is_end': False}})
+"""
+import os
+import json
+from typing import Any, List, Optional, Union
+
+# in the order of preference of the automatic selection
+BACKENDS = ('orjson', 'msgspec', 'ujson', 'json')
+
+
+class JSONCodec:
+    """ The standard library backend, and the interface of the others.
+    """
+    name = 'json'
+
+    def dumps(self, obj: Any) -> str:
+        """Serialize to a compact JSON string."""
+        return json.dumps(obj, separators=(',', ':'))
+
+    def loads(self, data: Union[str, bytes]) -> Any:
+        """Parse a JSON document, ValueError if it is invalid."""
+        return json.loads(data)
+
+    def dumps_pretty(self, obj: Any) -> str:
+        """Serialize for humans: indented by 2, non-ascii characters kept."""
+        return json.dumps(obj, ensure_ascii=False, indent=2)
+
+    def decode_response(self, data: Union[str, bytes]) -> Any:
+        """Parse an audio response frame; the result is indexed like the dict of the response schema
+        (code, status, audio_content, tts_response_chunk_meta, is_end)."""
+        return self.loads(data)
+
+    def __repr__(self):
+        return f'{type(self).__name__}({self.name!r})'
+
+
+class UJSONCodec(JSONCodec):
+    name = 'ujson'
+
+    def __init__(self):
+        import ujson
+        self.dumps = ujson.dumps
+        self.loads = ujson.loads
+        self._ujson = ujson
+
+    def dumps_pretty(self, obj: Any) -> str:
+        return self._ujson.dumps(obj, ensure_ascii=False, indent=2)
+
+
+class OrjsonCodec(JSONCodec):
+    name = 'orjson'
+
+    def __init__(self):
+        import orjson
+        self.loads = orjson.loads
+        self._orjson = orjson
+
+    def dumps(self, obj: Any) -> str:
+        # text frames are sent as str, orjson encodes to utf-8 bytes
+        return self._orjson.dumps(obj).decode()
+
+    def dumps_pretty(self, obj: Any) -> str:
+        return self._orjson.dumps(obj, option=self._orjson.OPT_INDENT_2).decode()
+
+
+def _response_types(msgspec):
+    """The typed audio response schema, indexable like the dict it replaces."""
+    class ChunkMeta(msgspec.Struct, gc=False):
+        chunk_id: int = 0
+        rtf: float = 0.0
+        chunk_size_us: int = 0
+
+        def __getitem__(self, key):
+            return getattr(self, key)
+
+    class AudioResponse(msgspec.Struct, gc=False):
+        code: int
+        status: str = ''
+        audio_content: str = ''
+        tts_response_chunk_meta: Optional[ChunkMeta] = None
+        is_end: bool = False
+
+        def __getitem__(self, key):
+            return getattr(self, key)
+
+    return AudioResponse
+
+
+class MsgspecCodec(JSONCodec):
+    name = 'msgspec'
+
+    def __init__(self):
+        import msgspec
+        self._msgspec = msgspec
+        self._encoder = msgspec.json.Encoder()
+        self.loads = msgspec.json.Decoder().decode
+        # a frame of the wrong schema raises msgspec.ValidationError, a ValueError
+        self.decode_response = msgspec.json.Decoder(_response_types(msgspec)).decode
+
+    def dumps(self, obj: Any) -> str:
+        return self._encoder.encode(obj).decode()
+
+    def dumps_pretty(self, obj: Any) -> str:
+        return self._msgspec.json.format(self._encoder.encode(obj), indent=2).decode()
+
+
+_CODECS = {
+    'json': JSONCodec,
+    'ujson': UJSONCodec,
+    'orjson': OrjsonCodec,
+    'msgspec': MsgspecCodec,
+}
+
+_codec: Optional[JSONCodec] = None
+
+
+def create_codec(name: str) -> JSONCodec:
+    """
+    Create the codec of a backend.
+    Args:
+        name: One of orjson, msgspec, ujson or json.
+    Returns:
+        A JSONCodec, ImportError if the backend is not installed.
+    """
+    codec_cls = _CODECS.get(name)
+    if codec_cls is None:
+        raise ValueError(f'Unknown JSON codec {name!r}, expected one of {list(BACKENDS)}.')
+    return codec_cls()
+
+
+def available_codecs() -> List[str]:
+    """The backends installed, in the order of preference."""
+    available = []
+    for name in BACKENDS:
+        try:
+            create_codec(name)
+        except ImportError:
+            continue
+        available.append(name)
+    return available
+
+
+def get_codec() -> JSONCodec:
+    """The codec in use, selected on the first call."""
+    global _codec
+    if _codec is None:
+        name = os.environ.get('NO_PAUSE_JSON_CODEC')
+        if name:
+            _codec = create_codec(name)
+        else:
+            # the stdlib backend always imports
+            for name in BACKENDS:
+                try:
+                    _codec = create_codec(name)
+                    break
+                except ImportError:
+                    continue
+    return _codec
+
+
+def set_codec(codec: Union[str, JSONCodec, None]) -> JSONCodec:
+    """
+    Override the codec, for every later frame.
+    Args:
+        codec: A backend name, a JSONCodec instance, or None to select automatically again.
+    Returns:
+        The codec in use.
+    """
+    global _codec
+    _codec = create_codec(codec) if isinstance(codec, str) else codec
+    return get_codec()
@@ -0,0 +1,29 @@
+""" Local multiplexing daemon sharing upstream NoPause connections across processes.
+
+Run the daemon:
+    python -m nopause.daemon --socket /tmp/nopause.sock --pool-size 4
+
+Use it from any local process:
+    from nopause.daemon import DaemonSynthesis
+    DaemonSynthesis.stream(text_iterator, voice_id='Zoe')
+"""
+from typing import TYPE_CHECKING
+
+from .._lazy import lazy_module
+
+if TYPE_CHECKING:
+    from .client import DaemonSynthesis
+    from .server import SynthesisDaemon
+
+# Loaded on first access, the client does not need websockets at all
+_LAZY_ATTRS = {
+    "DaemonSynthesis": ".client",
+    "SynthesisDaemon": ".server",
+}
+
+__getattr__, __dir__ = lazy_module(__name__, _LAZY_ATTRS)
+
+__all__ = [
+    "DaemonSynthesis",
+    "SynthesisDaemon",
+]
@@ -0,0 +1,43 @@
+""" Run the nopause daemon: python -m nopause.daemon --help
+"""
+import asyncio
+import argparse
+
+from nopause.daemon.protocol import DEFAULT_SOCKET_PATH
+from nopause.daemon.server import SynthesisDaemon
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog='python -m nopause.daemon', description='Share warm NoPause connections across local processes.')
+    parser.add_argument('--socket', default=DEFAULT_SOCKET_PATH, help='unix socket to listen on')
+    parser.add_argument('--pool-size', type=int, default=4, help='idle upstream connections kept per session config')
+    parser.add_argument('--warmup', type=int, default=0, help='connections opened in advance for the warmup voice')
+    parser.add_argument('--voice-id', default='Zoe', help='voice of the warmup connections')
+    parser.add_argument('--api-key', default=None)
+    parser.add_argument('--api-base', default=None)
+    parser.add_argument('--api-version', default=None)
+    args = parser.parse_args(argv)
+
+    async def serve():
+        daemon = SynthesisDaemon(
+            args.socket,
+            pool_size=args.pool_size,
+            api_key=args.api_key,
+            api_base=args.api_base,
+            api_version=args.api_version,
+        )
+        try:
+            if args.warmup > 0:
+                await daemon.warmup(args.warmup, voice_id=args.voice_id)
+            print(f'NoPause daemon listening on {args.socket}', flush=True)
+            await daemon.serve_forever()
+        finally:
+            await daemon.close()
+
+    try:
+        asyncio.run(serve())
+    except KeyboardInterrupt:
+        pass
+
+if __name__ == '__main__':
+    main()
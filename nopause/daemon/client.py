@@ -0,0 +1,319 @@
+""" A thin client of the nopause daemon with the same stream/astream semantics as Synthesis.
+"""
+import os
+import json
+import socket
+import asyncio
+import inspect
+import threading
+from typing import Iterable, AsyncIterable, Union
+
+from nopause.core.audio import AudioChunk
+from nopause.sdk import error as errors
+from nopause.sdk.base import hybridmethod
+from nopause.sdk.config import AudioConfig, DualStreamConfig
+from nopause.sdk.config import DEFAULT_MODEL_NAME, DEFAULT_VOICE_ID, DEFAULT_LANGUAGE
+from nopause.sdk.error import InvalidRequestError, NoPauseError
+from nopause.daemon.protocol import (
+    DEFAULT_SOCKET_PATH,
+    HEADER, BEGIN, TEXT, END, CANCEL, AUDIO, DONE, ERROR,
+    pack_frame, unpack_audio_payload, aread_frame,
+)
+
+
+class DaemonSynthesis:
+    """ Synthesis through a local nopause daemon (see nopause.daemon.server).
+
+    It is used like Synthesis, either as classmethod or on an instance:
+        DaemonSynthesis.stream(text_iterator, voice_id='Zoe')
+        await DaemonSynthesis(voice_id='Zoe').astream(text_iterator)
+    """
+    def __init__(
+        self,
+        voice_id: str = DEFAULT_VOICE_ID,
+        model_name: str = DEFAULT_MODEL_NAME,
+        language: str = DEFAULT_LANGUAGE,
+        audio_config: AudioConfig = None,
+        dual_stream_config: DualStreamConfig = None,
+        socket_path: str = None,
+        **kwargs,
+    ):
+        """
+        Args:
+            voice_id: The ID of the voice to use.
+            model_name: The name of the NoPause model to use.
+            language: The language to use.
+            audio_config: The audio configuration to use.
+            dual_stream_config: The dual stream configuration to use.
+            socket_path: The unix socket of the daemon (default: NO_PAUSE_DAEMON_SOCKET or /tmp/nopause.sock).
+            **kwargs: Additional keyword arguments (the api settings belong to the daemon and are ignored).
+        """
+        self.voice_id = voice_id
+        self.model_name = model_name
+        self.language = language
+        self.audio_config = audio_config if audio_config is not None else AudioConfig()
+        self.dual_stream_config = dual_stream_config if dual_stream_config is not None else DualStreamConfig()
+        self.socket_path = socket_path or os.environ.get('NO_PAUSE_DAEMON_SOCKET', DEFAULT_SOCKET_PATH)
+        self.begin_frame = pack_frame(BEGIN, json.dumps(dict(
+            voice_id=self.voice_id,
+            model_name=self.model_name,
+            language=self.language,
+            sample_rate=self.audio_config.sample_rate,
+            stream_in=self.dual_stream_config.stream_in,
+            stream_out=self.dual_stream_config.stream_out,
+        )).encode())
+
+    def _connection_error(self, error: Exception) -> InvalidRequestError:
+        return InvalidRequestError(f'Cannot connect to the nopause daemon at {self.socket_path}: {error}')
+
+    @hybridmethod
+    def stream(
+        cls_or_self,
+        text_iter: Iterable[str],
+        *args,
+        **kwargs,
+    ) -> Iterable[AudioChunk]:
+        """
+        Create a dual-stream synthesis through the daemon.
+        Args:
+            text_iter: An iterable of strings to be synthesized.
+            **kwargs: The configurations of DaemonSynthesis when called as classmethod.
+        Returns:
+            A generator of AudioChunk objects.
+        """
+        synthesizer = cls_or_self(*args, **kwargs) if inspect.isclass(cls_or_self) else cls_or_self
+        sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        try:
+            sock.connect(synthesizer.socket_path)
+            sock.sendall(synthesizer.begin_frame)
+        except OSError as e:
+            sock.close()
+            raise synthesizer._connection_error(e)
+
+        send_lock = threading.Lock()
+        send_text_task = SendTextTask(sock, text_iter, send_lock)
+        send_text_task.start()
+        return DaemonResultGenerator(sock, send_text_task, send_lock=send_lock)
+
+    @hybridmethod
+    async def astream(
+        cls_or_self,
+        text_iter: AsyncIterable[str],
+        *args,
+        **kwargs,
+    ) -> AsyncIterable[AudioChunk]:
+        """
+        Create an async dual-stream synthesis through the daemon.
+        Args:
+            text_iter: An async iterable of strings to be synthesized.
+            **kwargs: The configurations of DaemonSynthesis when called as classmethod.
+        Returns:
+            An async generator of AudioChunk objects.
+        """
+        synthesizer = cls_or_self(*args, **kwargs) if inspect.isclass(cls_or_self) else cls_or_self
+        try:
+            reader, writer = await asyncio.open_unix_connection(synthesizer.socket_path)
+        except OSError as e:
+            raise synthesizer._connection_error(e)
+        writer.write(synthesizer.begin_frame)
+
+        async def send_text():
+            try:
+                async for text in text_iter:
+                    writer.write(pack_frame(TEXT, text.encode('utf-8')))
+                    await writer.drain()
+                writer.write(pack_frame(END))
+                await writer.drain()
+            except (asyncio.CancelledError, ConnectionError):
+                pass
+            except Exception:
+                # the text iterator failed: wake up the receiver, which raises the error
+                writer.close()
+                raise
+
+        send_text_task = asyncio.create_task(send_text())
+        return DaemonResultGenerator((reader, writer), send_text_task)
+
+
+class SendTextTask(threading.Thread):
+    """ Send the text of one stream to the daemon from a daemon thread.
+
+    Like nopause.sdk.synthesis.SendTextTask, nobody waits for it: the thread may be blocked
+    in the text iterator when the stream is terminated, and stops as soon as the iterator returns.
+    """
+    def __init__(self, sock: socket.socket, text_iter: Iterable[str], send_lock: threading.Lock):
+        super().__init__(daemon=True)
+        self.sock = sock
+        self.text_iter = text_iter
+        self.send_lock = send_lock
+        self.event = threading.Event()
+        self.error = None
+        self._done = False
+
+    def cancel(self):
+        self.event.set()
+
+    def done(self):
+        return self._done
+
+    def run(self):
+        try:
+            for text in self.text_iter:
+                if self.event.is_set():
+                    return
+                with self.send_lock:
+                    self.sock.sendall(pack_frame(TEXT, text.encode('utf-8')))
+            if not self.event.is_set():
+                with self.send_lock:
+                    self.sock.sendall(pack_frame(END))
+        except OSError:
+            pass # closed by terminate, or by the daemon which the receiver reports
+        except Exception as e:
+            self.error = e
+            if not self.event.is_set():
+                # the text iterator failed: wake up the receiver, which raises the error
+                try:
+                    self.sock.shutdown(socket.SHUT_RDWR)
+                except OSError:
+                    pass
+        finally:
+            self._done = True
+
+
+class DaemonResultGenerator:
+    """It is could be used as a generator or an async generator according to the connection to the daemon.
+    """
+    # seconds aterminate waits for a cancelled sender to finish
+    sender_timeout: float = 0.1
+
+    def __init__(
+        self,
+        connection: Union[socket.socket, tuple],
+        send_text_task: Union[asyncio.Task, threading.Thread],
+        send_lock: threading.Lock = None,
+        ):
+        if isinstance(connection, socket.socket):
+            self.use_async = False
+            self.sock = connection
+            self.file = connection.makefile('rb')
+        else:
+            self.use_async = True
+            self.reader, self.writer = connection
+        self.send_text_task = send_text_task
+        self.send_lock = send_lock
+        self.is_end = False
+        self.terminated = False
+
+    def sender_error(self):
+        """The error raised by the text iterator, if any."""
+        task = self.send_text_task
+        if isinstance(task, asyncio.Task):
+            return task.exception() if task.done() and not task.cancelled() else None
+        return task.error
+
+    def parse_frame(self, frame_type: int, payload: bytes):
+        if frame_type == AUDIO:
+            return unpack_audio_payload(payload)
+        if frame_type == DONE:
+            self.is_end = True
+            return None
+        if frame_type == ERROR:
+            error = json.loads(payload)
+            error_cls = getattr(errors, error['type'], NoPauseError)
+            raise error_cls(error['message'], code=error['code'])
+        raise InvalidRequestError(f'Unknown frame type from the nopause daemon: {frame_type}')
+
+    def _read_exactly(self, n: int) -> bytes:
+        data = self.file.read(n)
+        if len(data) != n:
+            raise InvalidRequestError('The connection to the nopause daemon is closed.')
+        return data
+
+    def __next__(self):
+        if self.terminated or self.is_end:
+            raise StopIteration
+        try:
+            frame_type, length = HEADER.unpack(self._read_exactly(HEADER.size))
+            chunk = self.parse_frame(frame_type, self._read_exactly(length) if length else b'')
+        except Exception as e:
+            if not self.terminated:
+                self.terminate()
+            error = self.sender_error()
+            if error is not None:
+                raise error from e
+            if isinstance(e, OSError):
+                raise InvalidRequestError(str(e))
+            raise e
+        if chunk is None:
+            self.close()
+            raise StopIteration
+        return chunk
+
+    async def __anext__(self):
+        if self.terminated or self.is_end:
+            raise StopAsyncIteration
+        try:
+            frame_type, payload = await aread_frame(self.reader)
+            chunk = self.parse_frame(frame_type, payload)
+        except Exception as e:
+            if not self.terminated:
+                await self.aterminate()
+            error = self.sender_error()
+            if error is not None:
+                raise error from e
+            if isinstance(e, asyncio.IncompleteReadError):
+                raise InvalidRequestError('The connection to the nopause daemon is closed.')
+            if isinstance(e, OSError):
+                raise InvalidRequestError(str(e))
+            raise e
+        if chunk is None:
+            await self.aclose()
+            raise StopAsyncIteration
+        return chunk
+
+    def __iter__(self):
+        return self
+
+    def __aiter__(self):
+        return self
+
+    def close(self):
+        assert not self.use_async
+        self.file.close()
+        self.sock.close()
+
+    async def aclose(self):
+        assert self.use_async
+        self.writer.close()
+
+    def terminate(self):
+        """terminate every thing
+        """
+        assert not self.use_async
+        self.terminated = True
+        if not self.send_text_task.done():
+            self.send_text_task.cancel()
+        if not self.is_end:
+            try:
+                with self.send_lock:
+                    self.sock.sendall(pack_frame(CANCEL))
+            except OSError:
+                pass
+        self.close()
+
+    async def aterminate(self):
+        """terminate every thing, waiting at most `sender_timeout` for the text iterator
+        """
+        assert self.use_async
+        self.terminated = True
+        task = self.send_text_task
+        if not task.done():
+            task.cancel()
+        # the connection is closed first, the sender may be stuck in the text iterator
+        if not self.is_end and not self.writer.is_closing():
+            self.writer.write(pack_frame(CANCEL))
+        await self.aclose()
+        if not task.done():
+            await asyncio.wait({task}, timeout=self.sender_timeout)
+        elif not task.cancelled():
+            task.exception() # the error of a cancelled stream is not raised, but retrieved
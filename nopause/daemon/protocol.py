@@ -0,0 +1,51 @@
+""" Framing used between the nopause daemon and its local clients.
+
+Every frame is a 5-byte header (type, payload length) followed by the payload.
+Audio frames carry the chunk meta followed by the raw PCM bytes, so no base64
+or json is involved on the relay hop.
+"""
+import struct
+from typing import Tuple
+
+DEFAULT_SOCKET_PATH = '/tmp/nopause.sock'
+
+# client -> daemon
+BEGIN = 1 # json session config
+TEXT = 2 # utf-8 text
+END = 3 # end of the text stream
+CANCEL = 4 # drop the current synthesis
+# daemon -> client
+AUDIO = 5 # audio meta + pcm
+DONE = 6 # all audio has been relayed
+ERROR = 7 # json error
+
+HEADER = struct.Struct('!BI')
+# chunk_id, sample_rate, channels, rtf, chunk_size_us
+AUDIO_META = struct.Struct('!iIBdq')
+
+
+def pack_frame(frame_type: int, payload: bytes = b'') -> bytes:
+    return HEADER.pack(frame_type, len(payload)) + payload
+
+def pack_audio_frame(chunk) -> Tuple[bytes, bytes]:
+    """Return the header part and the pcm part of an audio frame (to be written without concatenation)."""
+    meta = AUDIO_META.pack(chunk.chunk_id, chunk.sample_rate, chunk.channels, chunk.rtf, chunk.chunk_size_us)
+    return HEADER.pack(AUDIO, len(meta) + len(chunk.data)) + meta, chunk.data
+
+def unpack_audio_payload(payload: bytes):
+    from nopause.core.audio import AudioChunk
+    chunk_id, sample_rate, channels, rtf, chunk_size_us = AUDIO_META.unpack_from(payload)
+    return AudioChunk(
+        data=payload[AUDIO_META.size:],
+        chunk_id=chunk_id,
+        sample_rate=sample_rate,
+        channels=channels,
+        rtf=rtf,
+        chunk_size_us=chunk_size_us,
+    )
+
+async def aread_frame(reader) -> Tuple[int, bytes]:
+    header = await reader.readexactly(HEADER.size)
+    frame_type, length = HEADER.unpack(header)
+    payload = await reader.readexactly(length) if length else b''
+    return frame_type, payload
@@ -0,0 +1,237 @@
+""" A local daemon sharing warm NoPause connections across processes.
+
+Worker processes (gunicorn/uwsgi style) connect to the daemon over a unix socket
+through `DaemonSynthesis`, and the daemon relays the text to a pooled upstream
+`Synthesis` and the audio back as binary frames.
+"""
+import os
+import json
+import asyncio
+from typing import Dict, List, Set, Tuple
+
+from nopause.sdk.config import AudioConfig, DualStreamConfig
+from nopause.sdk.error import APIError
+from nopause.sdk.synthesis import Synthesis, DEFAULT_VOICE_ID, DEFAULT_MODEL_NAME, DEFAULT_LANGUAGE
+from nopause.daemon.protocol import (
+    DEFAULT_SOCKET_PATH,
+    BEGIN, TEXT, END, CANCEL, DONE, ERROR,
+    pack_frame, pack_audio_frame, aread_frame,
+)
+
+
+class SynthesisDaemon:
+    """ Serve synthesis requests from local clients over a unix socket with a shared pool of upstream connections.
+
+    Usage:
+        daemon = SynthesisDaemon('/tmp/nopause.sock', pool_size=4)
+        await daemon.warmup(2, voice_id='Zoe')
+        await daemon.serve_forever()
+    """
+    def __init__(
+        self,
+        socket_path: str = DEFAULT_SOCKET_PATH,
+        pool_size: int = 4,
+        api_key: str = None,
+        api_base: str = None,
+        api_version: str = None,
+    ):
+        """
+        Args:
+            socket_path: The path of the unix socket to listen on.
+            pool_size: The maximum number of idle upstream connections kept per session config.
+            api_key: The NoPause API key.
+            api_base: The base URL for the NoPause API.
+            api_version: The version of the NoPause API to use.
+        """
+        self.socket_path = socket_path
+        self.pool_size = pool_size
+        self.api_settings = dict(api_key=api_key, api_base=api_base, api_version=api_version)
+        self._pools: Dict[Tuple, List[Synthesis]] = {}
+        self._server = None
+        # the sessions in progress and the background reconnections, waited for on close
+        self._tasks: Set[asyncio.Task] = set()
+
+    @staticmethod
+    def session_key(config: dict) -> Tuple:
+        return (
+            config.get('voice_id', DEFAULT_VOICE_ID),
+            config.get('model_name', DEFAULT_MODEL_NAME),
+            config.get('language', DEFAULT_LANGUAGE),
+            config.get('sample_rate', 24000),
+            config.get('stream_in', True),
+            config.get('stream_out', True),
+        )
+
+    def create_synthesizer(self, key: Tuple) -> Synthesis:
+        voice_id, model_name, language, sample_rate, stream_in, stream_out = key
+        return Synthesis(
+            voice_id=voice_id,
+            model_name=model_name,
+            language=language,
+            audio_config=AudioConfig(sample_rate=sample_rate),
+            dual_stream_config=DualStreamConfig(stream_in=stream_in, stream_out=stream_out),
+            **self.api_settings,
+        )
+
+    async def acquire(self, key: Tuple) -> Synthesis:
+        pool = self._pools.get(key)
+        while pool:
+            synthesizer = pool.pop()
+            if await synthesizer.acheck_alive():
+                return synthesizer
+            await synthesizer.aclose()
+        return await self.create_synthesizer(key).aconnect()
+
+    async def release(self, key: Tuple, synthesizer: Synthesis):
+        pool = self._pools.setdefault(key, [])
+        if synthesizer.ws is not None and not synthesizer._in_use and len(pool) < self.pool_size:
+            pool.append(synthesizer)
+        else:
+            await synthesizer.aclose()
+
+    async def _refill(self, key: Tuple, synthesizer: Synthesis):
+        # the connection of a cancelled session is dropped, reconnect it in the background
+        try:
+            await synthesizer.aconnect()
+        except APIError:
+            return
+        await self.release(key, synthesizer)
+
+    @staticmethod
+    def _error_frame(error_type: str, message: str, code: int = None) -> bytes:
+        return pack_frame(ERROR, json.dumps(dict(type=error_type, message=message, code=code)).encode())
+
+    @staticmethod
+    async def _discard(result):
+        if result.terminated:
+            return
+        try:
+            await result.aterminate()
+        except Exception:
+            # the error of the send task is irrelevant once the session is dropped
+            pass
+
+    async def warmup(self, n: int = 1, **config):
+        """Open `n` upstream connections for the session config in advance."""
+        key = self.session_key(config)
+        synthesizers = await asyncio.gather(*[self.create_synthesizer(key).aconnect() for _ in range(n)])
+        for synthesizer in synthesizers:
+            await self.release(key, synthesizer)
+
+    async def start(self):
+        if os.path.exists(self.socket_path):
+            os.unlink(self.socket_path)
+        self._server = await asyncio.start_unix_server(self._handle, path=self.socket_path)
+        return self
+
+    async def serve_forever(self):
+        if self._server is None:
+            await self.start()
+        async with self._server:
+            await self._server.serve_forever()
+
+    def _track(self, task: asyncio.Task):
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def close(self, timeout: float = 5.0):
+        """
+        Stop listening, then close the pooled connections.
+        Args:
+            timeout: Seconds the sessions in progress have to end, and release their connections.
+        """
+        if self._server is not None:
+            self._server.close()
+            await self._server.wait_closed()
+            self._server = None
+        if self._tasks:
+            await asyncio.wait(set(self._tasks), timeout=timeout)
+        pools, self._pools = self._pools, {}
+        for pool in pools.values():
+            for synthesizer in pool:
+                await synthesizer.aclose()
+        if os.path.exists(self.socket_path):
+            os.unlink(self.socket_path)
+
+    async def _handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        self._track(asyncio.current_task())
+        try:
+            frame_type, payload = await aread_frame(reader)
+        except (asyncio.IncompleteReadError, ConnectionError):
+            writer.close()
+            return
+        if frame_type != BEGIN:
+            writer.write(self._error_frame('InvalidRequestError', 'The first frame must be BEGIN.'))
+            writer.close()
+            return
+
+        key = self.session_key(json.loads(payload))
+        texts = asyncio.Queue()
+
+        async def text_iter():
+            while True:
+                text = await texts.get()
+                if text is None:
+                    return
+                yield text
+
+        async def read_client():
+            # returns when the client cancels or goes away
+            try:
+                while True:
+                    frame_type, payload = await aread_frame(reader)
+                    if frame_type == TEXT:
+                        texts.put_nowait(payload.decode('utf-8'))
+                    elif frame_type == END:
+                        texts.put_nowait(None)
+                    elif frame_type == CANCEL:
+                        return
+            except (asyncio.IncompleteReadError, ConnectionError):
+                return
+
+        result = None
+        synthesizer = None
+
+        async def relay():
+            nonlocal result, synthesizer
+            synthesizer = await self.acquire(key)
+            result = await synthesizer.astream(text_iter())
+            async for chunk in result:
+                writer.writelines(pack_audio_frame(chunk))
+                await writer.drain()
+            writer.write(pack_frame(DONE))
+            await writer.drain()
+
+        relay_task = asyncio.create_task(relay())
+        client_task = asyncio.create_task(read_client())
+        try:
+            await asyncio.wait([relay_task, client_task], return_when=asyncio.FIRST_COMPLETED)
+            if relay_task.done():
+                client_task.cancel()
+                error = relay_task.exception()
+                if error is None:
+                    await self.release(key, synthesizer)
+                    return
+                if result is not None:
+                    await self._discard(result)
+                elif synthesizer is not None:
+                    await synthesizer.aclose()
+                if isinstance(error, APIError):
+                    writer.write(self._error_frame(type(error).__name__, error.message, error.code))
+                elif not isinstance(error, ConnectionError):
+                    # the client would otherwise only see the connection closed
+                    writer.write(self._error_frame('NoPauseError', f'The nopause daemon failed: {type(error).__name__}: {error}'))
+            else:
+                # cancelled by the client
+                relay_task.cancel()
+                try:
+                    await relay_task
+                except (asyncio.CancelledError, APIError, ConnectionError):
+                    pass
+                if result is not None:
+                    await self._discard(result)
+                    self._track(asyncio.create_task(self._refill(key, synthesizer)))
+                elif synthesizer is not None:
+                    await self.release(key, synthesizer)
+        finally:
+            writer.close()
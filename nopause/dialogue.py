@@ -0,0 +1,333 @@
+""" Render a multi-speaker script into one mixed audio stream.
+
+Every turn is synthesized as its own session, concurrently across the connections of the
+voices, and placed on a shared timeline right after the previous turn (or overlapping it,
+or at a fixed time). The timeline is mixed with NumPy and streamed in blocks as soon as no
+unfinished turn can still land in them:
+
+    renderer = DialogueRenderer(voices={'host': 'Zoe', 'guest': 'Adam'})
+    script = [
+        Turn('host', 'Welcome back to the show!'),
+        Turn('guest', 'Thanks for having me.', overlap=0.3),   # starts 300 ms before the host ends
+        Turn('host', 'So, tell us about it.', overlap=-0.5),   # after a pause of 500 ms
+    ]
+    for chunk in renderer.render(script):
+        ...
+    renderer.close()
+
+Requires numpy: pip install nopause[audio]
+"""
+import queue
+import asyncio
+import threading
+from collections import defaultdict
+from typing import Dict, Iterable, Iterator, List, NamedTuple, Optional, Tuple
+
+try:
+    import numpy as np
+except ImportError as e:
+    raise ImportError('nopause.dialogue requires numpy, install it with: pip install nopause[audio]') from e
+
+from nopause.core.audio import AudioChunk
+from nopause.sdk.synthesis import DEFAULT_AUDIO_CONFIG, Synthesis
+from nopause.sdk.pipeline import PipelinedResultGenerator, _aiter
+
+
+class Turn(NamedTuple):
+    """One line of a script."""
+    speaker: str
+    text: str
+    # seconds from the beginning of the dialogue, None to follow the previous turn
+    start: Optional[float] = None
+    # seconds the turn starts before the end of the previous one, negative for a pause
+    overlap: float = 0.0
+
+
+class DialogueMixer:
+    """ The timeline of a script, mixed as the audio of its turns completes (in any order).
+    """
+    def __init__(self, turns: List[Turn], sample_rate: int, block_samples: int):
+        self.turns = turns
+        self.sample_rate = sample_rate
+        self.block_samples = block_samples
+        n = len(turns)
+        self.starts: List[Optional[int]] = [
+            None if turn.start is None else round(turn.start * sample_rate) for turn in turns
+        ]
+        if n and self.starts[0] is None:
+            self.starts[0] = 0
+        self.samples: List[Optional[np.ndarray]] = [None] * n # finished, waiting to be placed
+        self.lengths: List[Optional[int]] = [None] * n
+        self.mixed = [False] * n
+        self.n_mixed = 0
+        # the samples not emitted yet, from `origin` on, summed in int32 so that overlaps do not wrap
+        self.buffer = np.zeros(0, dtype=np.int32)
+        self.origin = 0
+        self.end = 0
+
+    def _add(self, index: int):
+        samples = self.samples[index]
+        start = self.starts[index] - self.origin
+        stop = start + len(samples)
+        if stop > len(self.buffer):
+            grown = np.zeros(max(stop, 2 * len(self.buffer)), dtype=np.int32)
+            grown[:len(self.buffer)] = self.buffer
+            self.buffer = grown
+        self.buffer[start:stop] += samples
+        self.end = max(self.end, self.starts[index] + len(samples))
+        self.samples[index] = None
+        self.mixed[index] = True
+        self.n_mixed += 1
+
+    def complete(self, index: int, samples: np.ndarray):
+        """Add the int16 samples of a finished turn, and place the turns that were waiting for its length."""
+        self.samples[index] = samples
+        self.lengths[index] = len(samples)
+        for i, turn in enumerate(self.turns):
+            if self.starts[i] is None:
+                previous = i - 1
+                if self.starts[previous] is None or self.lengths[previous] is None:
+                    continue
+                previous_end = self.starts[previous] + self.lengths[previous]
+                self.starts[i] = max(self.starts[previous], previous_end - round(turn.overlap * self.sample_rate), 0)
+            if self.samples[i] is not None:
+                self._add(i)
+
+    def limit(self) -> int:
+        """The sample up to which the timeline is final: no unfinished turn starts before it."""
+        if self.n_mixed == len(self.turns):
+            return self.end
+        limit = None
+        lower_bound = 0
+        for i, start in enumerate(self.starts):
+            # a turn that follows an unplaced one starts no earlier than it
+            lower_bound = start if start is not None else lower_bound
+            if not self.mixed[i]:
+                limit = lower_bound if limit is None else min(limit, lower_bound)
+        return limit
+
+    def take(self, final: bool = False) -> List[np.ndarray]:
+        """Return the int16 blocks that are final, and the rest of the timeline if `final`."""
+        limit = self.limit()
+        if limit - self.origin > len(self.buffer):
+            # a pause before a turn that is placed but not finished yet
+            self.buffer = np.concatenate([self.buffer, np.zeros(limit - self.origin - len(self.buffer), dtype=np.int32)])
+        n_blocks = (limit - self.origin) // self.block_samples
+        n_samples = n_blocks * self.block_samples
+        if final:
+            n_samples = limit - self.origin
+        if n_samples == 0:
+            return []
+        # one vectorized clip of everything that is final, split into views of whole blocks
+        mixed = np.clip(self.buffer[:n_samples], -32768, 32767).astype('<i2')
+        self.buffer = self.buffer[n_samples:].copy()
+        self.origin += n_samples
+        return [mixed[i:i + self.block_samples] for i in range(0, n_samples, self.block_samples)]
+
+
+class DialogueRenderer:
+    """ Synthesize the turns of a script concurrently and stream them as one mixed timeline.
+
+    Usage:
+        [sync]
+            renderer = DialogueRenderer(voices={'host': 'Zoe', 'guest': 'Adam'})
+            for chunk in renderer.render(script): ...
+            renderer.close()
+
+        [async]
+            renderer = DialogueRenderer(voices={'host': 'Zoe', 'guest': 'Adam'})
+            async for chunk in await renderer.arender(script): ...
+            await renderer.aclose()
+
+    Note:
+        The turns of one voice are synthesized in script order on its connections, so the leading
+        turns come first and the mixed audio starts before the whole script is synthesized.
+    """
+    def __init__(
+        self,
+        voices: Dict[str, str] = None,
+        connections_per_voice: int = 1,
+        block_ms: int = 200,
+        **kwargs,
+    ):
+        """
+        Args:
+            voices: The voice id of each speaker, a speaker missing from it is used as the voice id.
+            connections_per_voice: The number of turns of one voice synthesized at the same time.
+            block_ms: The duration of the mixed chunks.
+            **kwargs: The configurations of Synthesis shared by the voices (audio_config, api_key, ...).
+        """
+        self.voices = voices or {}
+        self.connections_per_voice = connections_per_voice
+        self.block_ms = block_ms
+        self.kwargs = kwargs
+        self.sample_rate = (kwargs.get('audio_config') or DEFAULT_AUDIO_CONFIG).sample_rate
+        # the connections of each voice, kept for the next script
+        self.synthesizers: Dict[str, List[Synthesis]] = {}
+
+    def voice_id(self, speaker: str) -> str:
+        return self.voices.get(speaker, speaker)
+
+    def _pool(self, voice_id: str) -> List[Synthesis]:
+        pool = self.synthesizers.setdefault(voice_id, [])
+        while len(pool) < self.connections_per_voice:
+            pool.append(Synthesis(voice_id=voice_id, **self.kwargs))
+        return pool
+
+    def connect(self, speakers: Iterable[str] = None):
+        """Open the connections of the speakers (default: those of `voices`) before the first script."""
+        for speaker in speakers if speakers is not None else self.voices:
+            for synthesizer in self._pool(self.voice_id(speaker)):
+                synthesizer.connect()
+        return self
+
+    async def aconnect(self, speakers: Iterable[str] = None):
+        for speaker in speakers if speakers is not None else self.voices:
+            await asyncio.gather(*[synthesizer.aconnect() for synthesizer in self._pool(self.voice_id(speaker))])
+        return self
+
+    def _prepare(self, script: Iterable[Tuple]) -> Tuple[List[Turn], DialogueMixer, Dict[str, List[int]]]:
+        turns = [turn if isinstance(turn, Turn) else Turn(*turn) for turn in script]
+        mixer = DialogueMixer(turns, self.sample_rate, self.sample_rate * self.block_ms // 1000)
+        # the turns of each voice in script order
+        assignments = defaultdict(list)
+        for index, turn in enumerate(turns):
+            assignments[self.voice_id(turn.speaker)].append(index)
+        for voice_id in assignments:
+            self._pool(voice_id)
+        return turns, mixer, assignments
+
+    def _chunk(self, block: np.ndarray, chunk_id: int, rtf: float) -> AudioChunk:
+        return AudioChunk(
+            data=block.tobytes(),
+            chunk_id=chunk_id,
+            sample_rate=self.sample_rate,
+            channels=1,
+            rtf=rtf,
+            chunk_size_us=len(block) * 1000000 // self.sample_rate,
+        )
+
+    def render(self, script: Iterable[Tuple]) -> PipelinedResultGenerator:
+        """
+        Render a script.
+        Args:
+            script: Turn objects or (speaker, text[, start[, overlap]]) tuples.
+        Returns:
+            A generator of the mixed AudioChunk objects.
+        """
+        turns, mixer, assignments = self._prepare(script)
+        results = queue.Queue()
+        stopped = threading.Event()
+
+        def work(synthesizer: Synthesis, indices: queue.Queue):
+            while not stopped.is_set():
+                try:
+                    index = indices.get_nowait()
+                except queue.Empty:
+                    return
+                try:
+                    result = synthesizer.stream(iter([turns[index].text]))
+                    chunks, rtf = [], 0.0
+                    for chunk in result:
+                        if stopped.is_set():
+                            result.terminate()
+                            return
+                        chunks.append(chunk.data)
+                        rtf = max(rtf, chunk.rtf)
+                    results.put((index, b''.join(chunks), rtf))
+                except Exception as e:
+                    results.put((index, e, None))
+                    return
+
+        for voice_id, voice_turns in assignments.items():
+            indices = queue.Queue()
+            for index in voice_turns:
+                indices.put(index)
+            for synthesizer in self.synthesizers[voice_id]:
+                threading.Thread(target=work, args=(synthesizer, indices), daemon=True).start()
+
+        def generate() -> Iterator[AudioChunk]:
+            chunk_id, max_rtf = 0, 0.0
+            try:
+                for _ in turns:
+                    index, data, rtf = results.get()
+                    if isinstance(data, Exception):
+                        raise data
+                    max_rtf = max(max_rtf, rtf)
+                    mixer.complete(index, np.frombuffer(data, dtype='<i2'))
+                    for block in mixer.take(final=mixer.n_mixed == len(turns)):
+                        yield self._chunk(block, chunk_id, max_rtf)
+                        chunk_id += 1
+            finally:
+                stopped.set()
+
+        return PipelinedResultGenerator(generate(), stopped.set)
+
+    async def arender(self, script: Iterable[Tuple]) -> PipelinedResultGenerator:
+        """
+        Render a script asynchronously.
+        Args:
+            script: Turn objects or (speaker, text[, start[, overlap]]) tuples.
+        Returns:
+            An async generator of the mixed AudioChunk objects.
+        """
+        turns, mixer, assignments = self._prepare(script)
+        results = asyncio.Queue()
+
+        async def work(synthesizer: Synthesis, indices: List[int]):
+            while indices:
+                index = indices.pop(0)
+                result = None
+                try:
+                    result = await synthesizer.astream(_aiter([turns[index].text]))
+                    chunks, rtf = [], 0.0
+                    async for chunk in result:
+                        chunks.append(chunk.data)
+                        rtf = max(rtf, chunk.rtf)
+                    result = None
+                    results.put_nowait((index, b''.join(chunks), rtf))
+                except asyncio.CancelledError:
+                    if result is not None and not result.terminated:
+                        await result.aterminate()
+                    raise
+                except Exception as e:
+                    results.put_nowait((index, e, None))
+                    return
+
+        workers = []
+        for voice_id, voice_turns in assignments.items():
+            indices = list(voice_turns) # shared by the connections of the voice
+            for synthesizer in self.synthesizers[voice_id]:
+                workers.append(asyncio.create_task(work(synthesizer, indices)))
+
+        async def stop():
+            for worker in workers:
+                worker.cancel()
+            await asyncio.gather(*workers, return_exceptions=True)
+
+        async def generate():
+            chunk_id, max_rtf = 0, 0.0
+            try:
+                for _ in turns:
+                    index, data, rtf = await results.get()
+                    if isinstance(data, Exception):
+                        raise data
+                    max_rtf = max(max_rtf, rtf)
+                    mixer.complete(index, np.frombuffer(data, dtype='<i2'))
+                    for block in mixer.take(final=mixer.n_mixed == len(turns)):
+                        yield self._chunk(block, chunk_id, max_rtf)
+                        chunk_id += 1
+            finally:
+                await stop()
+
+        return PipelinedResultGenerator(generate(), stop)
+
+    def close(self):
+        for pool in self.synthesizers.values():
+            for synthesizer in pool:
+                synthesizer.close()
+
+    async def aclose(self):
+        for pool in self.synthesizers.values():
+            for synthesizer in pool:
+                await synthesizer.aclose()
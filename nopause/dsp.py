@@ -0,0 +1,385 @@
+""" Streaming audio post-processing over AudioChunk streams.
+
+Processors work on float32 blocks of mono samples in [-1, 1], keep their state
+across chunk boundaries and are composed with `Chain`:
+
+    chain = Chain(DCBlocker(), SilenceTrimmer(), LoudnessNormalizer(), Fade(), Limiter())
+    for chunk in chain.attach(Synthesis.stream(text_iterator)):
+        ...
+
+Requires numpy: pip install nopause[audio]
+"""
+import abc
+from typing import AsyncIterable, Iterable, List, Optional, Union
+
+try:
+    import numpy as np
+except ImportError as e:
+    raise ImportError('nopause.dsp requires numpy, install it with: pip install nopause[audio]') from e
+
+from nopause.core.audio import AudioChunk
+
+_EMPTY = np.zeros(0, dtype=np.float32)
+
+
+def db_to_amplitude(db: float) -> float:
+    return float(10 ** (db / 20))
+
+
+class Processor(abc.ABC):
+    """ Base class of streaming processors.
+
+    `process` may hold samples back (lookahead), which are released by `flush`
+    at the end of the stream or faded out by `flush(interrupted=True)`.
+    """
+    sample_rate: int = 24000
+
+    def setup(self, sample_rate: int):
+        self.sample_rate = sample_rate
+
+    def ms_to_samples(self, ms: float) -> int:
+        return int(self.sample_rate * ms / 1000)
+
+    @abc.abstractmethod
+    def process(self, samples: np.ndarray) -> np.ndarray:
+        """Return the processed samples of a block, possibly fewer or more of them."""
+
+    def flush(self, interrupted: bool = False) -> np.ndarray:
+        return _EMPTY
+
+    def reset(self):
+        pass
+
+
+class DCBlocker(Processor):
+    """ Remove the DC offset with a slowly tracked mean (ramped across each block to avoid steps).
+    """
+    def __init__(self, time_constant_ms: float = 200):
+        self.time_constant_ms = time_constant_ms
+        self.reset()
+
+    def reset(self):
+        self.offset = None
+
+    def process(self, samples: np.ndarray) -> np.ndarray:
+        if len(samples) == 0:
+            return samples
+        mean = float(samples.mean())
+        if self.offset is None:
+            self.offset = mean
+            return samples - mean
+        alpha = min(1.0, len(samples) / self.ms_to_samples(self.time_constant_ms))
+        offset = self.offset + alpha * (mean - self.offset)
+        ramp = np.linspace(self.offset, offset, len(samples), dtype=np.float32)
+        self.offset = offset
+        return samples - ramp
+
+
+class LoudnessNormalizer(Processor):
+    """ Bring the RMS loudness to a target level, looking `lookahead_ms` ahead so the gain is
+    adjusted before loud or quiet passages instead of after them.
+    """
+    def __init__(
+        self,
+        target_dbfs: float = -20.0,
+        max_gain_db: float = 12.0,
+        lookahead_ms: float = 100,
+        time_constant_ms: float = 1000,
+        gate_dbfs: float = -60.0,
+    ):
+        """
+        Args:
+            target_dbfs: The target RMS level.
+            max_gain_db: The maximum gain (quiet audio is not amplified beyond it).
+            lookahead_ms: The held-back audio used to measure the upcoming loudness.
+            time_constant_ms: How fast the measured loudness follows the signal.
+            gate_dbfs: Blocks quieter than this (silence) do not update the loudness.
+        """
+        self.target = db_to_amplitude(target_dbfs)
+        self.max_gain = db_to_amplitude(max_gain_db)
+        self.lookahead_ms = lookahead_ms
+        self.time_constant_ms = time_constant_ms
+        self.gate = db_to_amplitude(gate_dbfs) ** 2
+        self.reset()
+
+    def reset(self):
+        self.buffer = _EMPTY
+        self.energy = None
+        self.gain = 1.0
+
+    def _update(self, samples: np.ndarray) -> float:
+        if len(samples):
+            energy = float(np.dot(samples, samples)) / len(samples)
+            if energy > self.gate:
+                if self.energy is None:
+                    self.energy = energy
+                else:
+                    alpha = min(1.0, len(samples) / self.ms_to_samples(self.time_constant_ms))
+                    self.energy += alpha * (energy - self.energy)
+        if self.energy is None:
+            return self.gain
+        return min(self.max_gain, self.target / np.sqrt(self.energy))
+
+    def _apply(self, samples: np.ndarray, gain: float) -> np.ndarray:
+        ramp = np.linspace(self.gain, gain, len(samples), dtype=np.float32)
+        self.gain = gain
+        return samples * ramp
+
+    def process(self, samples: np.ndarray) -> np.ndarray:
+        lookahead = self.ms_to_samples(self.lookahead_ms)
+        gain = self._update(samples)
+        self.buffer = np.concatenate([self.buffer, samples])
+        if len(self.buffer) <= lookahead:
+            return _EMPTY
+        ready, self.buffer = self.buffer[:len(self.buffer) - lookahead], self.buffer[len(self.buffer) - lookahead:]
+        return self._apply(ready, gain)
+
+    def flush(self, interrupted: bool = False) -> np.ndarray:
+        ready, self.buffer = self.buffer, _EMPTY
+        return self._apply(ready, self.gain)
+
+
+class Fade(Processor):
+    """ Fade in the beginning of the stream, and fade out the held-back `out_ms` when the stream is interrupted.
+    """
+    def __init__(self, in_ms: float = 5, out_ms: float = 20):
+        self.in_ms = in_ms
+        self.out_ms = out_ms
+        self.reset()
+
+    def reset(self):
+        self.position = 0
+        self.buffer = _EMPTY
+
+    def process(self, samples: np.ndarray) -> np.ndarray:
+        n_in = self.ms_to_samples(self.in_ms)
+        if self.position < n_in and len(samples):
+            n = min(n_in - self.position, len(samples))
+            samples = samples.copy()
+            samples[:n] *= np.arange(self.position, self.position + n, dtype=np.float32) / n_in
+        self.position += len(samples)
+
+        n_out = self.ms_to_samples(self.out_ms)
+        if n_out == 0:
+            return samples
+        self.buffer = np.concatenate([self.buffer, samples])
+        if len(self.buffer) <= n_out:
+            return _EMPTY
+        ready, self.buffer = self.buffer[:len(self.buffer) - n_out], self.buffer[len(self.buffer) - n_out:]
+        return ready
+
+    def flush(self, interrupted: bool = False) -> np.ndarray:
+        ready, self.buffer = self.buffer, _EMPTY
+        if interrupted and len(ready):
+            ready = ready * np.linspace(1.0, 0.0, len(ready), dtype=np.float32)
+        return ready
+
+
+class SilenceTrimmer(Processor):
+    """ Drop leading and trailing silence, keeping `keep_ms` of it around the speech.
+
+    Silence inside the stream is held back until it is known not to be trailing.
+    """
+    def __init__(self, threshold_dbfs: float = -50.0, keep_ms: float = 30, leading: bool = True, trailing: bool = True):
+        self.threshold = db_to_amplitude(threshold_dbfs)
+        self.keep_ms = keep_ms
+        self.leading = leading
+        self.trailing = trailing
+        self.reset()
+
+    def reset(self):
+        self.started = not self.leading
+        self.pending = _EMPTY # silence that may turn out to be trailing
+        self.lead = _EMPTY # the last `keep_ms` of leading silence
+
+    def process(self, samples: np.ndarray) -> np.ndarray:
+        keep = self.ms_to_samples(self.keep_ms)
+        voiced = np.flatnonzero(np.abs(samples) > self.threshold)
+        if not self.started:
+            if len(voiced) == 0:
+                self.lead = np.concatenate([self.lead, samples])[-keep:] if keep else _EMPTY
+                return _EMPTY
+            self.started = True
+            start = max(0, len(self.lead) + voiced[0] - keep)
+            samples = np.concatenate([self.lead, samples])[start:]
+            voiced = voiced + len(self.lead) - start
+            self.lead = _EMPTY
+        if not self.trailing:
+            return samples
+        if len(voiced) == 0:
+            self.pending = np.concatenate([self.pending, samples])
+            return _EMPTY
+        end = voiced[-1] + 1
+        ready = np.concatenate([self.pending, samples[:end]])
+        self.pending = samples[end:]
+        return ready
+
+    def flush(self, interrupted: bool = False) -> np.ndarray:
+        keep = self.ms_to_samples(self.keep_ms)
+        ready, self.pending = self.pending[:keep], _EMPTY
+        return ready if self.started else _EMPTY
+
+
+class Limiter(Processor):
+    """ Keep peaks under `threshold_dbfs` with instant attack and a linear release.
+
+    The gain is computed per block of `block_ms` and the release recursion
+    g[k] = min(target[k], g[k-1] + step) is solved with a running minimum.
+    """
+    def __init__(self, threshold_dbfs: float = -1.0, release_ms: float = 50, block_ms: float = 1):
+        self.threshold = db_to_amplitude(threshold_dbfs)
+        self.release_ms = release_ms
+        self.block_ms = block_ms
+        self.reset()
+
+    def reset(self):
+        self.gain = 1.0
+
+    def process(self, samples: np.ndarray) -> np.ndarray:
+        if len(samples) == 0:
+            return samples
+        block = max(1, self.ms_to_samples(self.block_ms))
+        n_blocks = -(-len(samples) // block)
+        padded = np.zeros(n_blocks * block, dtype=np.float32)
+        padded[:len(samples)] = np.abs(samples)
+        peaks = padded.reshape(n_blocks, block).max(axis=1)
+        target = np.minimum(1.0, self.threshold / np.maximum(peaks, 1e-9))
+
+        step = self.block_ms / self.release_ms
+        k = np.arange(1, n_blocks + 1)
+        gains = np.minimum(np.minimum.accumulate(target - k * step) + k * step, self.gain + k * step)
+        self.gain = float(gains[-1])
+
+        out = samples * np.repeat(gains.astype(np.float32), block)[:len(samples)]
+        return np.clip(out, -self.threshold, self.threshold, out=out)
+
+
+class Chain(Processor):
+    """ A composition of processors, also converting between int16 pcm and float samples.
+    """
+    def __init__(self, *processors: Processor):
+        self.processors: List[Processor] = list(processors)
+        self.template: Optional[AudioChunk] = None
+        self.chunk_id = 0
+
+    def setup(self, sample_rate: int):
+        super().setup(sample_rate)
+        for processor in self.processors:
+            processor.setup(sample_rate)
+
+    def reset(self):
+        self.template = None
+        self.chunk_id = 0
+        for processor in self.processors:
+            processor.reset()
+
+    def process(self, samples: np.ndarray) -> np.ndarray:
+        for processor in self.processors:
+            samples = processor.process(samples)
+        return samples
+
+    def flush(self, interrupted: bool = False) -> np.ndarray:
+        samples = _EMPTY
+        for processor in self.processors:
+            samples = processor.process(samples) if len(samples) else _EMPTY
+            samples = np.concatenate([samples, processor.flush(interrupted)])
+        return samples
+
+    def _to_chunk(self, samples: np.ndarray) -> Optional[AudioChunk]:
+        if len(samples) == 0:
+            return None
+        data = (np.clip(samples, -1.0, 32767 / 32768) * 32768).astype('<i2').tobytes()
+        chunk = AudioChunk(
+            data=data,
+            chunk_id=self.chunk_id,
+            sample_rate=self.template.sample_rate,
+            channels=self.template.channels,
+            rtf=self.template.rtf,
+            chunk_size_us=len(samples) * 1000000 // self.template.sample_rate,
+        )
+        self.chunk_id += 1
+        return chunk
+
+    def process_chunk(self, chunk: AudioChunk) -> Optional[AudioChunk]:
+        if self.template is None:
+            self.setup(chunk.sample_rate)
+        self.template = chunk
+        samples = np.frombuffer(chunk.data, dtype='<i2').astype(np.float32) / 32768
+        return self._to_chunk(self.process(samples))
+
+    def flush_chunk(self, interrupted: bool = False) -> Optional[AudioChunk]:
+        if self.template is None:
+            return None
+        return self._to_chunk(self.flush(interrupted))
+
+    def attach(self, result_generator) -> 'ProcessedResultGenerator':
+        """
+        Process the chunks of a (sync or async) result generator, see ProcessedResultGenerator.
+        The state of the previous stream is reset: a chain processes one stream at a time.
+        """
+        self.reset()
+        return ProcessedResultGenerator(result_generator, self)
+
+
+class ProcessedResultGenerator:
+    """ Wrap a result generator (SynthesisResultGenerator or any chunk iterator) with a processing chain.
+
+    It is iterated like the wrapped generator. `terminate`/`aterminate` stop the wrapped
+    generator and return the held-back audio faded out (or None) for playing the interruption smoothly.
+    """
+    def __init__(self, result_generator: Union[Iterable[AudioChunk], AsyncIterable[AudioChunk]], chain: Chain):
+        self.result_generator = result_generator
+        self.chain = chain
+        self.use_async = hasattr(result_generator, '__anext__')
+        self.iterator = None
+        self.is_end = False
+
+    def __next__(self):
+        if self.iterator is None:
+            self.iterator = iter(self.result_generator)
+        while not self.is_end:
+            try:
+                chunk = next(self.iterator)
+            except StopIteration:
+                self.is_end = True
+                chunk = self.chain.flush_chunk()
+                if chunk is not None:
+                    return chunk
+                break
+            chunk = self.chain.process_chunk(chunk)
+            if chunk is not None:
+                return chunk
+        raise StopIteration
+
+    async def __anext__(self):
+        while not self.is_end:
+            try:
+                chunk = await self.result_generator.__anext__()
+            except StopAsyncIteration:
+                self.is_end = True
+                chunk = self.chain.flush_chunk()
+                if chunk is not None:
+                    return chunk
+                break
+            chunk = self.chain.process_chunk(chunk)
+            if chunk is not None:
+                return chunk
+        raise StopAsyncIteration
+
+    def __iter__(self):
+        return self
+
+    def __aiter__(self):
+        return self
+
+    def terminate(self) -> Optional[AudioChunk]:
+        self.is_end = True
+        if hasattr(self.result_generator, 'terminate'):
+            self.result_generator.terminate()
+        return self.chain.flush_chunk(interrupted=True)
+
+    async def aterminate(self) -> Optional[AudioChunk]:
+        self.is_end = True
+        if hasattr(self.result_generator, 'aterminate'):
+            await self.result_generator.aterminate()
+        return self.chain.flush_chunk(interrupted=True)
@@ -0,0 +1,523 @@
+""" Playback sinks for synthesized audio.
+
+All sinks share a preallocated single-producer/single-consumer ring buffer: the
+producer (`write`/`awrite`) copies chunk data in, and the device side (a real-time
+callback or a thread) copies blocks out through memoryviews, zero-filling short
+blocks from a preallocated silence buffer, so no audio buffer is allocated on the
+device side. Underruns (device found too little data) and overruns (producer found
+the ring full) are counted.
+
+    import nopause
+    from nopause.playback import play
+
+    sink = play(nopause.Synthesis.stream(text_iterator))         # sync
+    sink = await play(await nopause.Synthesis.astream(text_aiter)) # async
+    print(sink.underruns, sink.overruns)
+
+By default `play` starts the device through an adaptive `JitterBuffer`: as soon as the
+buffered audio covers the predicted gap until the next chunk (from the server rtf, the
+chunk durations and the observed arrival times), and it rebuffers to a deeper target
+after an underrun.
+"""
+import abc
+import time
+import wave
+import asyncio
+import threading
+from typing import AsyncIterable, Awaitable, Callable, Iterable, Optional, Union
+
+from nopause.core.audio import AudioChunk
+
+
+class RingBuffer:
+    """ A preallocated byte ring buffer for exactly one writer thread and one reader thread.
+
+    The read/write positions are monotonically increasing counters, each updated by one
+    side only after its copy is complete, so no lock is needed under the GIL. The writer
+    clears the buffer by publishing a position the reader skips to on its next read.
+    """
+    def __init__(self, capacity: int):
+        self.capacity = capacity
+        self._buffer = bytearray(capacity)
+        self._view = memoryview(self._buffer)
+        self._read = 0
+        self._write = 0
+        self._clear_to = 0 # set by the writer, only the reader moves `_read`
+
+    def available(self) -> int:
+        return self._write - max(self._read, self._clear_to)
+
+    def space(self) -> int:
+        return self.capacity - (self._write - self._read)
+
+    def write(self, data) -> int:
+        """Copy as much of `data` as fits, return the number of bytes written."""
+        data = memoryview(data).cast('B')
+        n = min(len(data), self.space())
+        start = self._write % self.capacity
+        first = min(n, self.capacity - start)
+        self._view[start:start + first] = data[:first]
+        if n > first:
+            self._view[:n - first] = data[first:n]
+        self._write += n
+        return n
+
+    def read_into(self, out: memoryview) -> int:
+        """Copy up to len(out) bytes into `out`, return the number of bytes read."""
+        clear_to = self._clear_to
+        if clear_to > self._read:
+            self._read = clear_to
+        n = min(len(out), self._write - self._read)
+        start = self._read % self.capacity
+        first = min(n, self.capacity - start)
+        out[:first] = self._view[start:start + first]
+        if n > first:
+            out[first:n] = self._view[:n - first]
+        self._read += n
+        return n
+
+    def clear(self):
+        """Drop the buffered data (writer side), the reader skips it on its next read."""
+        self._clear_to = self._write
+
+
+class JitterBuffer:
+    """ An adaptive playout target, in seconds of buffered audio.
+
+    The gap until the next chunk is predicted from the server rtf times the chunk duration
+    and from the smoothed inter-arrival time (plus its deviation). The target is that gap
+    times `safety`, plus a margin that grows after each underrun and decays again once the
+    stream has been steady for `steady_seconds`.
+    """
+    def __init__(
+        self,
+        min_seconds: float = 0.02,
+        max_seconds: float = 2.0,
+        safety: float = 1.2,
+        steady_seconds: float = 3.0,
+        decay: float = 0.8,
+        alpha: float = 0.25,
+    ):
+        """
+        Args:
+            min_seconds: The minimum target.
+            max_seconds: The maximum target.
+            safety: The factor applied to the predicted gap.
+            steady_seconds: The time without underrun after which the margin is decayed.
+            decay: The factor applied to the margin for every steady period.
+            alpha: The smoothing factor of the arrival statistics.
+        """
+        self.min_seconds = min_seconds
+        self.max_seconds = max_seconds
+        self.safety = safety
+        self.steady_seconds = steady_seconds
+        self.decay = decay
+        self.alpha = alpha
+        self.margin = 0.0
+        self.gap_mean = None
+        self.gap_deviation = 0.0
+        self.production = 0.0 # rtf * duration of the last chunk
+        self.last_arrival = None
+        self.last_change = None
+
+    def on_chunk(self, chunk: AudioChunk, arrival: float = None):
+        arrival = time.perf_counter() if arrival is None else arrival
+        if self.last_arrival is not None:
+            gap = arrival - self.last_arrival
+            if self.gap_mean is None:
+                self.gap_mean = gap
+            else:
+                self.gap_deviation += self.alpha * (abs(gap - self.gap_mean) - self.gap_deviation)
+                self.gap_mean += self.alpha * (gap - self.gap_mean)
+        self.last_arrival = arrival
+        self.production = chunk.rtf * chunk.duration
+        if self.last_change is None:
+            self.last_change = arrival
+        elif arrival - self.last_change >= self.steady_seconds:
+            self.margin *= self.decay
+            self.last_change = arrival
+
+    def on_underrun(self, now: float = None):
+        self.margin = min(self.max_seconds, self.margin + max(self.predicted_gap(), self.min_seconds))
+        self.last_change = time.perf_counter() if now is None else now
+
+    def predicted_gap(self) -> float:
+        gap = self.production
+        if self.gap_mean is not None:
+            gap = max(gap, self.gap_mean + 2 * self.gap_deviation)
+        return gap
+
+    def target_seconds(self) -> float:
+        return min(self.max_seconds, max(self.min_seconds, self.predicted_gap() * self.safety + self.margin))
+
+    def ready(self, buffered_seconds: float) -> bool:
+        return buffered_seconds >= self.target_seconds()
+
+
+class Sink(abc.ABC):
+    """ Base class of playback sinks, 16-bit pcm.
+
+    Subclasses start their device in `open` and call `fill` for every device block.
+    """
+    def __init__(self, sample_rate: int = 24000, channels: int = 1, blocksize: int = 960, buffer_seconds: float = 2.0):
+        """
+        Args:
+            sample_rate: The sample rate of the audio.
+            channels: The number of channels.
+            blocksize: The number of frames per device block.
+            buffer_seconds: The capacity of the ring buffer in seconds.
+        """
+        self.sample_rate = sample_rate
+        self.channels = channels
+        self.blocksize = blocksize
+        self.block_bytes = blocksize * channels * 2
+        self.ring = RingBuffer(max(int(buffer_seconds * sample_rate) * channels * 2, 2 * self.block_bytes))
+        self._silence = memoryview(bytes(self.block_bytes))
+        self.underruns = 0
+        self.overruns = 0
+        self.started = False
+        self.finished = False # no more data will be written
+        # after an underrun, output silence until `resume_bytes` are buffered again (0: resume at once)
+        self.resume_bytes = 0
+        self.rebuffering = False
+        self.drained = threading.Event()
+
+    @property
+    def block_duration(self) -> float:
+        return self.blocksize / self.sample_rate
+
+    def buffered_seconds(self) -> float:
+        return self.ring.available() / (self.sample_rate * self.channels * 2)
+
+    def set_target(self, seconds: float):
+        self.resume_bytes = min(int(seconds * self.sample_rate) * self.channels * 2, self.ring.capacity)
+
+    def _fill_silence(self, out: memoryview):
+        # a block larger than `blocksize` is zero-filled in pieces of the silence buffer
+        silence = self._silence
+        start = 0
+        while start < len(out):
+            end = min(len(out), start + len(silence))
+            out[start:end] = silence[:end - start]
+            start = end
+
+    def fill(self, out) -> int:
+        """Fill a device block from the ring (real-time safe), return the number of audio bytes."""
+        out = memoryview(out).cast('B')
+        if self.rebuffering:
+            if self.ring.available() < self.resume_bytes and not self.finished:
+                self._fill_silence(out)
+                return 0
+            self.rebuffering = False
+        n = self.ring.read_into(out)
+        if n < len(out):
+            self._fill_silence(out[n:])
+            if self.finished:
+                self.drained.set()
+            else:
+                self.underruns += 1
+                self.rebuffering = self.resume_bytes > 0
+        return n
+
+    @abc.abstractmethod
+    def open(self):
+        """Start the device, which calls `fill` for every block."""
+
+    def close(self):
+        pass
+
+    def start(self):
+        if not self.started:
+            self.started = True
+            self.open()
+        return self
+
+    def write(self, data: bytes):
+        """Write audio, blocking while the ring is full."""
+        data = memoryview(data).cast('B')
+        written = self.ring.write(data)
+        if written < len(data):
+            self.overruns += 1
+            self.start() # a full ring has to be consumed
+            while written < len(data):
+                time.sleep(self.block_duration / 2)
+                written += self.ring.write(data[written:])
+
+    async def awrite(self, data: bytes):
+        """Write audio, waiting asynchronously while the ring is full."""
+        data = memoryview(data).cast('B')
+        written = self.ring.write(data)
+        if written < len(data):
+            self.overruns += 1
+            self.start()
+            while written < len(data):
+                await asyncio.sleep(self.block_duration / 2)
+                written += self.ring.write(data[written:])
+
+    def finish(self):
+        self.finished = True
+        if self.ring.available() == 0 and not self.started:
+            self.drained.set()
+
+    def drain(self, timeout: float = None):
+        """Wait until all written audio has been played, then close the sink."""
+        self.finish()
+        self.start()
+        self.drained.wait(timeout)
+        self.close()
+
+    async def adrain(self):
+        self.finish()
+        self.start()
+        while not self.drained.is_set():
+            await asyncio.sleep(self.block_duration)
+        self.close()
+
+    def stop(self):
+        """Stop at once, dropping buffered audio (e.g. on interrupt)."""
+        self.ring.clear()
+        self.finish()
+        self.drained.set()
+        self.close()
+
+
+class SoundDeviceSink(Sink):
+    """ Play through sounddevice (pip install sounddevice) with a RawOutputStream callback.
+    """
+    def __init__(self, *args, device=None, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.device = device
+        self.stream = None
+
+    def open(self):
+        import sounddevice as sd
+
+        def callback(outdata, frames, time, status):
+            self.fill(outdata)
+
+        self.stream = sd.RawOutputStream(
+            samplerate=self.sample_rate, blocksize=self.blocksize,
+            device=self.device if self.device is not None else sd.query_devices(kind='output')['index'],
+            channels=self.channels, dtype='int16',
+            callback=callback,
+        )
+        self.stream.start()
+
+    def close(self):
+        if self.stream is not None:
+            self.stream.stop()
+            self.stream.close()
+            self.stream = None
+
+
+class PyAudioSink(Sink):
+    """ Play through PyAudio (pip install pyaudio) with a stream callback.
+
+    PyAudio requires the callback to return a bytes object, so one bytes copy of the
+    block is made per callback; the ring and the block are still preallocated.
+    """
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._block = bytearray(self.block_bytes)
+        self._block_view = memoryview(self._block)
+        self.pyaudio = None
+        self.stream = None
+
+    def open(self):
+        import pyaudio
+
+        def callback(in_data, frame_count, time_info, status):
+            n_bytes = frame_count * self.channels * 2
+            if n_bytes > len(self._block):
+                # PortAudio asked for more than frames_per_buffer: the block grows once, to the largest request
+                self._block = bytearray(n_bytes)
+                self._block_view = memoryview(self._block)
+            view = self._block_view[:n_bytes]
+            self.fill(view)
+            return bytes(view), pyaudio.paContinue
+
+        self.pyaudio = pyaudio.PyAudio()
+        self.stream = self.pyaudio.open(
+            format=pyaudio.paInt16,
+            channels=self.channels,
+            rate=self.sample_rate,
+            output=True,
+            frames_per_buffer=self.blocksize,
+            stream_callback=callback,
+        )
+        self.stream.start_stream()
+
+    def close(self):
+        if self.stream is not None:
+            self.stream.stop_stream()
+            self.stream.close()
+            self.pyaudio.terminate()
+            self.stream = None
+
+
+class _ThreadSink(Sink):
+    """ A sink consumed by a thread, either paced like a device (realtime) or as fast as possible.
+    """
+    def __init__(self, *args, realtime: bool = False, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.realtime = realtime
+        self._block = bytearray(self.block_bytes)
+        self._block_view = memoryview(self._block)
+        self._closed = threading.Event()
+        self._thread = None
+
+    @abc.abstractmethod
+    def consume(self, block: memoryview):
+        """Handle a block of audio read from the ring."""
+
+    def _run(self):
+        deadline = time.perf_counter()
+        while not self._closed.is_set():
+            if self.realtime:
+                n = self.fill(self._block_view)
+                self.consume(self._block_view)
+                deadline += self.block_duration
+                time.sleep(max(0.0, deadline - time.perf_counter()))
+            else:
+                n = self.ring.read_into(self._block_view)
+                if n:
+                    self.consume(self._block_view[:n])
+                elif self.finished:
+                    self.drained.set()
+                    self._closed.wait(self.block_duration)
+                else:
+                    time.sleep(self.block_duration / 4)
+
+    def open(self):
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def close(self):
+        self._closed.set()
+        if self._thread is not None and self._thread is not threading.current_thread():
+            self._thread.join()
+            self._thread = None
+
+
+class NullSink(_ThreadSink):
+    """ Discard the audio, paced in real time by default (for tests and measurements).
+    """
+    def __init__(self, *args, realtime: bool = True, **kwargs):
+        super().__init__(*args, realtime=realtime, **kwargs)
+        self.played_bytes = 0
+
+    def consume(self, block: memoryview):
+        self.played_bytes += len(block)
+
+
+class WavFileSink(_ThreadSink):
+    """ Write the audio to a wav file, as fast as possible by default.
+    """
+    def __init__(self, path: str, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.path = path
+        self.wav = None
+
+    def open(self):
+        self.wav = wave.open(self.path, 'wb')
+        self.wav.setnchannels(self.channels)
+        self.wav.setsampwidth(2)
+        self.wav.setframerate(self.sample_rate)
+        super().open()
+
+    def consume(self, block: memoryview):
+        self.wav.writeframesraw(block)
+
+    def close(self):
+        super().close()
+        if self.wav is not None:
+            self.wav.close()
+            self.wav = None
+
+
+def _create_sink(sink: Union[Sink, Callable[..., Sink], None], chunk: AudioChunk) -> Sink:
+    if isinstance(sink, Sink):
+        return sink
+    factory = sink if sink is not None else SoundDeviceSink
+    return factory(sample_rate=chunk.sample_rate, channels=chunk.channels)
+
+class _Playout:
+    """Decide when the sink starts, with a fixed number of chunks or a jitter buffer."""
+    def __init__(self, sink: Sink, prebuffer_chunks: Optional[int], jitter_buffer: Optional[JitterBuffer]):
+        self.sink = sink
+        self.prebuffer_chunks = prebuffer_chunks
+        self.jitter_buffer = jitter_buffer if jitter_buffer is not None or prebuffer_chunks is not None else JitterBuffer()
+        self.n_chunks = 0
+        self.underruns = 0
+
+    def on_chunk(self, chunk: AudioChunk):
+        self.n_chunks += 1
+        sink = self.sink
+        if self.jitter_buffer is None:
+            if self.n_chunks >= self.prebuffer_chunks:
+                sink.start()
+            return
+        self.jitter_buffer.on_chunk(chunk)
+        if sink.underruns != self.underruns:
+            self.underruns = sink.underruns
+            self.jitter_buffer.on_underrun()
+        # the device consumes whole blocks, so less than one block is never enough
+        target = max(self.jitter_buffer.target_seconds(), sink.block_duration)
+        sink.set_target(target)
+        if not sink.started and sink.buffered_seconds() >= target:
+            sink.start()
+
+def _play(result_generator: Iterable[AudioChunk], sink, prebuffer_chunks, jitter_buffer) -> Optional[Sink]:
+    playout = None
+    try:
+        for chunk in result_generator:
+            if playout is None:
+                playout = _Playout(_create_sink(sink, chunk), prebuffer_chunks, jitter_buffer)
+            playout.sink.write(chunk.data)
+            playout.on_chunk(chunk)
+        if playout is None:
+            return None
+        playout.sink.drain()
+        return playout.sink
+    finally:
+        # the synthesis failed or the playback was interrupted: the device is not left running
+        if playout is not None and not playout.sink.drained.is_set():
+            playout.sink.stop()
+
+async def _aplay(result_generator: AsyncIterable[AudioChunk], sink, prebuffer_chunks, jitter_buffer) -> Optional[Sink]:
+    playout = None
+    try:
+        async for chunk in result_generator:
+            if playout is None:
+                playout = _Playout(_create_sink(sink, chunk), prebuffer_chunks, jitter_buffer)
+            await playout.sink.awrite(chunk.data)
+            playout.on_chunk(chunk)
+        if playout is None:
+            return None
+        await playout.sink.adrain()
+        return playout.sink
+    finally:
+        if playout is not None and not playout.sink.drained.is_set():
+            playout.sink.stop()
+
+def play(
+    result_generator: Union[Iterable[AudioChunk], AsyncIterable[AudioChunk]],
+    sink: Union[Sink, Callable[..., Sink], None] = None,
+    prebuffer_chunks: int = None,
+    jitter_buffer: JitterBuffer = None,
+) -> Union[Optional[Sink], Awaitable[Optional[Sink]]]:
+    """
+    Play a result generator until all audio is played.
+    Args:
+        result_generator: A sync or async iterator of AudioChunk (e.g. from Synthesis.stream/astream).
+        sink: A Sink, a sink class/factory called with (sample_rate, channels) of the first chunk,
+            or None for SoundDeviceSink.
+        prebuffer_chunks: Start the device after a fixed number of chunks instead of using a jitter buffer.
+        jitter_buffer: The JitterBuffer deciding when to start and how deep to rebuffer
+            (a default one is used unless prebuffer_chunks is given).
+    Returns:
+        The sink (with its underrun/overrun counters), or an awaitable of it for async generators.
+    """
+    if hasattr(result_generator, '__anext__'):
+        return _aplay(result_generator, sink, prebuffer_chunks, jitter_buffer)
+    return _play(result_generator, sink, prebuffer_chunks, jitter_buffer)
@@ -0,0 +1,38 @@
+""" Record synthesis sessions and replay them offline.
+
+Record real traffic:
+    recorder = SessionRecorder('sessions.nprec')
+    Synthesis(recorder=recorder).stream(text_iterator)
+
+Replay it at the original speed, or --speed 2 / --speed max:
+    python -m nopause.recording replay sessions.nprec --port 8765
+
+Or synthesize without a recording against FakeSynthesisServer (tests and benchmarks).
+"""
+from typing import TYPE_CHECKING
+
+from .._lazy import lazy_module
+
+if TYPE_CHECKING:
+    from .recorder import SessionRecorder, RecordedFrame, read_recording
+    from .replay import ReplayServer
+    from .fake import FakeSynthesisServer
+
+# Loaded on first access, recording does not need websockets
+_LAZY_ATTRS = {
+    "SessionRecorder": ".recorder",
+    "RecordedFrame": ".recorder",
+    "read_recording": ".recorder",
+    "ReplayServer": ".replay",
+    "FakeSynthesisServer": ".fake",
+}
+
+__getattr__, __dir__ = lazy_module(__name__, _LAZY_ATTRS)
+
+__all__ = [
+    "SessionRecorder",
+    "RecordedFrame",
+    "read_recording",
+    "ReplayServer",
+    "FakeSynthesisServer",
+]
@@ -0,0 +1,45 @@
+""" Inspect or replay session recordings: python -m nopause.recording --help
+"""
+import asyncio
+import argparse
+
+from nopause.recording.recorder import SEND, RECV
+from nopause.recording.replay import ReplayServer, load_connections
+
+
+def info(path: str):
+    for index, frames in enumerate(load_connections(path)):
+        start = frames[0].timestamp_ns
+        sends = [frame for frame in frames if frame.kind == SEND]
+        recvs = [frame for frame in frames if frame.kind == RECV]
+        duration = (frames[-1].timestamp_ns - start) / 1e6
+        # the first audio of the connection, counted from the first text after the BOS
+        ttfa = (recvs[0].timestamp_ns - sends[1].timestamp_ns) / 1e6 if len(sends) > 1 and recvs else float('nan')
+        print(f'#{index} {frames[0].payload.decode()}: {len(sends)} sent, {len(recvs)} received, '
+              f'{duration:.1f} ms, first audio after {ttfa:.1f} ms')
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog='python -m nopause.recording', description='Inspect or replay NoPause session recordings.')
+    commands = parser.add_subparsers(dest='command', required=True)
+    info_parser = commands.add_parser('info', help='summarize the connections of a recording')
+    info_parser.add_argument('path')
+    replay_parser = commands.add_parser('replay', help='serve a recording as a websocket server')
+    replay_parser.add_argument('path')
+    replay_parser.add_argument('--speed', default='1', help="replay speed factor, or 'max' for no delays")
+    replay_parser.add_argument('--host', default='localhost')
+    replay_parser.add_argument('--port', type=int, default=8765)
+    args = parser.parse_args(argv)
+
+    if args.command == 'info':
+        return info(args.path)
+
+    speed = None if args.speed == 'max' else float(args.speed)
+    server = ReplayServer(args.path, speed=speed, host=args.host, port=args.port)
+    print(f'Set NO_PAUSE_WS_PROTOCOL=ws NO_PAUSE_API_BASE={server.api_base} to use it.', flush=True)
+    try:
+        asyncio.run(server.serve_forever())
+    except KeyboardInterrupt:
+        pass
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,156 @@
+""" An in-process stand-in for the NoPause dual-stream websocket API, for the tests and the benchmarks.
+
+Every text frame is answered with `ms_per_char` milliseconds of audio per character, after
+a simulated synthesis delay, and the connection can be dropped once to test reconnects.
+"""
+import os
+import json
+import base64
+import random
+import asyncio
+import threading
+
+import websockets
+
+
+class FakeSynthesisServer:
+    """ A websocket server synthesizing silence-like audio for every text it receives.
+
+    Usage:
+        with FakeSynthesisServer(rtf=0.2, first_chunk_delay=0.1) as server:
+            server.configure_env()
+            for chunk in nopause.Synthesis.stream(text_iterator): ...
+    """
+    def __init__(
+        self,
+        host: str = 'localhost',
+        port: int = 0,
+        first_chunk_delay: float = 0.0,
+        rtf: float = 0.0,
+        ms_per_char: int = 10,
+        drop_after_ms: int = None,
+        tail_probability: float = 0.0,
+        tail_delay: float = 0.0,
+        seed: int = 0,
+        handshake_delay: float = 0.0,
+    ):
+        """
+        Args:
+            host: The host to listen on.
+            port: The port to listen on (0 picks a free port).
+            first_chunk_delay: Seconds to wait before the first audio chunk of a session.
+            rtf: The simulated real time factor, each chunk is delayed by rtf * its duration.
+            ms_per_char: Milliseconds of audio produced per character of text.
+            drop_after_ms: Abort the connection once, after sending this many milliseconds of audio in total.
+            tail_probability: The share of the sessions whose first chunk is delayed by `tail_delay` more.
+            tail_delay: Seconds of the extra delay of the slow sessions (server-side queueing).
+            seed: The seed of the slow session draws.
+            handshake_delay: Seconds to hold the opening handshake (the network distance of the endpoint).
+        """
+        self.host = host
+        self.port = port
+        self.first_chunk_delay = first_chunk_delay
+        self.rtf = rtf
+        self.ms_per_char = ms_per_char
+        self.drop_after_ms = drop_after_ms
+        self.tail_probability = tail_probability
+        self.tail_delay = tail_delay
+        self.random = random.Random(seed)
+        self.handshake_delay = handshake_delay
+        self.sessions = 0
+        self.sent_ms = 0
+        self.dropped = False
+        self._loop = None
+        self._thread = None
+        self._stop = None
+
+    @property
+    def api_base(self):
+        return f'{self.host}:{self.port}'
+
+    def configure_env(self):
+        """Point the SDK at this server (plain ws, no TLS)."""
+        os.environ['NO_PAUSE_WS_PROTOCOL'] = 'ws'
+        os.environ['NO_PAUSE_API_BASE'] = self.api_base
+        os.environ.setdefault('NO_PAUSE_API_KEY', 'fake-api-key')
+        return self
+
+    async def handler(self, ws, path=None):
+        try:
+            bos = json.loads(await ws.recv())
+        except websockets.ConnectionClosed:
+            return # a probe, closed right after the handshake
+        self.sessions += 1
+        sample_rate = bos['audio_config']['sample_rate_hertz']
+        chunk_id = 0
+        session_start = True
+        try:
+            async for message in ws:
+                content = json.loads(message)['content']
+                text = content['text']
+                if text:
+                    n_samples = len(text) * self.ms_per_char * sample_rate // 1000
+                    chunk_size_us = n_samples * 1000000 // sample_rate
+                    delay = chunk_size_us / 1e6 * self.rtf
+                    if chunk_id == 0:
+                        delay += self.first_chunk_delay
+                    if session_start:
+                        session_start = False
+                        if self.random.random() < self.tail_probability:
+                            delay += self.tail_delay
+                    if delay > 0:
+                        await asyncio.sleep(delay)
+                    await ws.send(json.dumps({
+                        'code': 0,
+                        'status': 'ok',
+                        'audio_content': base64.b64encode(b'\x10\x00' * n_samples).decode(),
+                        'tts_response_chunk_meta': {'chunk_id': chunk_id, 'rtf': self.rtf, 'chunk_size_us': chunk_size_us},
+                        'is_end': False,
+                    }))
+                    chunk_id += 1
+                    self.sent_ms += chunk_size_us // 1000
+                    if self.drop_after_ms is not None and not self.dropped and self.sent_ms >= self.drop_after_ms:
+                        self.dropped = True
+                        # simulate a network failure: no close frame
+                        ws.transport.abort()
+                        await ws.wait_closed()
+                        return
+                if content['is_end']:
+                    session_start = True
+                    await ws.send(json.dumps({'code': 0, 'status': 'ok', 'audio_content': '', 'tts_response_chunk_meta': None, 'is_end': True}))
+        except websockets.ConnectionClosed:
+            pass
+
+    async def delay_handshake(self, path, request_headers):
+        if self.handshake_delay > 0:
+            await asyncio.sleep(self.handshake_delay)
+
+    def start(self):
+        ready = threading.Event()
+
+        async def serve():
+            self._stop = asyncio.Event()
+            async with websockets.serve(self.handler, self.host, self.port, process_request=self.delay_handshake) as server:
+                self.port = server.sockets[0].getsockname()[1]
+                ready.set()
+                await self._stop.wait()
+
+        def run():
+            self._loop = asyncio.new_event_loop()
+            self._loop.run_until_complete(serve())
+            self._loop.close()
+
+        self._thread = threading.Thread(target=run, daemon=True)
+        self._thread.start()
+        ready.wait()
+        return self
+
+    def stop(self):
+        self._loop.call_soon_threadsafe(self._stop.set)
+        self._thread.join()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
@@ -0,0 +1,96 @@
+""" Record the websocket frames of synthesis sessions to an append-only file.
+
+A recording is a magic header followed by records of
+    kind (1 byte) | connection (4 bytes) | monotonic time in ns (8 bytes) | length (4 bytes) | payload
+where kind is OPEN (payload: the api url), SEND (client -> server), RECV (server -> client) or CLOSE.
+"""
+import os
+import time
+import struct
+import threading
+from typing import BinaryIO, Iterator, NamedTuple
+
+from nopause.sdk.error import FormatError
+
+MAGIC = b'NPREC\x01'
+RECORD = struct.Struct('<BIqI')
+
+OPEN = 1
+SEND = 2
+RECV = 3
+CLOSE = 4
+
+
+class RecordedFrame(NamedTuple):
+    kind: int
+    connection: int
+    timestamp_ns: int
+    payload: bytes
+
+
+class SessionRecorder:
+    """ Log every frame sent and received by the connections of Synthesis instances.
+
+    Usage:
+        recorder = SessionRecorder('sessions.nprec')
+        synthesizer = Synthesis(recorder=recorder)
+        ...
+        recorder.close()
+    """
+    def __init__(self, path: str):
+        """
+        Args:
+            path: The recording file, new records are appended to it.
+        """
+        self.path = path
+        self._lock = threading.Lock()
+        self._file: BinaryIO = open(path, 'ab')
+        if self._file.tell() == 0:
+            self._file.write(MAGIC)
+        self._connections = 0
+
+    def _write(self, kind: int, connection: int, payload: bytes):
+        with self._lock:
+            self._file.write(RECORD.pack(kind, connection, time.monotonic_ns(), len(payload)))
+            self._file.write(payload)
+
+    def open(self, api_url: str) -> int:
+        """Start recording a new connection, return its id."""
+        with self._lock:
+            self._connections += 1
+            connection = self._connections
+        self._write(OPEN, connection, api_url.encode())
+        return connection
+
+    def send(self, connection: int, message: str):
+        self._write(SEND, connection, message.encode())
+
+    def recv(self, connection: int, message: str):
+        self._write(RECV, connection, message.encode() if isinstance(message, str) else message)
+
+    def close_connection(self, connection: int):
+        self._write(CLOSE, connection, b'')
+        with self._lock:
+            self._file.flush()
+
+    def close(self):
+        with self._lock:
+            if not self._file.closed:
+                self._file.close()
+
+
+def read_recording(path: str) -> Iterator[RecordedFrame]:
+    """Iterate the frames of a recording file in the order they were recorded."""
+    with open(path, 'rb') as f:
+        if f.read(len(MAGIC)) != MAGIC:
+            raise FormatError(f'{path} is not a NoPause session recording.')
+        size = os.fstat(f.fileno()).st_size
+        while f.tell() < size:
+            header = f.read(RECORD.size)
+            if len(header) < RECORD.size:
+                break # truncated by a crash while recording
+            kind, connection, timestamp_ns, length = RECORD.unpack(header)
+            payload = f.read(length)
+            if len(payload) < length:
+                break
+            yield RecordedFrame(kind, connection, timestamp_ns, payload)
@@ -0,0 +1,163 @@
+""" Serve recorded sessions back to a client, without network access or an API key.
+
+Each incoming connection replays the next recorded one. A recorded server frame is sent once
+the client has sent as many frames as had been sent before it in the recording, after the
+recorded delay since the last of them (divided by `speed`), so the traffic keeps its shape
+even when the client is faster or slower than the recorded one.
+"""
+import os
+import time
+import asyncio
+import threading
+from typing import Dict, List, Optional
+
+import websockets
+
+from nopause.sdk.error import NoPauseError
+from nopause.recording.recorder import OPEN, SEND, RECV, RecordedFrame, read_recording
+
+
+def load_connections(path: str) -> List[List[RecordedFrame]]:
+    """The frames of each recorded connection, in the order the connections were opened."""
+    connections: Dict[int, List[RecordedFrame]] = {}
+    for frame in read_recording(path):
+        if frame.kind == OPEN:
+            connections[frame.connection] = [frame]
+        elif frame.connection in connections:
+            connections[frame.connection].append(frame)
+    return list(connections.values())
+
+
+class ReplayServer:
+    """ A websocket server replaying a recording at the original, a scaled or the maximum speed.
+
+    Usage:
+        with ReplayServer('sessions.nprec', speed=2.0) as server:
+            server.configure_env()
+            for chunk in nopause.Synthesis.stream(text_iterator): ...
+    """
+    def __init__(
+        self,
+        path: str,
+        speed: Optional[float] = 1.0,
+        host: str = 'localhost',
+        port: int = 0,
+        handshake_delay: float = 0.0,
+    ):
+        """
+        Args:
+            path: The recording file (see SessionRecorder).
+            speed: How much faster than recorded the frames are replayed, None for no delays at all.
+            host: The host to listen on.
+            port: The port to listen on (0 picks a free port).
+            handshake_delay: Seconds to hold the opening handshake, to stand in for a distant endpoint.
+        """
+        self.connections = load_connections(path)
+        if not self.connections:
+            raise NoPauseError(f'No connection recorded in {path}.')
+        self.speed = speed
+        self.host = host
+        self.port = port
+        self.handshake_delay = handshake_delay
+        self.replayed = 0
+        self._loop = None
+        self._thread = None
+        self._stop = None
+
+    @property
+    def api_base(self) -> str:
+        return f'{self.host}:{self.port}'
+
+    def configure_env(self):
+        """Point the SDK at this server (plain ws, no TLS, any api key)."""
+        os.environ['NO_PAUSE_WS_PROTOCOL'] = 'ws'
+        os.environ['NO_PAUSE_API_BASE'] = self.api_base
+        os.environ.setdefault('NO_PAUSE_API_KEY', 'replay')
+        return self
+
+    async def handler(self, ws, path=None):
+        frames = self.connections[self.replayed % len(self.connections)]
+        self.replayed += 1
+        arrivals = [time.monotonic()] # when the client sent its n-th frame, the connection counts as the 0th
+        recorded_sends = [frames[0].timestamp_ns]
+        arrived = asyncio.Event()
+
+        async def receive():
+            try:
+                async for _ in ws:
+                    arrivals.append(time.monotonic())
+                    arrived.set()
+            except websockets.ConnectionClosed:
+                pass
+            arrived.set()
+
+        receiver = asyncio.create_task(receive())
+        try:
+            last_sent = 0.0
+            for frame in frames[1:]:
+                if frame.kind == SEND:
+                    recorded_sends.append(frame.timestamp_ns)
+                    continue
+                if frame.kind != RECV:
+                    continue
+                # wait for the client frames that preceded this one in the recording
+                anchor = len(recorded_sends) - 1
+                while len(arrivals) <= anchor:
+                    if receiver.done():
+                        return
+                    arrived.clear()
+                    await arrived.wait()
+                if self.speed is not None:
+                    delay = (frame.timestamp_ns - recorded_sends[anchor]) / 1e9 / self.speed
+                    wait = max(arrivals[anchor] + delay, last_sent) - time.monotonic()
+                    if wait > 0:
+                        await asyncio.sleep(wait)
+                await ws.send(frame.payload.decode())
+                last_sent = time.monotonic()
+            await receiver
+        except websockets.ConnectionClosed:
+            pass
+        finally:
+            receiver.cancel()
+
+    async def delay_handshake(self, path, request_headers):
+        if self.handshake_delay > 0:
+            await asyncio.sleep(self.handshake_delay)
+        return None # go on with the handshake
+
+    async def serve_forever(self):
+        async with websockets.serve(self.handler, self.host, self.port, process_request=self.delay_handshake) as server:
+            self.port = server.sockets[0].getsockname()[1]
+            print(f'Replaying {len(self.connections)} connection(s) on ws://{self.api_base}', flush=True)
+            await asyncio.Future()
+
+    def start(self):
+        """Serve in a background thread."""
+        ready = threading.Event()
+
+        async def serve():
+            self._stop = asyncio.Event()
+            async with websockets.serve(self.handler, self.host, self.port, process_request=self.delay_handshake) as server:
+                self.port = server.sockets[0].getsockname()[1]
+                ready.set()
+                await self._stop.wait()
+
+        def run():
+            self._loop = asyncio.new_event_loop()
+            self._loop.run_until_complete(serve())
+            self._loop.close()
+
+        self._thread = threading.Thread(target=run, daemon=True)
+        self._thread.start()
+        ready.wait()
+        return self
+
+    def stop(self):
+        self._loop.call_soon_threadsafe(self._stop.set)
+        self._thread.join()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
@@ -1,12 +1,43 @@
-from .error import APIError, InvalidRequestError, NoPauseError
-from .config import AudioConfig, DualStreamConfig, ModelConfig
-from .synthesis import Synthesis
-from .voice import Voice
+from typing import TYPE_CHECKING
+
+from .._lazy import lazy_module
+
+if TYPE_CHECKING:
+    from .error import APIError, InvalidRequestError, NoPauseError
+    from .config import AudioConfig, DualStreamConfig, ModelConfig
+    from .synthesis import Synthesis
+    from .voice import Voice
+    from .pipeline import PipelinedSynthesis
+    from .resilient import ResilientSynthesis
+    from .scheduler import SynthesisScheduler
+    from .hedging import HedgedSynthesis
+
+# Loaded on first access, see nopause/__init__.py
+_LAZY_ATTRS = {
+    "Synthesis": ".synthesis",
+    "Voice": ".voice",
+    "PipelinedSynthesis": ".pipeline",
+    "ResilientSynthesis": ".resilient",
+    "SynthesisScheduler": ".scheduler",
+    "HedgedSynthesis": ".hedging",
+    "AudioConfig": ".config",
+    "ModelConfig": ".config",
+    "DualStreamConfig": ".config",
+    "APIError": ".error",
+    "InvalidRequestError": ".error",
+    "NoPauseError": ".error",
+}
+
+__getattr__, __dir__ = lazy_module(__name__, _LAZY_ATTRS)
 
 
 __all__ = [
     "Synthesis",
     "Voice",
+    "PipelinedSynthesis",
+    "ResilientSynthesis",
+    "SynthesisScheduler",
+    "HedgedSynthesis",
     "AudioConfig",
     "ModelConfig",
     "DualStreamConfig",
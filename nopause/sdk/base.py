@@ -1,9 +1,25 @@
 import os
+import types
+import functools
 import nopause
 
 from nopause.sdk.error import InvalidRequestError, NoPauseError
 
 
+class hybridmethod:
+    """A method bound to the instance when accessed from one, otherwise to the class.
+
+    It lets a name such as `Synthesis.stream` work as both a classmethod and an
+    instance method without creating a per-instance class or bound attribute.
+    """
+    def __init__(self, func):
+        self.__func__ = func
+        functools.update_wrapper(self, func)
+
+    def __get__(self, obj, objtype=None):
+        return types.MethodType(self.__func__, objtype if obj is None else obj)
+
+
 class BaseAPI():
     @staticmethod
     def parse_setting(name, env_name, value):
@@ -20,7 +36,7 @@ class BaseAPI():
                 final_value = env_value
                 parsed_from = 'environment: {}'.format(env_name)
 
-        if final_value is None or final_value.strip() == "":
+        if final_value is None or (final_value.strip() == "" if isinstance(final_value, str) else not final_value):
             raise NoPauseError(f'No {env_name} provided (parsed from {parsed_from}). Set the key by function param or {env_name} environment variable or nopause.{name} first.')
 
         return dict(value=final_value, parsed_from=parsed_from)
@@ -33,6 +49,16 @@ class BaseAPI():
 
         return parsed_api_key, parsed_api_base, parsed_api_version
 
+    @staticmethod
+    def split_api_base(api_base) -> tuple:
+        """The endpoints of an api_base: a list, or a comma separated string (e.g. in NO_PAUSE_API_BASE)."""
+        if isinstance(api_base, str):
+            api_base = api_base.split(',')
+        bases = tuple(base.strip() for base in api_base if base.strip())
+        if not bases:
+            raise NoPauseError(f'No endpoint in api_base {api_base!r}. Set one endpoint, a list or a comma separated string of them.')
+        return bases
+
     @classmethod
     def display_parsed_settings(cls, api_base: str, api_version: str, url: str, error: str = None):
         if error is None:
@@ -2,6 +2,10 @@
 """
 from pydantic import BaseModel, Field, root_validator
 
+DEFAULT_MODEL_NAME = 'nopause-en-beta'
+DEFAULT_VOICE_ID = 'Zoe'
+DEFAULT_LANGUAGE = 'en'
+
 
 class AudioConfig(BaseModel):
     """Control audio behavior.
@@ -12,6 +16,10 @@ class AudioConfig(BaseModel):
     # volume_gain_db: float = 0.0
     sample_rate: int = Field(24000, ge=8000, le=24000, alias='sample_rate_hertz', description="sample rate hertz")
 
+    class Config:
+        # immutable and hashable, so that one instance can be shared by many sessions
+        frozen = True
+
     @root_validator(pre=True)
     def multi_alias(cls, values: dict):
         if 'sample_rate' in values:
@@ -23,6 +31,9 @@ class DualStreamConfig(BaseModel):
     stream_in: bool = True
     stream_out: bool = True
 
+    class Config:
+        frozen = True
+
 class ModelConfig(BaseModel):
     voice_id: str
     model_name: str
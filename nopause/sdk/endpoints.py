@@ -0,0 +1,210 @@
+""" Pick the fastest healthy endpoint when api_base lists several (regions, private links, ...).
+
+A background thread probes every endpoint with a websocket handshake every `probe_interval`
+seconds, and the connections of Synthesis report their own handshakes and failures. New
+connections go to the healthy endpoint with the lowest handshake RTT (a moving average), and
+fail over to the next ones in that order. An endpoint is unhealthy for `cooldown` seconds after
+a failure, and while more than `max_error_rate` of its recent attempts failed.
+
+The selectors are shared by the Synthesis instances with the same endpoints and api key, and
+probe while one of them exists: the probing thread ends with the last one, and resumes with the
+next. `stop_probing()` ends all of them for good (e.g. at shutdown, or where background
+handshakes are unwanted), the connections then only learn from their own handshakes.
+
+    nopause.api_base = ['us-east.api.nopause.io', 'eu-west.api.nopause.io', '10.0.0.12:8080']
+    synthesizer = nopause.Synthesis(voice_id='Zoe').connect()   # the fastest of the three
+    print(synthesizer.endpoints.stats())
+"""
+import time
+import math
+import threading
+from collections import deque
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import websockets.sync.client
+
+
+class EndpointStats:
+    """ What is known of one endpoint.
+    """
+    def __init__(self, url: str, window: int):
+        self.url = url
+        self.rtt: Optional[float] = None # seconds, moving average of the handshakes
+        self.outcomes = deque(maxlen=window) # True for a success
+        self.down_until = 0.0
+
+    @property
+    def error_rate(self) -> float:
+        return self.outcomes.count(False) / len(self.outcomes) if self.outcomes else 0.0
+
+
+class EndpointSelector:
+    """ The endpoints of one api_base list, ranked by health and handshake RTT.
+    """
+    def __init__(
+        self,
+        urls: Sequence[str],
+        headers: Dict[str, str] = None,
+        probe_interval: float = 10.0,
+        probe_timeout: float = 2.0,
+        cooldown: float = 30.0,
+        max_error_rate: float = 0.5,
+        window: int = 20,
+        smoothing: float = 0.3,
+    ):
+        """
+        Args:
+            urls: The websocket urls, in the order of preference while nothing is measured.
+            headers: The headers of the probing handshakes.
+            probe_interval: Seconds between two rounds of probes, None to only learn from the connections.
+            probe_timeout: Seconds a probing handshake, or one failed over from, may take before it counts as a failure.
+            cooldown: Seconds an endpoint is avoided after a failure.
+            max_error_rate: The share of failed recent attempts above which an endpoint is avoided.
+            window: The number of recent attempts the error rate is computed over.
+            smoothing: The weight of the latest handshake in the RTT moving average.
+        """
+        self.urls = list(urls)
+        self.headers = headers or {}
+        self.probe_interval = probe_interval
+        self.probe_timeout = probe_timeout
+        self.cooldown = cooldown
+        self.max_error_rate = max_error_rate
+        self.smoothing = smoothing
+        self.endpoints = [EndpointStats(url, window) for url in self.urls]
+        self._by_url = {endpoint.url: endpoint for endpoint in self.endpoints}
+        self._lock = threading.Lock()
+        self._prober: Optional[threading.Event] = None # set to end the running probing thread
+        self._stopped = False
+        self._users = 0
+        self._probed_at = -math.inf
+
+    def healthy(self, endpoint: EndpointStats, now: float = None) -> bool:
+        now = time.monotonic() if now is None else now
+        return now >= endpoint.down_until and endpoint.error_rate <= self.max_error_rate
+
+    def ranked(self) -> List[str]:
+        """The urls to try in order: the healthy ones by RTT (unmeasured last), then the others."""
+        self.start()
+        now = time.monotonic()
+        with self._lock:
+            order = sorted(
+                range(len(self.endpoints)),
+                key=lambda i: (
+                    not self.healthy(self.endpoints[i], now),
+                    self.endpoints[i].rtt if self.endpoints[i].rtt is not None else math.inf,
+                    i,
+                ),
+            )
+        return [self.urls[i] for i in order]
+
+    def succeeded(self, url: str, rtt: float):
+        """Report a handshake that took `rtt` seconds."""
+        with self._lock:
+            endpoint = self._by_url[url]
+            endpoint.outcomes.append(True)
+            endpoint.down_until = 0.0
+            if endpoint.rtt is None:
+                endpoint.rtt = rtt
+            else:
+                endpoint.rtt += self.smoothing * (rtt - endpoint.rtt)
+
+    def failed(self, url: str):
+        """Report a handshake or a connection that failed."""
+        with self._lock:
+            endpoint = self._by_url[url]
+            endpoint.outcomes.append(False)
+            endpoint.down_until = time.monotonic() + self.cooldown
+
+    def probe(self):
+        """Handshake with every endpoint once (the probing thread calls it every `probe_interval`)."""
+        self._probed_at = time.monotonic()
+        for url in self.urls:
+            start = time.perf_counter()
+            try:
+                ws = websockets.sync.client.connect(url, additional_headers=self.headers, open_timeout=self.probe_timeout)
+            except Exception:
+                self.failed(url)
+                continue
+            self.succeeded(url, time.perf_counter() - start)
+            try:
+                ws.close()
+            except Exception:
+                pass
+
+    def _run(self, stop: threading.Event):
+        while not stop.is_set():
+            # a resumed prober does not probe again before the interval
+            wait = self._probed_at + self.probe_interval - time.monotonic()
+            if wait <= 0:
+                self.probe()
+                wait = self.probe_interval
+            stop.wait(wait)
+
+    def start(self):
+        """Start probing in the background, if it is not started yet."""
+        if self._prober is None and not self._stopped and self.probe_interval is not None and len(self.urls) > 1:
+            with self._lock:
+                if self._prober is None and not self._stopped:
+                    self._prober = threading.Event()
+                    threading.Thread(target=self._run, args=(self._prober,), daemon=True).start()
+        return self
+
+    def _end_prober(self):
+        with self._lock:
+            if self._prober is not None:
+                self._prober.set()
+                self._prober = None
+
+    def stop(self):
+        """Stop probing for good."""
+        self._stopped = True
+        self._end_prober()
+
+    def attach(self):
+        """Called by each Synthesis using the selector."""
+        with self._lock:
+            self._users += 1
+
+    def detach(self):
+        """Called when a Synthesis using the selector is collected, the last one ends the probing."""
+        with self._lock:
+            self._users -= 1
+            idle = self._users <= 0
+        if idle:
+            self._end_prober()
+
+    def stats(self) -> List[Dict]:
+        """The RTT (in milliseconds), error rate and health of each endpoint."""
+        now = time.monotonic()
+        with self._lock:
+            return [
+                {
+                    'url': endpoint.url,
+                    'rtt_ms': None if endpoint.rtt is None else endpoint.rtt * 1000,
+                    'error_rate': endpoint.error_rate,
+                    'healthy': self.healthy(endpoint, now),
+                }
+                for endpoint in self.endpoints
+            ]
+
+
+_selectors: Dict[Tuple, EndpointSelector] = {}
+_selectors_lock = threading.Lock()
+
+
+def get_selector(urls: Sequence[str], headers: Dict[str, str]) -> EndpointSelector:
+    """The selector shared by every connection to the same endpoints with the same api key."""
+    key = (tuple(urls), tuple(sorted(headers.items())))
+    with _selectors_lock:
+        selector = _selectors.get(key)
+        if selector is None:
+            selector = _selectors[key] = EndpointSelector(urls, headers)
+        return selector
+
+
+def stop_probing():
+    """Stop the probing threads of every selector for good."""
+    with _selectors_lock:
+        selectors = list(_selectors.values())
+    for selector in selectors:
+        selector.stop()
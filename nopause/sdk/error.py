@@ -32,3 +32,6 @@ class InvalidRequestError(APIError):
 
 class NoPauseError(APIError):
     """Raised when the NoPause API returns an error."""
+
+class SlowConsumerError(APIError):
+    """Raised when a broadcast subscriber lagged too far behind and was disconnected."""
@@ -0,0 +1,437 @@
+""" Hedged synthesis: cut the tail of the time to first audio with a second connection.
+
+If no audio arrives within the hedge delay after the first text, the text sent so far is
+replayed on a second connection and both streams go on receiving the rest of the text. The
+first stream producing audio wins and the other one is terminated. The delay is fixed, or
+adapts to a percentile of the observed time to first audio, so only the slowest requests
+(about 5% of them at the default percentile) pay for a second session.
+"""
+import time
+import queue
+import asyncio
+import threading
+from collections import deque
+from typing import AsyncIterable, Dict, Iterable, Iterator, List, Set
+
+from nopause.core.audio import AudioChunk
+from nopause.sdk.pipeline import PipelinedResultGenerator
+from nopause.sdk.synthesis import Synthesis
+
+_END = object()
+_FIRST_TEXT = object()
+
+
+class _TextTee:
+    """ Pump a text iterator into the text iterators of the streams, replaying the past text to a late one.
+    """
+    def __init__(self, text_iter: Iterable[str], events: queue.Queue):
+        self.text_iter = text_iter
+        self.events = events
+        self.sent: List[str] = []
+        self.queues: Dict[int, queue.Queue] = {}
+        self.ended: Set[int] = set() # the streams whose text was cut short
+        self.end = None # _END or the error of the text iterator
+        self.lock = threading.Lock()
+
+    def _put(self, item):
+        with self.lock:
+            if isinstance(item, str):
+                self.sent.append(item)
+            else:
+                self.end = item
+            for texts in self.queues.values():
+                texts.put(item)
+
+    def run(self):
+        try:
+            for text in self.text_iter:
+                if not self.sent:
+                    self.events.put((None, _FIRST_TEXT))
+                self._put(text)
+        except Exception as e:
+            self._put(e)
+        else:
+            self._put(_END)
+
+    def branch(self, source: int) -> Iterator[str]:
+        texts = queue.Queue()
+        with self.lock:
+            for text in self.sent:
+                texts.put(text)
+            if source in self.ended:
+                texts.put(_END)
+            elif self.end is not None:
+                texts.put(self.end)
+            self.queues[source] = texts
+
+        def iterate():
+            while True:
+                item = texts.get()
+                if item is _END:
+                    return
+                if isinstance(item, Exception):
+                    raise item
+                yield item
+        return iterate()
+
+    def end_branch(self, source: int):
+        """End the text of a stream early, so that its session ends on the server and its consumer wakes up."""
+        with self.lock:
+            self.ended.add(source)
+            texts = self.queues.get(source)
+        if texts is not None:
+            texts.put(_END)
+
+
+class _AsyncTextTee:
+    def __init__(self, text_iter: AsyncIterable[str], events: asyncio.Queue):
+        self.text_iter = text_iter
+        self.events = events
+        self.sent: List[str] = []
+        self.queues: List[asyncio.Queue] = []
+        self.end = None
+
+    def _put(self, item):
+        if isinstance(item, str):
+            self.sent.append(item)
+        else:
+            self.end = item
+        for texts in self.queues:
+            texts.put_nowait(item)
+
+    async def run(self):
+        try:
+            async for text in self.text_iter:
+                if not self.sent:
+                    self.events.put_nowait((None, _FIRST_TEXT))
+                self._put(text)
+        except Exception as e:
+            self._put(e)
+        else:
+            self._put(_END)
+
+    def branch(self) -> AsyncIterable[str]:
+        texts = asyncio.Queue()
+        for text in self.sent:
+            texts.put_nowait(text)
+        if self.end is not None:
+            texts.put_nowait(self.end)
+        self.queues.append(texts)
+
+        async def iterate():
+            while True:
+                item = await texts.get()
+                if item is _END:
+                    return
+                if isinstance(item, Exception):
+                    raise item
+                yield item
+        return iterate()
+
+
+class HedgedSynthesis:
+    """ Synthesis that replays the text on a second connection when the first audio is late.
+
+    Usage:
+        [sync]
+            synthesizer = HedgedSynthesis(voice_id='Zoe').connect()
+            for chunk in synthesizer.stream(text_iterator): ...
+            print(synthesizer.hedge_rate, synthesizer.win_rate)
+            synthesizer.close()
+
+        [async]
+            synthesizer = await HedgedSynthesis(voice_id='Zoe').aconnect()
+            async for chunk in await synthesizer.astream(text_iterator): ...
+            await synthesizer.aclose()
+    """
+    # seconds a sync close waits for the threads receiving the streams of the last request to stop
+    stop_timeout: float = 1.0
+
+    def __init__(
+        self,
+        hedge_after: float = None,
+        percentile: float = 0.95,
+        initial_hedge_after: float = 0.5,
+        min_samples: int = 20,
+        window: int = 200,
+        **kwargs,
+    ):
+        """
+        Args:
+            hedge_after: A fixed hedge delay in seconds, None to adapt it to `percentile` of the observed TTFA.
+            percentile: The percentile of the time to first audio the adaptive delay follows.
+            initial_hedge_after: The delay used until `min_samples` requests have been observed.
+            min_samples: The number of observed requests before the delay adapts.
+            window: The number of recent requests the percentile is computed over.
+            **kwargs: The configurations of Synthesis (voice_id, audio_config, api_key, ...).
+        """
+        self.hedge_after = hedge_after
+        self.percentile = percentile
+        self.initial_hedge_after = initial_hedge_after
+        self.min_samples = min_samples
+        # the primary connection first, the winner of a hedged request becomes the primary
+        self.synthesizers = [Synthesis(**kwargs), Synthesis(**kwargs)]
+        self.ttfas = deque(maxlen=window)
+        # the threads receiving the streams of the last sync request
+        self._consumers: List[threading.Thread] = []
+        # counters over the lifetime of the instance
+        self.requests = 0
+        self.hedged = 0
+        self.hedge_wins = 0
+
+    @property
+    def hedge_rate(self) -> float:
+        """The share of the requests that were hedged."""
+        return self.hedged / self.requests if self.requests else 0.0
+
+    @property
+    def win_rate(self) -> float:
+        """The share of the hedged requests the second connection won."""
+        return self.hedge_wins / self.hedged if self.hedged else 0.0
+
+    def hedge_delay(self) -> float:
+        """The seconds after the first text without audio before the request is hedged."""
+        if self.hedge_after is not None:
+            return self.hedge_after
+        if len(self.ttfas) < self.min_samples:
+            return self.initial_hedge_after
+        ttfas = sorted(self.ttfas)
+        return ttfas[min(len(ttfas) - 1, int(len(ttfas) * self.percentile))]
+
+    def connect(self):
+        for synthesizer in self.synthesizers:
+            synthesizer.connect()
+        return self
+
+    async def aconnect(self):
+        await asyncio.gather(*[synthesizer.aconnect() for synthesizer in self.synthesizers])
+        return self
+
+    def _wait_consumers(self):
+        for thread in self._consumers:
+            thread.join(self.stop_timeout)
+
+    def close(self):
+        self._wait_consumers()
+        for synthesizer in self.synthesizers:
+            synthesizer.close()
+
+    async def aclose(self):
+        for synthesizer in self.synthesizers:
+            await synthesizer.aclose()
+
+    def _won(self, winner: int, first_text: float):
+        self.ttfas.append(time.perf_counter() - first_text)
+        if winner == 1:
+            self.hedge_wins += 1
+            self.synthesizers.reverse()
+
+    def stream(self, text_iter: Iterable[str]) -> PipelinedResultGenerator:
+        """
+        Create a hedged synthesis.
+        Args:
+            text_iter: An iterable of strings to be synthesized.
+        Returns:
+            A generator of the AudioChunk objects of the stream that produced audio first.
+        """
+        self.requests += 1
+        synthesizers = list(self.synthesizers)
+        delay = self.hedge_delay()
+        events = queue.Queue()
+        tee = _TextTee(text_iter, events)
+        results = [None, None]
+        losers = set()
+        stopped = set()
+        stop_lock = threading.Lock()
+        threads = self._consumers = []
+
+        def stop(source: int):
+            # terminate the stream of a source once, from whichever thread sees it lost first:
+            # closing the connection wakes up the thread receiving from it
+            with stop_lock:
+                result = results[source]
+                if result is None or source in stopped or result.released:
+                    return
+                stopped.add(source)
+            result.terminate()
+
+        def consume(source: int):
+            try:
+                result = results[source] = synthesizers[source].stream(tee.branch(source))
+                if source in losers:
+                    # lost while connecting
+                    stop(source)
+                    return
+                for chunk in result:
+                    if source in losers:
+                        break
+                    events.put((source, chunk))
+                else:
+                    events.put((source, _END))
+                    return
+                stop(source)
+            except Exception as e:
+                events.put((source, e))
+
+        def start(source: int):
+            thread = threading.Thread(target=consume, args=(source,), daemon=True)
+            threads.append(thread)
+            thread.start()
+
+        def lose(source: int):
+            losers.add(source)
+            tee.end_branch(source)
+
+        def generate() -> Iterator[AudioChunk]:
+            threading.Thread(target=tee.run, daemon=True).start()
+            start(0)
+            winner, started, ended = None, 1, []
+            first_text = deadline = None
+            try:
+                while True:
+                    timeout = None
+                    if winner is None and started == 1 and deadline is not None:
+                        timeout = max(deadline - time.perf_counter(), 0)
+                    try:
+                        source, item = events.get(timeout=timeout)
+                    except queue.Empty:
+                        self.hedged += 1
+                        started = 2
+                        start(1)
+                        continue
+                    if item is _FIRST_TEXT:
+                        first_text = time.perf_counter()
+                        deadline = first_text + delay
+                    elif isinstance(item, AudioChunk):
+                        if winner is None:
+                            winner = source
+                            self._won(winner, first_text or time.perf_counter())
+                            lose(1 - winner)
+                            # the close of the losing connection does not delay the first audio
+                            yield item
+                            stop(1 - winner)
+                        elif source == winner:
+                            yield item
+                    else:
+                        # the end of a stream, or its error
+                        if source == winner:
+                            if item is _END:
+                                return
+                            raise item
+                        if winner is not None:
+                            continue
+                        ended.append(item)
+                        if isinstance(item, Exception) and started == 1:
+                            # no audio from the primary, the second connection takes over at once
+                            self.hedged += 1
+                            started = 2
+                            start(1)
+                        elif len(ended) == started:
+                            error = next((e for e in ended if isinstance(e, Exception)), None)
+                            if error is not None:
+                                raise error
+                            return
+            finally:
+                # a stream received to its end is left as it is, for its connection to be reused
+                for source in (0, 1):
+                    lose(source)
+                    stop(source)
+
+        return PipelinedResultGenerator(generate(), lambda: None)
+
+    async def astream(self, text_iter: AsyncIterable[str]) -> PipelinedResultGenerator:
+        """
+        Create an async hedged synthesis.
+        Args:
+            text_iter: An async iterable of strings to be synthesized.
+        Returns:
+            An async generator of the AudioChunk objects of the stream that produced audio first.
+        """
+        self.requests += 1
+        synthesizers = list(self.synthesizers)
+        delay = self.hedge_delay()
+        events = asyncio.Queue()
+        tee = _AsyncTextTee(text_iter, events)
+        results = [None, None]
+        tasks = []
+        cancelling = []
+
+        async def consume(source: int):
+            try:
+                result = results[source] = await synthesizers[source].astream(tee.branch())
+                async for chunk in result:
+                    events.put_nowait((source, chunk))
+                events.put_nowait((source, _END))
+            except asyncio.CancelledError:
+                if results[source] is None:
+                    # cancelled while connecting, the connection is dropped to free the synthesizer
+                    await synthesizers[source].aclose()
+                raise
+            except Exception as e:
+                events.put_nowait((source, e))
+
+        def start(source: int):
+            tasks.append(asyncio.create_task(consume(source)))
+
+        async def cancel(source: int):
+            tasks[source].cancel()
+            result = results[source]
+            if result is not None and not result.terminated and not result.is_end:
+                await result.aterminate()
+
+        async def generate():
+            pump = asyncio.create_task(tee.run())
+            start(0)
+            winner, ended = None, []
+            first_text = deadline = None
+            try:
+                while True:
+                    timeout = None
+                    if winner is None and len(tasks) == 1 and deadline is not None:
+                        timeout = max(deadline - time.perf_counter(), 0)
+                    try:
+                        source, item = await asyncio.wait_for(events.get(), timeout)
+                    except asyncio.TimeoutError:
+                        self.hedged += 1
+                        start(1)
+                        continue
+                    if item is _FIRST_TEXT:
+                        first_text = time.perf_counter()
+                        deadline = first_text + delay
+                    elif isinstance(item, AudioChunk):
+                        if winner is None:
+                            winner = source
+                            self._won(winner, first_text or time.perf_counter())
+                            if len(tasks) > 1:
+                                # cancelled in the background, the close of the losing connection
+                                # does not delay the first audio
+                                cancelling.append(asyncio.create_task(cancel(1 - winner)))
+                        if source == winner:
+                            yield item
+                    else:
+                        if source == winner:
+                            if item is _END:
+                                return
+                            raise item
+                        if winner is not None:
+                            continue
+                        ended.append(item)
+                        if isinstance(item, Exception) and len(tasks) == 1:
+                            self.hedged += 1
+                            start(1)
+                        elif len(ended) == len(tasks):
+                            error = next((e for e in ended if isinstance(e, Exception)), None)
+                            if error is not None:
+                                raise error
+                            return
+            finally:
+                pump.cancel()
+                if cancelling:
+                    await asyncio.wait(cancelling)
+                for source in range(len(tasks)):
+                    await cancel(source)
+
+        async def stop():
+            pass
+
+        return PipelinedResultGenerator(generate(), stop)
@@ -0,0 +1,171 @@
+""" An opt-in debug detector of the resources that outlive their synthesis session.
+
+Once a session ended (consumed, terminated or abandoned to the garbage collector), its sender
+should be finished within `grace` seconds, its websocket closed if the session owned it
+(Synthesis.stream called on the class, or a terminated stream), and its synthesizer free for the
+next request. Whatever is not is reported as a ResourceWarning, with the place the stream was
+created, and kept in `leaks`.
+
+    detector = nopause.sdk.leaks.enable_leak_detection()   # or NO_PAUSE_DEBUG_LEAKS=1
+    ... run the service or the test suite ...
+    assert not detector.check()
+
+The detector holds the sender and the websocket of the sessions until they are checked, it is
+meant for debugging and tests, not for production.
+"""
+import os
+import sys
+import time
+import atexit
+import asyncio
+import weakref
+import warnings
+import threading
+from typing import List, Optional
+
+from websockets.client import WebSocketClientProtocol
+from websockets.protocol import State
+
+_PACKAGE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def _caller() -> str:
+    """The innermost frame of the stack outside of the SDK (frames only, no source is read)."""
+    frame = sys._getframe(1)
+    while frame is not None and frame.f_code.co_filename.startswith(_PACKAGE_DIR):
+        frame = frame.f_back
+    if frame is None:
+        return '<unknown>'
+    return f'{frame.f_code.co_filename}:{frame.f_lineno}'
+
+
+def _is_open(ws) -> bool:
+    if ws is None:
+        return False
+    if isinstance(ws, WebSocketClientProtocol):
+        return not ws.closed
+    return ws.protocol.state is not State.CLOSED
+
+
+def _is_running(sender) -> bool:
+    if isinstance(sender, asyncio.Task):
+        return not sender.done()
+    return sender.is_alive()
+
+
+class _Session:
+    def __init__(self, result_generator, created_at: str):
+        self.ws = result_generator.ws
+        self.sender = result_generator.send_text_task
+        self.synthesizer = weakref.ref(result_generator._synthesizer)
+        self.owns_connection = result_generator.terminate_always
+        self.created_at = created_at
+        self.ended_at: Optional[float] = None
+        self.abandoned = False
+
+
+class LeakDetector:
+    """ Track the sessions of SynthesisResultGenerator and report their leftovers.
+    """
+    def __init__(self, grace: float = 1.0):
+        """
+        Args:
+            grace: Seconds a session has to release its resources after it ended.
+        """
+        self.grace = grace
+        self.leaks: List[str] = []
+        self._sessions = {}
+        # the latest session of each synthesizer, the only one that may keep it in use
+        self._latest = weakref.WeakKeyDictionary()
+        self._lock = threading.Lock()
+
+    def track(self, result_generator):
+        """Called when a session starts."""
+        session = _Session(result_generator, _caller())
+        key = id(result_generator)
+        with self._lock:
+            self._sessions[key] = session
+            self._latest[result_generator._synthesizer] = session
+        weakref.finalize(result_generator, self._collected, key)
+        self.check()
+
+    def ended(self, result_generator):
+        """Called when a session is consumed to its end or terminated."""
+        with self._lock:
+            session = self._sessions.get(id(result_generator))
+            if session is not None and session.ended_at is None:
+                session.ended_at = time.monotonic()
+
+    def _collected(self, key: int):
+        with self._lock:
+            session = self._sessions.get(key)
+            if session is not None and session.ended_at is None:
+                session.abandoned = True
+                session.owns_connection = True # nobody can close it anymore
+                session.ended_at = time.monotonic()
+
+    def _problems(self, session: _Session) -> List[str]:
+        problems = []
+        if session.abandoned:
+            problems.append('the stream was garbage collected before its end, without being terminated')
+        if _is_running(session.sender):
+            problems.append('its sender is still running')
+        if session.owns_connection and _is_open(session.ws):
+            problems.append('its websocket is still open')
+        synthesizer = session.synthesizer()
+        if synthesizer is not None and synthesizer._in_use and self._latest.get(synthesizer) is session:
+            problems.append('its synthesizer is still in use')
+        return problems
+
+    def check(self, grace: float = None) -> List[str]:
+        """
+        Check the sessions that ended more than `grace` seconds ago.
+        Args:
+            grace: Overrides the grace period of the detector, e.g. 0 at the end of a test.
+        Returns:
+            The leaks found by this check, also warned about and appended to `leaks`.
+        """
+        grace = self.grace if grace is None else grace
+        now = time.monotonic()
+        with self._lock:
+            ended = [
+                (key, session) for key, session in self._sessions.items()
+                if session.ended_at is not None and now - session.ended_at >= grace
+            ]
+            for key, _ in ended:
+                del self._sessions[key]
+        found = []
+        for _, session in ended:
+            problems = self._problems(session)
+            if problems:
+                found.append(f'Synthesis stream created at {session.created_at} leaked: {", ".join(problems)}.')
+        for leak in found:
+            warnings.warn(leak, ResourceWarning, stacklevel=2)
+        self.leaks.extend(found)
+        return found
+
+    def active(self) -> int:
+        """The number of sessions that have not ended."""
+        with self._lock:
+            return sum(1 for session in self._sessions.values() if session.ended_at is None)
+
+
+detector: Optional[LeakDetector] = None
+
+
+def enable_leak_detection(grace: float = 1.0) -> LeakDetector:
+    """Track every later session, and check them all at exit."""
+    global detector
+    if detector is None:
+        detector = LeakDetector(grace)
+        atexit.register(lambda: detector is not None and detector.check(grace=0))
+    return detector
+
+
+def disable_leak_detection():
+    global detector
+    detector = None
+
+
+if os.environ.get('NO_PAUSE_DEBUG_LEAKS', '').lower() in ('1', 'true', 'yes'):
+    enable_leak_detection()
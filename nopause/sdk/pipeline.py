@@ -0,0 +1,420 @@
+""" Pipelined long-text synthesis over several connections.
+
+The incoming text is cut at sentence boundaries and the segments are synthesized
+concurrently on a small set of connections, while the audio is yielded strictly in
+order with a short crossfade at each seam.
+"""
+import re
+import queue
+import asyncio
+import threading
+from array import array
+from typing import AsyncIterable, Iterable, Iterator, List, Optional, Union
+
+from nopause.core.audio import AudioChunk
+from nopause.sdk.synthesis import Synthesis
+
+# a sentence ends with punctuation followed by whitespace (so "3.14" or a '.' at the end of
+# a partial text are not boundaries yet), or with CJK punctuation
+SENTENCE_BOUNDARY = re.compile(r'[.!?;:\n]+["\'\)\]]*(?=\s)|[。！？；\n]+')
+
+_SEGMENT_END = object()
+_NO_MORE_SEGMENTS = object()
+
+
+class SentenceSegmenter:
+    """ Incrementally cut streaming text into segments at sentence boundaries.
+    """
+    def __init__(self, min_chars: int = 60, max_chars: int = 400):
+        """
+        Args:
+            min_chars: Segments are at least this long (short sentences are merged), except the last one.
+            max_chars: Without any sentence boundary, the text is cut at a space before this length.
+        """
+        self.min_chars = min_chars
+        self.max_chars = max_chars
+        self.buffer = ''
+
+    def feed(self, text: str) -> List[str]:
+        self.buffer += text
+        segments = []
+        while True:
+            segment = self._cut()
+            if segment is None:
+                return segments
+            segments.append(segment)
+
+    def flush(self) -> List[str]:
+        rest, self.buffer = self.buffer.strip(), ''
+        return [rest] if rest else []
+
+    def _cut(self) -> Optional[str]:
+        for match in SENTENCE_BOUNDARY.finditer(self.buffer):
+            if match.end() >= self.min_chars:
+                return self._split_at(match.end())
+        if len(self.buffer) > self.max_chars:
+            position = self.buffer.rfind(' ', 0, self.max_chars)
+            return self._split_at(position if position > 0 else self.max_chars)
+        return None
+
+    def _split_at(self, position: int) -> str:
+        segment, self.buffer = self.buffer[:position].strip(), self.buffer[position:].lstrip()
+        return segment
+
+
+def crossfade(tail: bytes, head: bytes) -> bytes:
+    """Linearly fade out `tail` over the beginning of `head` (16-bit mono pcm)."""
+    a = array('h', tail)
+    b = array('h', head[:len(tail)])
+    n = len(b)
+    kept = a[:len(a) - n]
+    a = a[len(a) - n:]
+    mixed = array('h', (int(a[i] * (n - i) / n + b[i] * i / n) for i in range(n)))
+    return kept.tobytes() + mixed.tobytes() + head[2 * n:]
+
+
+class SeamJoiner:
+    """ Join the chunks of consecutive segments into one chunk stream with crossfades at the seams.
+
+    The last `crossfade_ms` of audio is held back until it is known whether the next
+    chunk continues the same segment or starts the next one.
+    """
+    def __init__(self, crossfade_ms: float = 10):
+        self.crossfade_ms = crossfade_ms
+        self.tail = b''
+        self.chunk_id = 0
+        self.template = None
+
+    def _emit(self, data: bytes) -> Optional[AudioChunk]:
+        if not data:
+            return None
+        chunk = AudioChunk(
+            data=data,
+            chunk_id=self.chunk_id,
+            sample_rate=self.template.sample_rate,
+            channels=self.template.channels,
+            rtf=self.template.rtf,
+            chunk_size_us=len(data) // 2 * 1000000 // self.template.sample_rate,
+        )
+        self.chunk_id += 1
+        return chunk
+
+    def push(self, chunk: AudioChunk, first_of_segment: bool) -> Optional[AudioChunk]:
+        self.template = chunk
+        data = chunk.data
+        if first_of_segment and self.tail:
+            data = crossfade(self.tail, data)
+        else:
+            data = self.tail + data
+        n_hold = int(chunk.sample_rate * self.crossfade_ms / 1000) * 2
+        if n_hold and len(data) > n_hold:
+            data, self.tail = data[:-n_hold], data[-n_hold:]
+        elif n_hold:
+            data, self.tail = b'', data
+        else:
+            self.tail = b''
+        return self._emit(data)
+
+    def flush(self) -> Optional[AudioChunk]:
+        data, self.tail = self.tail, b''
+        return self._emit(data) if self.template is not None else None
+
+
+class PipelinedSynthesis:
+    """ Synthesize long text on several connections concurrently and return the audio in order.
+
+    Usage:
+        [sync]
+            synthesizer = PipelinedSynthesis(n_connections=3, voice_id='Zoe')
+            for chunk in synthesizer.stream(text_iterator): ...
+            synthesizer.close()
+
+        [async]
+            synthesizer = PipelinedSynthesis(n_connections=3, voice_id='Zoe')
+            async for chunk in await synthesizer.astream(text_iterator): ...
+            await synthesizer.aclose()
+    """
+    def __init__(
+        self,
+        n_connections: int = 3,
+        min_segment_chars: int = 60,
+        max_segment_chars: int = 400,
+        crossfade_ms: float = 10,
+        **kwargs,
+    ):
+        """
+        Args:
+            n_connections: The number of connections synthesizing segments concurrently.
+            min_segment_chars: See SentenceSegmenter.
+            max_segment_chars: See SentenceSegmenter.
+            crossfade_ms: The duration of the crossfade at the seam of two segments (0 to disable).
+            **kwargs: The configurations of Synthesis (voice_id, audio_config, api_key, ...).
+        """
+        self.n_connections = n_connections
+        self.min_segment_chars = min_segment_chars
+        self.max_segment_chars = max_segment_chars
+        self.crossfade_ms = crossfade_ms
+        self.synthesizers = [Synthesis(**kwargs) for _ in range(n_connections)]
+
+    def segmenter(self) -> SentenceSegmenter:
+        return SentenceSegmenter(self.min_segment_chars, self.max_segment_chars)
+
+    def connect(self):
+        for synthesizer in self.synthesizers:
+            synthesizer.connect()
+        return self
+
+    async def aconnect(self):
+        await asyncio.gather(*[synthesizer.aconnect() for synthesizer in self.synthesizers])
+        return self
+
+    def close(self):
+        for synthesizer in self.synthesizers:
+            synthesizer.close()
+
+    async def aclose(self):
+        for synthesizer in self.synthesizers:
+            await synthesizer.aclose()
+
+    def stream(self, text_iter: Iterable[str]) -> Iterable[AudioChunk]:
+        """
+        Create a pipelined synthesis.
+        Args:
+            text_iter: An iterable of strings to be synthesized.
+        Returns:
+            A generator of AudioChunk objects, in the order of the text.
+        """
+        jobs = queue.Queue()
+        ordered = queue.Queue() # the result queue of each segment, in order
+        stop = threading.Event()
+        active = {} # the running result generator of each worker
+
+        def produce():
+            segmenter = self.segmenter()
+            try:
+                for text in text_iter:
+                    for segment in segmenter.feed(text):
+                        if stop.is_set():
+                            return
+                        results = queue.Queue()
+                        ordered.put(results)
+                        jobs.put((segment, results))
+                for segment in segmenter.flush():
+                    results = queue.Queue()
+                    ordered.put(results)
+                    jobs.put((segment, results))
+            except Exception as e:
+                results = queue.Queue()
+                results.put(e)
+                ordered.put(results)
+            finally:
+                ordered.put(_NO_MORE_SEGMENTS)
+                for _ in self.synthesizers:
+                    jobs.put(None)
+
+        def work(synthesizer: Synthesis):
+            while True:
+                job = jobs.get()
+                if job is None:
+                    return
+                segment, results = job
+                if stop.is_set():
+                    results.put(_SEGMENT_END)
+                    continue
+                try:
+                    result = active[id(synthesizer)] = synthesizer.stream(iter([segment]))
+                    for chunk in result:
+                        if stop.is_set():
+                            result.terminate()
+                            break
+                        results.put(chunk)
+                    results.put(_SEGMENT_END)
+                except Exception as e:
+                    results.put(e)
+                finally:
+                    active.pop(id(synthesizer), None)
+
+        workers = [threading.Thread(target=work, args=(synthesizer,), daemon=True) for synthesizer in self.synthesizers]
+        for thread in [threading.Thread(target=produce, daemon=True)] + workers:
+            thread.start()
+
+        def stop_all():
+            # the producer may be blocked in the text iterator, so only the workers are waited for
+            stop.set()
+            for result in list(active.values()):
+                try:
+                    result.terminate()
+                except Exception:
+                    pass
+            for _ in workers:
+                jobs.put(None)
+            for thread in workers:
+                thread.join()
+
+        def generate() -> Iterator[AudioChunk]:
+            joiner = SeamJoiner(self.crossfade_ms)
+            try:
+                while True:
+                    results = ordered.get()
+                    if results is _NO_MORE_SEGMENTS:
+                        break
+                    first = True
+                    while True:
+                        item = results.get()
+                        if item is _SEGMENT_END:
+                            break
+                        if isinstance(item, Exception):
+                            raise item
+                        chunk = joiner.push(item, first)
+                        first = False
+                        if chunk is not None:
+                            yield chunk
+                chunk = joiner.flush()
+                if chunk is not None:
+                    yield chunk
+            finally:
+                # also when the consumer stops early, a segment failed or the generator is collected
+                stop_all()
+
+        return PipelinedResultGenerator(generate(), stop_all)
+
+    async def astream(self, text_iter: AsyncIterable[str]) -> AsyncIterable[AudioChunk]:
+        """
+        Create an async pipelined synthesis.
+        Args:
+            text_iter: An async iterable of strings to be synthesized.
+        Returns:
+            An async generator of AudioChunk objects, in the order of the text.
+        """
+        jobs = asyncio.Queue()
+        ordered = asyncio.Queue()
+
+        async def produce():
+            segmenter = self.segmenter()
+            try:
+                async for text in text_iter:
+                    for segment in segmenter.feed(text):
+                        results = asyncio.Queue()
+                        ordered.put_nowait(results)
+                        jobs.put_nowait((segment, results))
+                for segment in segmenter.flush():
+                    results = asyncio.Queue()
+                    ordered.put_nowait(results)
+                    jobs.put_nowait((segment, results))
+            except Exception as e:
+                results = asyncio.Queue()
+                results.put_nowait(e)
+                ordered.put_nowait(results)
+            finally:
+                ordered.put_nowait(_NO_MORE_SEGMENTS)
+                for _ in self.synthesizers:
+                    jobs.put_nowait(None)
+
+        async def work(synthesizer: Synthesis):
+            while True:
+                job = await jobs.get()
+                if job is None:
+                    return
+                segment, results = job
+                result = None
+                try:
+                    result = await synthesizer.astream(_aiter([segment]))
+                    async for chunk in result:
+                        results.put_nowait(chunk)
+                    results.put_nowait(_SEGMENT_END)
+                except asyncio.CancelledError:
+                    # drop the interrupted segment, the next stream reconnects
+                    try:
+                        if result is not None and not result.terminated:
+                            await result.aterminate()
+                        else:
+                            await synthesizer.aclose()
+                    except Exception:
+                        pass
+                    raise
+                except Exception as e:
+                    results.put_nowait(e)
+
+        tasks = [asyncio.create_task(produce())]
+        tasks.extend(asyncio.create_task(work(synthesizer)) for synthesizer in self.synthesizers)
+
+        async def generate():
+            joiner = SeamJoiner(self.crossfade_ms)
+            try:
+                while True:
+                    results = await ordered.get()
+                    if results is _NO_MORE_SEGMENTS:
+                        break
+                    first = True
+                    while True:
+                        item = await results.get()
+                        if item is _SEGMENT_END:
+                            break
+                        if isinstance(item, Exception):
+                            raise item
+                        chunk = joiner.push(item, first)
+                        first = False
+                        if chunk is not None:
+                            yield chunk
+                chunk = joiner.flush()
+                if chunk is not None:
+                    yield chunk
+            finally:
+                await _cancel(tasks)
+
+        async def stop():
+            await _cancel(tasks)
+
+        return PipelinedResultGenerator(generate(), stop)
+
+
+async def _aiter(items: Iterable[str]):
+    for item in items:
+        yield item
+
+async def _cancel(tasks: List[asyncio.Task]):
+    for task in tasks:
+        task.cancel()
+    await asyncio.gather(*tasks, return_exceptions=True)
+
+
+class PipelinedResultGenerator:
+    """It is could be used as a generator or an async generator, like SynthesisResultGenerator.
+    """
+    def __init__(self, generator: Union[Iterator[AudioChunk], AsyncIterable[AudioChunk]], stop):
+        self.generator = generator
+        self.use_async = hasattr(generator, '__anext__')
+        self.stop = stop
+        self.terminated = False
+
+    def __next__(self):
+        if self.terminated:
+            raise StopIteration
+        return next(self.generator)
+
+    async def __anext__(self):
+        if self.terminated:
+            raise StopAsyncIteration
+        return await self.generator.__anext__()
+
+    def __iter__(self):
+        return self
+
+    def __aiter__(self):
+        return self
+
+    def terminate(self):
+        """stop all segments, the connections are kept for the next stream
+        """
+        assert not self.use_async
+        self.terminated = True
+        self.stop()
+        self.generator.close()
+
+    async def aterminate(self):
+        """stop all segments, the connections are kept for the next stream
+        """
+        assert self.use_async
+        self.terminated = True
+        await self.stop()
+        await self.generator.aclose()
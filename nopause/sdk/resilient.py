@@ -0,0 +1,275 @@
+""" Synthesis that survives dropped connections mid-utterance.
+
+The text is checkpointed at sentence boundaries: each segment is synthesized as one
+session on the connection and is acknowledged once its audio has been fully received.
+If the connection drops, the synthesizer reconnects and resends only the segment in
+flight and the ones after it, skipping the part of its audio that was already delivered,
+so that the consumer keeps reading one continuous chunk stream.
+"""
+import ssl
+import time
+import queue
+import asyncio
+import threading
+from typing import AsyncIterable, Iterable, Iterator
+
+from websockets.exceptions import ConnectionClosed, InvalidHandshake
+
+from nopause.core.audio import AudioChunk
+from nopause.sdk.error import InvalidRequestError
+from nopause.sdk.pipeline import PipelinedResultGenerator, SentenceSegmenter, _aiter
+from nopause.sdk.synthesis import Synthesis
+
+# the errors a failed connection surfaces as, only those caused by the transport are retried
+RETRYABLE_ERRORS = (InvalidRequestError, ConnectionClosed, OSError)
+
+_NO_MORE_SEGMENTS = object()
+
+
+def is_retryable(error: BaseException) -> bool:
+    """
+    Whether the error, or the error it was raised from, is a failure of the transport:
+    a dropped connection, a socket error or a timeout, or a handshake answered with a 5xx status.
+    A rejected handshake (a bad api key, a 403) or a NoPauseError returned by the server surfaces at once.
+    """
+    while error is not None:
+        if isinstance(error, InvalidHandshake):
+            status_code = getattr(error, 'status_code', None)
+            if status_code is None and getattr(error, 'response', None) is not None:
+                status_code = error.response.status_code
+            return status_code is not None and status_code >= 500
+        if isinstance(error, ssl.SSLCertVerificationError):
+            return False
+        if isinstance(error, (ConnectionClosed, OSError, asyncio.TimeoutError)):
+            return True
+        error = error.__cause__ or error.__context__
+    return False
+
+
+class SegmentProgress:
+    """ The audio delivered for the segment in flight, used to resume it after a reconnect.
+    """
+    def __init__(self, text: str):
+        self.text = text
+        self.delivered_bytes = 0
+        self.skip_bytes = 0
+
+    def restart(self):
+        """The segment is resent, its audio is replayed from the beginning."""
+        self.skip_bytes = self.delivered_bytes
+
+    def accept(self, chunk: AudioChunk) -> bytes:
+        """Return the part of the chunk that has not been delivered yet."""
+        data = chunk.data
+        if self.skip_bytes:
+            n_skip = min(self.skip_bytes, len(data))
+            data = data[n_skip:]
+            self.skip_bytes -= n_skip
+        if data:
+            self.delivered_bytes += len(data)
+        return data
+
+
+class ResilientSynthesis:
+    """ Synthesis with automatic reconnect and resume from the last acknowledged text.
+
+    Usage:
+        [sync]
+            synthesizer = ResilientSynthesis(max_retries=3, voice_id='Zoe')
+            for chunk in synthesizer.stream(text_iterator): ...
+            synthesizer.close()
+
+        [async]
+            synthesizer = ResilientSynthesis(max_retries=3, voice_id='Zoe')
+            async for chunk in await synthesizer.astream(text_iterator): ...
+            await synthesizer.aclose()
+
+    Note:
+        The audio of a resent segment is resumed at the sample where the dropped attempt
+        stopped, which is seamless as long as the voice renders the same text the same way.
+    """
+    def __init__(
+        self,
+        max_retries: int = 3,
+        retry_backoff: float = 0.2,
+        min_segment_chars: int = 60,
+        max_segment_chars: int = 400,
+        **kwargs,
+    ):
+        """
+        Args:
+            max_retries: The number of reconnects allowed for one segment before the error is raised.
+            retry_backoff: Seconds to wait before the first reconnect, doubled on each further one.
+            min_segment_chars: See SentenceSegmenter.
+            max_segment_chars: See SentenceSegmenter.
+            **kwargs: The configurations of Synthesis (voice_id, audio_config, api_key, ...).
+        """
+        self.max_retries = max_retries
+        self.retry_backoff = retry_backoff
+        self.min_segment_chars = min_segment_chars
+        self.max_segment_chars = max_segment_chars
+        self.synthesizer = Synthesis(**kwargs)
+        # counters over the lifetime of the instance
+        self.reconnects = 0
+        self.resent_chars = 0
+        self.skipped_bytes = 0
+
+    def segmenter(self) -> SentenceSegmenter:
+        return SentenceSegmenter(self.min_segment_chars, self.max_segment_chars)
+
+    def connect(self):
+        self.synthesizer.connect()
+        return self
+
+    async def aconnect(self):
+        await self.synthesizer.aconnect()
+        return self
+
+    def close(self):
+        self.synthesizer.close()
+
+    async def aclose(self):
+        await self.synthesizer.aclose()
+
+    def _prepare_retry(self, progress: SegmentProgress, attempt: int, error: Exception) -> float:
+        if attempt > self.max_retries or not is_retryable(error):
+            raise error
+        self.reconnects += 1
+        self.resent_chars += len(progress.text)
+        self.skipped_bytes += progress.delivered_bytes
+        progress.restart()
+        return self.retry_backoff * 2 ** (attempt - 1)
+
+    def _renumber(self, chunk: AudioChunk, data: bytes, chunk_id: int) -> AudioChunk:
+        if data is chunk.data and chunk.chunk_id == chunk_id:
+            return chunk
+        return AudioChunk(
+            data=data,
+            chunk_id=chunk_id,
+            sample_rate=chunk.sample_rate,
+            channels=chunk.channels,
+            rtf=chunk.rtf,
+            chunk_size_us=len(data) // 2 * 1000000 // chunk.sample_rate,
+        )
+
+    def stream(self, text_iter: Iterable[str]) -> Iterable[AudioChunk]:
+        """
+        Create a resilient synthesis.
+        Args:
+            text_iter: An iterable of strings to be synthesized.
+        Returns:
+            A generator of AudioChunk objects with continuous chunk ids across reconnects.
+        """
+        segments = queue.Queue()
+
+        def produce():
+            segmenter = self.segmenter()
+            try:
+                for text in text_iter:
+                    for segment in segmenter.feed(text):
+                        segments.put(segment)
+                for segment in segmenter.flush():
+                    segments.put(segment)
+            except Exception as e:
+                segments.put(e)
+            finally:
+                segments.put(_NO_MORE_SEGMENTS)
+
+        threading.Thread(target=produce, daemon=True).start()
+
+        def generate() -> Iterator[AudioChunk]:
+            chunk_id = 0
+            result = None
+            try:
+                while True:
+                    segment = segments.get()
+                    if segment is _NO_MORE_SEGMENTS:
+                        return
+                    if isinstance(segment, Exception):
+                        raise segment
+                    progress = SegmentProgress(segment)
+                    attempt = 0
+                    while True:
+                        try:
+                            result = self.synthesizer.stream(iter([segment]))
+                            for chunk in result:
+                                data = progress.accept(chunk)
+                                if data:
+                                    yield self._renumber(chunk, data, chunk_id)
+                                    chunk_id += 1
+                            result = None
+                            break
+                        except RETRYABLE_ERRORS as e:
+                            # the failed result generator has already terminated itself
+                            result = None
+                            attempt += 1
+                            time.sleep(self._prepare_retry(progress, attempt, e))
+                            self.synthesizer.close()
+            finally:
+                if result is not None and not result.terminated:
+                    result.terminate()
+
+        return PipelinedResultGenerator(generate(), lambda: None)
+
+    async def astream(self, text_iter: AsyncIterable[str]) -> AsyncIterable[AudioChunk]:
+        """
+        Create an async resilient synthesis.
+        Args:
+            text_iter: An async iterable of strings to be synthesized.
+        Returns:
+            An async generator of AudioChunk objects with continuous chunk ids across reconnects.
+        """
+        segments = asyncio.Queue()
+
+        async def produce():
+            segmenter = self.segmenter()
+            try:
+                async for text in text_iter:
+                    for segment in segmenter.feed(text):
+                        segments.put_nowait(segment)
+                for segment in segmenter.flush():
+                    segments.put_nowait(segment)
+            except Exception as e:
+                segments.put_nowait(e)
+            finally:
+                segments.put_nowait(_NO_MORE_SEGMENTS)
+
+        producer = asyncio.create_task(produce())
+
+        async def generate():
+            chunk_id = 0
+            result = None
+            try:
+                while True:
+                    segment = await segments.get()
+                    if segment is _NO_MORE_SEGMENTS:
+                        return
+                    if isinstance(segment, Exception):
+                        raise segment
+                    progress = SegmentProgress(segment)
+                    attempt = 0
+                    while True:
+                        try:
+                            result = await self.synthesizer.astream(_aiter([segment]))
+                            async for chunk in result:
+                                data = progress.accept(chunk)
+                                if data:
+                                    yield self._renumber(chunk, data, chunk_id)
+                                    chunk_id += 1
+                            result = None
+                            break
+                        except RETRYABLE_ERRORS as e:
+                            # the failed result generator has already terminated itself
+                            result = None
+                            attempt += 1
+                            await asyncio.sleep(self._prepare_retry(progress, attempt, e))
+                            await self.synthesizer.aclose()
+            finally:
+                producer.cancel()
+                if result is not None and not result.terminated:
+                    await result.aterminate()
+
+        async def stop():
+            producer.cancel()
+
+        return PipelinedResultGenerator(generate(), stop)
@@ -0,0 +1,365 @@
+""" Share the concurrency limits of one api key between interactive and batch synthesis.
+
+Requests wait in one queue per priority class and are admitted when a stream slot and a
+request token are available: the highest class first (an interactive request overtakes every
+queued batch request), and round robin across the tenants of a class, so that a tenant
+submitting a thousand requests does not starve the one submitting a single request. Streams
+can also be reserved for a class, so that it does not wait for running batch work to end.
+
+    scheduler = SynthesisScheduler(max_streams=4, requests_per_second=10, reserved_streams={'interactive': 1}, voice_id='Zoe')
+    for chunk in scheduler.stream(text_iterator, priority='interactive', tenant='user-42'): ...
+    for chunk in scheduler.stream(document_iterator, priority='batch', tenant='indexer'): ...
+    print(scheduler.wait_stats())
+"""
+import time
+import asyncio
+import threading
+import statistics
+from collections import OrderedDict, deque
+from typing import AsyncIterable, Dict, Iterable, Iterator, List, Optional, Sequence
+
+from nopause.core.audio import AudioChunk
+from nopause.sdk.pipeline import PipelinedResultGenerator
+from nopause.sdk.synthesis import Synthesis
+
+INTERACTIVE = 'interactive'
+BATCH = 'batch'
+
+
+class TokenBucket:
+    """ `rate` tokens per second, up to `burst` of them saved while idle.
+    """
+    def __init__(self, rate: float, burst: float = None):
+        self.rate = rate
+        self.burst = burst if burst is not None else max(1.0, rate)
+        self.tokens = self.burst
+        self.updated = time.monotonic()
+
+    def _refill(self, now: float):
+        self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def take(self) -> float:
+        """Take a token and return 0, or return the seconds until one is available."""
+        self._refill(time.monotonic())
+        if self.tokens >= 1:
+            self.tokens -= 1
+            return 0.0
+        return (1 - self.tokens) / self.rate
+
+
+class Ticket:
+    """ A request waiting for admission, woken up from any thread or event loop.
+    """
+    def __init__(self, priority: str, tenant: str, loop: asyncio.AbstractEventLoop = None):
+        self.priority = priority
+        self.tenant = tenant
+        self.enqueued = time.monotonic()
+        self.admitted = False
+        self.synthesizer: Optional[Synthesis] = None
+        self.loop = loop
+        self.event = asyncio.Event() if loop is not None else threading.Event()
+
+    def wake(self):
+        if self.loop is None:
+            self.event.set()
+        else:
+            self.loop.call_soon_threadsafe(self.event.set)
+
+
+class SynthesisScheduler:
+    """ Priority classes, a rate limiter and fair queuing in front of a pool of Synthesis connections.
+
+    Usage:
+        [sync]
+            scheduler = SynthesisScheduler(max_streams=4, voice_id='Zoe')
+            for chunk in scheduler.stream(text_iterator, priority='batch', tenant='indexer'): ...
+            scheduler.close()
+
+        [async]
+            scheduler = SynthesisScheduler(max_streams=4, voice_id='Zoe')
+            async for chunk in await scheduler.astream(text_iterator, priority='interactive'): ...
+            await scheduler.aclose()
+
+    Note:
+        A stream holds its slot until it is fully consumed or terminated.
+    """
+    def __init__(
+        self,
+        max_streams: int = 4,
+        requests_per_second: float = None,
+        burst: float = None,
+        priorities: Sequence[str] = (INTERACTIVE, BATCH),
+        reserved_streams: Dict[str, int] = None,
+        max_wait_samples: int = 1000,
+        **kwargs,
+    ):
+        """
+        Args:
+            max_streams: The number of streams running at the same time (and of pooled connections).
+            requests_per_second: The rate of admitted requests, None for no limit.
+            burst: The requests admitted at once after an idle period (default: max(1, requests_per_second)).
+            priorities: The priority classes, from the highest to the lowest.
+            reserved_streams: Streams only a class (or a higher one) may use, e.g. {'interactive': 1}
+                keeps one stream free of batch work so that an interactive request never waits for one to end.
+            max_wait_samples: The number of recent queue waits kept per class for wait_stats.
+            **kwargs: The configurations of Synthesis (voice_id, audio_config, api_key, ...).
+        """
+        self.max_streams = max_streams
+        self.bucket = TokenBucket(requests_per_second, burst) if requests_per_second else None
+        self.priorities = list(priorities)
+        self.reserved_streams = reserved_streams or {}
+        self.kwargs = kwargs
+        self._lock = threading.Lock()
+        # per class, the queue of each tenant in round robin order
+        self._queues: Dict[str, OrderedDict] = {priority: OrderedDict() for priority in self.priorities}
+        self._running = 0
+        self._timer: Optional[threading.Timer] = None
+        # idle connections by kind (sync, async), reused by the next admitted requests
+        self._idle: Dict[bool, List[Synthesis]] = {False: [], True: []}
+        self.waits: Dict[str, deque] = {priority: deque(maxlen=max_wait_samples) for priority in self.priorities}
+        self.admitted: Dict[str, int] = {priority: 0 for priority in self.priorities}
+
+    def _check_priority(self, priority: str):
+        if priority not in self._queues:
+            raise ValueError(f'Unknown priority {priority!r}, expected one of {self.priorities}.')
+
+    def _enqueue(self, ticket: Ticket):
+        with self._lock:
+            self._queues[ticket.priority].setdefault(ticket.tenant, deque()).append(ticket)
+
+    def _remove(self, ticket: Ticket) -> bool:
+        """
+        Withdraw a ticket that gave up waiting.
+        Returns:
+            False if it was admitted meanwhile: it holds a slot then, which the caller uses or releases.
+        """
+        with self._lock:
+            if ticket.admitted:
+                return False
+            tenants = self._queues[ticket.priority]
+            tickets = tenants.get(ticket.tenant)
+            if tickets is not None and ticket in tickets:
+                tickets.remove(ticket)
+                if not tickets:
+                    del tenants[ticket.tenant]
+            return True
+
+    def _admissible(self) -> Optional[str]:
+        """The highest class with a queued request and a stream it may use."""
+        reserved = 0
+        for priority in self.priorities:
+            if self._queues[priority] and self._running < self.max_streams - reserved:
+                return priority
+            reserved += self.reserved_streams.get(priority, 0)
+        return None
+
+    def _next_ticket(self, priority: str) -> Ticket:
+        tenants = self._queues[priority]
+        tenant, tickets = next(iter(tenants.items()))
+        ticket = tickets.popleft()
+        # the tenant goes to the back of the round
+        del tenants[tenant]
+        if tickets:
+            tenants[tenant] = tickets
+        return ticket
+
+    def _dispatch(self):
+        """Admit the requests that can be admitted now, from any thread."""
+        with self._lock:
+            while True:
+                priority = self._admissible()
+                if priority is None:
+                    return
+                if self.bucket is not None:
+                    delay = self.bucket.take()
+                    if delay > 0:
+                        # nothing else wakes the queue up when the next token frees
+                        if self._timer is None:
+                            self._timer = threading.Timer(delay, self._on_timer)
+                            self._timer.daemon = True
+                            self._timer.start()
+                        return
+                ticket = self._next_ticket(priority)
+                idle = self._idle[ticket.loop is not None]
+                ticket.synthesizer = idle.pop() if idle else Synthesis(**self.kwargs)
+                ticket.admitted = True
+                self._running += 1
+                self.admitted[ticket.priority] += 1
+                self.waits[ticket.priority].append(time.monotonic() - ticket.enqueued)
+                ticket.wake()
+
+    def _on_timer(self):
+        with self._lock:
+            self._timer = None
+        self._dispatch()
+
+    def _release(self, synthesizer: Synthesis, use_async: bool):
+        with self._lock:
+            self._running -= 1
+            self._idle[use_async].append(synthesizer)
+        self._dispatch()
+
+    def _wait(self, ticket: Ticket, timeout: Optional[float]):
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while not ticket.admitted:
+            remaining = None if deadline is None else deadline - time.monotonic()
+            if remaining is not None and remaining <= 0:
+                if self._remove(ticket):
+                    raise TimeoutError(f'The {ticket.priority} request was not admitted within {timeout} s.')
+                return # admitted right at the timeout
+            try:
+                ticket.event.wait(remaining)
+            except BaseException:
+                # interrupted (e.g. KeyboardInterrupt): nobody will use the slot of a ticket admitted meanwhile
+                if not self._remove(ticket):
+                    self._release(ticket.synthesizer, False)
+                raise
+            ticket.event.clear()
+
+    async def _await(self, ticket: Ticket, timeout: Optional[float]):
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while not ticket.admitted:
+            remaining = None if deadline is None else deadline - time.monotonic()
+            if remaining is not None and remaining <= 0:
+                if self._remove(ticket):
+                    raise TimeoutError(f'The {ticket.priority} request was not admitted within {timeout} s.')
+                return # admitted right at the timeout
+            try:
+                await asyncio.wait_for(ticket.event.wait(), remaining)
+            except asyncio.TimeoutError:
+                pass
+            except BaseException:
+                # cancelled: nobody will use the slot of a ticket admitted meanwhile
+                if not self._remove(ticket):
+                    self._release(ticket.synthesizer, True)
+                raise
+            ticket.event.clear()
+
+    def stream(
+        self,
+        text_iter: Iterable[str],
+        priority: str = INTERACTIVE,
+        tenant: str = 'default',
+        timeout: float = None,
+    ) -> PipelinedResultGenerator:
+        """
+        Wait for admission, then create a synthesis on a pooled connection.
+        Args:
+            text_iter: An iterable of strings to be synthesized.
+            priority: The priority class of the request.
+            tenant: The tenant the request is queued fairly for, within its class.
+            timeout: Seconds to wait for admission, TimeoutError after it (default: forever).
+        Returns:
+            A generator of AudioChunk objects, which frees the slot when consumed or terminated.
+        """
+        self._check_priority(priority)
+        ticket = Ticket(priority, tenant)
+        self._enqueue(ticket)
+        self._dispatch()
+        self._wait(ticket, timeout)
+        synthesizer = ticket.synthesizer
+        try:
+            result = synthesizer.stream(text_iter)
+        except BaseException:
+            self._release(synthesizer, False)
+            raise
+        released = False
+
+        def release():
+            nonlocal released
+            if not released:
+                released = True
+                if not result.terminated and not result.is_end:
+                    result.terminate()
+                self._release(synthesizer, False)
+
+        def generate() -> Iterator[AudioChunk]:
+            try:
+                yield from result
+            finally:
+                release()
+
+        # terminate() frees the slot even if the stream was never iterated
+        return PipelinedResultGenerator(generate(), release)
+
+    async def astream(
+        self,
+        text_iter: AsyncIterable[str],
+        priority: str = INTERACTIVE,
+        tenant: str = 'default',
+        timeout: float = None,
+    ) -> PipelinedResultGenerator:
+        """
+        Wait for admission, then create an async synthesis on a pooled connection.
+        Args:
+            text_iter: An async iterable of strings to be synthesized.
+            priority: The priority class of the request.
+            tenant: The tenant the request is queued fairly for, within its class.
+            timeout: Seconds to wait for admission, TimeoutError after it (default: forever).
+        Returns:
+            An async generator of AudioChunk objects, which frees the slot when consumed or terminated.
+        """
+        self._check_priority(priority)
+        ticket = Ticket(priority, tenant, asyncio.get_running_loop())
+        self._enqueue(ticket)
+        self._dispatch()
+        await self._await(ticket, timeout)
+        synthesizer = ticket.synthesizer
+        try:
+            result = await synthesizer.astream(text_iter)
+        except BaseException:
+            self._release(synthesizer, True)
+            raise
+        released = False
+
+        async def release():
+            nonlocal released
+            if not released:
+                released = True
+                if not result.terminated and not result.is_end:
+                    await result.aterminate()
+                self._release(synthesizer, True)
+
+        async def generate():
+            try:
+                async for chunk in result:
+                    yield chunk
+            finally:
+                await release()
+
+        return PipelinedResultGenerator(generate(), release)
+
+    def wait_stats(self) -> Dict[str, Dict[str, float]]:
+        """The queue wait of the recent requests of each class, in milliseconds."""
+        stats = {}
+        for priority, waits in self.waits.items():
+            waits = sorted(waits)
+            if not waits:
+                stats[priority] = {'requests': self.admitted[priority]}
+                continue
+            stats[priority] = {
+                'requests': self.admitted[priority],
+                'mean_ms': statistics.mean(waits) * 1000,
+                'p50_ms': waits[len(waits) // 2] * 1000,
+                'p95_ms': waits[min(len(waits) - 1, int(len(waits) * 0.95))] * 1000,
+                'max_ms': waits[-1] * 1000,
+            }
+        return stats
+
+    def queued(self) -> Dict[str, int]:
+        """The number of requests waiting in each class."""
+        with self._lock:
+            return {priority: sum(len(tickets) for tickets in tenants.values()) for priority, tenants in self._queues.items()}
+
+    def close(self):
+        with self._lock:
+            idle, self._idle[False] = self._idle[False], []
+        for synthesizer in idle:
+            synthesizer.close()
+
+    async def aclose(self):
+        with self._lock:
+            idle, self._idle[True] = self._idle[True], []
+        for synthesizer in idle:
+            await synthesizer.aclose()
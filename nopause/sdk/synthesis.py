@@ -1,30 +1,94 @@
 """ NoPause dual-stream TTS synthesis Python SDK
 """
 
+import io
 import os
 import base64
 import asyncio
 import threading
 import inspect
+import time
+import weakref
 import websockets
 import posixpath
-import ujson as json
 import ssl
-from typing import Any, Iterable, AsyncIterable, Union
+from functools import lru_cache
+from types import MappingProxyType
+from typing import TYPE_CHECKING, Any, AsyncIterator, Iterable, AsyncIterable, Iterator, List, Union
 from asyncio.exceptions import CancelledError
 from websockets.client import WebSocketClientProtocol
 from websockets.sync.client import ClientConnection
 from websockets.exceptions import WebSocketException, ConnectionClosed
 
 import nopause
-from nopause.core.audio import AudioChunk, TextChunk
-from nopause.sdk.base import BaseAPI
+from nopause.core.audio import AudioChunk, AudioFrame, FrameSplitter, TextChunk
+from nopause.core.codec import get_codec
+from nopause.sdk.base import BaseAPI, hybridmethod
 from nopause.sdk.config import ModelConfig, AudioConfig, DualStreamConfig
+from nopause.sdk.config import DEFAULT_MODEL_NAME, DEFAULT_VOICE_ID, DEFAULT_LANGUAGE
+from nopause.sdk.endpoints import EndpointSelector, get_selector
 from nopause.sdk.error import InvalidRequestError, NoPauseError
-
-DEFAULT_MODEL_NAME = 'nopause-en-beta'
-DEFAULT_VOICE_ID = 'Zoe'
-DEFAULT_LANGUAGE = 'en'
+from nopause.sdk import leaks
+
+if TYPE_CHECKING:
+    from nopause.recording import SessionRecorder
+
+# frozen configs shared by every instance that does not pass its own
+DEFAULT_AUDIO_CONFIG = AudioConfig()
+DEFAULT_DUAL_STREAM_CONFIG = DualStreamConfig()
+
+# guards the lazy creation of the per-instance semaphores
+_semaphore_creation_lock = threading.Lock()
+
+
+@lru_cache(maxsize=1024)
+def _prepare_messages(voice_id, model_name, language, audio_config, dual_stream_config):
+    # BOS/EOS are serialized once per configuration and shared by all sessions
+    bos, eos = Synthesis.prepare_bos_and_eos(
+        voice_id=voice_id,
+        model_name=model_name,
+        language=language,
+        audio_config=audio_config,
+        dual_stream_config=dual_stream_config,
+    )
+    codec = get_codec()
+    return codec.dumps(bos), codec.dumps(eos)
+
+def text_message(text: str) -> str:
+    """Serialize one piece of streaming text to a websocket frame."""
+    return get_codec().dumps({"content": TextChunk(text=text, is_end=False).dict()})
+
+# the environment variables the settings fall back to
+SETTINGS_ENVIRONMENT = ('NO_PAUSE_API_KEY', 'NO_PAUSE_API_BASE', 'NO_PAUSE_API_VERSION', 'NO_PAUSE_WS_PROTOCOL')
+
+def _hashable(value):
+    return tuple(value) if isinstance(value, list) else value
+
+def _settings_fallbacks() -> tuple:
+    """The values of the environment and of nopause.api_* the settings are resolved from."""
+    return (
+        tuple(os.environ.get(name) for name in SETTINGS_ENVIRONMENT),
+        (nopause.api_key, _hashable(nopause.api_base), nopause.api_version),
+    )
+
+@lru_cache(maxsize=256)
+def _resolve_settings(cls, api_key, api_base, api_version, fallbacks):
+    # the parsed settings, the protocol, the url of each endpoint and the headers, resolved once for
+    # the same arguments and fallback values (part of the key, parse_settings reads them again);
+    # the cached mappings are read-only, each instance gets its own copy
+    parsed_api_key, parsed_api_base, parsed_api_version = cls.parse_settings(api_key, api_base, api_version)
+    protocol = fallbacks[0][SETTINGS_ENVIRONMENT.index('NO_PAUSE_WS_PROTOCOL')] or cls.protocol
+    api_urls = tuple(
+        '{protocol}://{path}'.format(protocol=protocol, path=posixpath.join(base, parsed_api_version['value'], cls.name))
+        for base in cls.split_api_base(parsed_api_base['value'])
+    )
+    headers = {
+        'X-API-KEY': parsed_api_key['value'],
+        'NOPAUSE_PYTHON_SDK_VERSION': nopause.__version__,
+    }
+    return tuple(
+        MappingProxyType(mapping) for mapping in (parsed_api_key, parsed_api_base, parsed_api_version, headers)
+    ) + (protocol, api_urls)
 
 
 class Synthesis(BaseAPI):
@@ -32,6 +96,8 @@ class Synthesis(BaseAPI):
     """
     name: str = 'tts/dual-stream'
     protocol: str = 'wss'
+    # seconds to wait for the closing handshake, bounds the time a terminate takes on a stalled connection
+    close_timeout: float = 1.0
 
     def __init__(
         self,
@@ -43,6 +109,7 @@ class Synthesis(BaseAPI):
         api_key: str = None,
         api_base: str = None,
         api_version: str = None,
+        recorder: 'SessionRecorder' = None,
         **kwargs,
     ):
         """
@@ -55,8 +122,9 @@ class Synthesis(BaseAPI):
             audio_config: The audio configuration to use.
             dual_stream_config: The dual stream configuration to use.
             api_key: The NoPause API key.
-            api_base: The base URL for the NoPause API.
+            api_base: The base URL for the NoPause API, or a list of them to connect to the fastest healthy one.
             api_version: The version of the NoPause API to use.
+            recorder: A nopause.recording.SessionRecorder logging every frame of the connections.
             **kwargs: Additional keyword arguments.
 
         Usage:
@@ -86,29 +154,74 @@ class Synthesis(BaseAPI):
         self.voice_id = voice_id
         self.model_name = model_name
         self.language = language
-        self.audio_config = audio_config if audio_config is not None else AudioConfig()
-        self.dual_stream_config = dual_stream_config if dual_stream_config is not None else DualStreamConfig()
-
-        self.parsed_api_key, self.parsed_api_base, self.parsed_api_version = self.parse_settings(api_key, api_base, api_version)
-        self.protocol = os.environ.get('NO_PAUSE_WS_PROTOCOL', self.protocol)
-        self.api_url = '{protocol}://{path}'.format(protocol=self.protocol, path=posixpath.join(self.parsed_api_base['value'], self.parsed_api_version['value'], self.name))
-
-        self.bos, self.eos = self.prepare_bos_and_eos(
-            voice_id=self.voice_id,
-            model_name=self.model_name,
-            language=self.language,
-            audio_config=self.audio_config,
-            dual_stream_config=self.dual_stream_config
+        self.audio_config = audio_config if audio_config is not None else DEFAULT_AUDIO_CONFIG
+        self.dual_stream_config = dual_stream_config if dual_stream_config is not None else DEFAULT_DUAL_STREAM_CONFIG
+
+        parsed_api_key, parsed_api_base, parsed_api_version, headers, self.protocol, api_urls = _resolve_settings(
+            type(self), api_key, _hashable(api_base), api_version, _settings_fallbacks()
+        )
+        self.parsed_api_key = dict(parsed_api_key)
+        self.parsed_api_base = dict(parsed_api_base)
+        self.parsed_api_version = dict(parsed_api_version)
+        self.headers = dict(headers)
+        # the url of the current connection, the first endpoint until one is selected
+        self.api_url = api_urls[0]
+        self.endpoints: EndpointSelector = get_selector(api_urls, self.headers) if len(api_urls) > 1 else None
+        if self.endpoints is not None:
+            # the selector probes while an instance uses it
+            self.endpoints.attach()
+            weakref.finalize(self, self.endpoints.detach)
+
+        # serialized text frames of BOS and EOS, shared by instances with the same config
+        self.bos_message, self.eos_message = _prepare_messages(
+            self.voice_id, self.model_name, self.language, self.audio_config, self.dual_stream_config
         )
 
         self.ws = None # websocket client, could be sync or async
+        self.recorder = recorder
+        self._recording_id = None
         self._in_use = False
 
-        # make sure that one instance processes one request only
-        self.async_semaphore = asyncio.Semaphore(1)
-        self.semaphore = threading.Semaphore(1)
-        self.async_connect_semaphore = asyncio.Semaphore(1)
-        self.connect_semaphore = threading.Semaphore(1)
+        # make sure that one instance processes one request only,
+        # the semaphores are created on first use (see the properties below)
+        self._async_semaphore = None
+        self._semaphore = None
+        self._async_connect_semaphore = None
+        self._connect_semaphore = None
+
+    def _lazy_semaphore(self, attr, factory):
+        semaphore = getattr(self, attr)
+        if semaphore is None:
+            with _semaphore_creation_lock:
+                semaphore = getattr(self, attr)
+                if semaphore is None:
+                    semaphore = factory(1)
+                    setattr(self, attr, semaphore)
+        return semaphore
+
+    @property
+    def async_semaphore(self) -> asyncio.Semaphore:
+        return self._lazy_semaphore('_async_semaphore', asyncio.Semaphore)
+
+    @property
+    def semaphore(self) -> threading.Semaphore:
+        return self._lazy_semaphore('_semaphore', threading.Semaphore)
+
+    @property
+    def async_connect_semaphore(self) -> asyncio.Semaphore:
+        return self._lazy_semaphore('_async_connect_semaphore', asyncio.Semaphore)
+
+    @property
+    def connect_semaphore(self) -> threading.Semaphore:
+        return self._lazy_semaphore('_connect_semaphore', threading.Semaphore)
+
+    @property
+    def bos(self) -> dict:
+        return get_codec().loads(self.bos_message)
+
+    @property
+    def eos(self) -> dict:
+        return get_codec().loads(self.eos_message)
 
     def in_use(self):
         with self.semaphore:
@@ -185,21 +298,62 @@ class Synthesis(BaseAPI):
             alive = False
         return alive
 
+    def _open_timeout(self, i: int, api_urls: List[str]) -> dict:
+        """A black-holed endpoint is given up after the probe timeout while there is another one to fail over to."""
+        return dict(open_timeout=self.endpoints.probe_timeout) if i < len(api_urls) - 1 else {}
+
+    def _handshake(self) -> ClientConnection:
+        """Open a websocket to the best endpoint, failing over to the next ones."""
+        if self.endpoints is None:
+            return websockets.sync.client.connect(self.api_url, additional_headers=self.headers, close_timeout=self.close_timeout)
+        error = None
+        api_urls = self.endpoints.ranked()
+        for i, api_url in enumerate(api_urls):
+            start = time.perf_counter()
+            try:
+                ws = websockets.sync.client.connect(
+                    api_url, additional_headers=self.headers, close_timeout=self.close_timeout, **self._open_timeout(i, api_urls),
+                )
+            except (WebSocketException, OSError, TimeoutError) as e:
+                self.endpoints.failed(api_url)
+                error = e
+                continue
+            self.endpoints.succeeded(api_url, time.perf_counter() - start)
+            self.api_url = api_url
+            return ws
+        raise error
+
+    async def _ahandshake(self) -> WebSocketClientProtocol:
+        if self.endpoints is None:
+            return await websockets.client.connect(self.api_url, extra_headers=self.headers, close_timeout=self.close_timeout)
+        error = None
+        api_urls = self.endpoints.ranked()
+        for i, api_url in enumerate(api_urls):
+            start = time.perf_counter()
+            try:
+                ws = await websockets.client.connect(
+                    api_url, extra_headers=self.headers, close_timeout=self.close_timeout, **self._open_timeout(i, api_urls),
+                )
+            except (WebSocketException, OSError, asyncio.TimeoutError) as e:
+                self.endpoints.failed(api_url)
+                error = e
+                continue
+            self.endpoints.succeeded(api_url, time.perf_counter() - start)
+            self.api_url = api_url
+            return ws
+        raise error
+
     def connect(self):
-        with self.semaphore:
+        with self.connect_semaphore:
             try:
                 is_alive = self.check_alive()
                 if is_alive: return self
                 
-                self.ws = websockets.sync.client.connect(
-                    self.api_url,
-                    additional_headers={
-                        'X-API-KEY': self.parsed_api_key['value'],
-                        'NOPAUSE_PYTHON_SDK_VERSION': nopause.__version__,
-                    }
-                )
+                self.ws = self._handshake()
+                if self.recorder is not None:
+                    self._recording_id = self.recorder.open(self.api_url)
                 # make sure the config ready
-                self.ws.send(json.dumps(self.bos))
+                self._send(self.bos_message)
             except (WebSocketException, TimeoutError, ssl.SSLError) as e:
                 self.close()
                 raise InvalidRequestError(self.display_parsed_settings(self.parsed_api_base, self.parsed_api_version, self.api_url, error=str(e)))
@@ -214,15 +368,11 @@ class Synthesis(BaseAPI):
                 if is_alive: return self
 
                 # init connection
-                self.ws = await websockets.client.connect(
-                    self.api_url,
-                    extra_headers={
-                        'X-API-KEY': self.parsed_api_key['value'],
-                        'NOPAUSE_PYTHON_SDK_VERSION': nopause.__version__,
-                    }
-                )
+                self.ws = await self._ahandshake()
+                if self.recorder is not None:
+                    self._recording_id = self.recorder.open(self.api_url)
                 # make sure the config ready
-                await self.ws.send(json.dumps(self.bos))
+                await self._asend(self.bos_message)
             except (WebSocketException, TimeoutError, ssl.SSLError) as e:
                 await self.aclose()
                 # The api key is not displayed to avoid leakage from log file. 
@@ -233,27 +383,29 @@ class Synthesis(BaseAPI):
                 raise e
         return self
 
-    def __new__(cls, *args, **kwargs):
-        """
-        Sharing function names between class methods and instance methods, such as stream/atream.
-        Here, the methods of stream/astream will be overridden by a instance method when new an instance.
-        Note, it uses a new class which is not equal to the original class, so it will not influence the original Synthesis class.
-        """
-        new_cls = type(cls.__name__, (cls,), {})
-        self = object.__new__(new_cls)
-        # make sure the type(self) == cls (new_cls will be not needed to be accessed in anytime)
-        self.__class__ = cls
-        # overide the original classmethod
-        self.stream = self._stream
-        self.astream = self._astream
-        return self
-
-    def _stream(
+    @hybridmethod
+    def stream(
         cls_or_self,
         text_iter: Iterable[str],
         *args,
         **kwargs,
     ) -> Iterable[AudioChunk]:
+        """
+        Create a dual-stream synthesis.
+        It could be used as both classmethod and instance method, see the note of usage in the Synthesis.__init__.
+        Args:
+            text_iter: An iterable of strings to be synthesized.
+            voice_id: The ID of the voice to use.
+            model_name: Which NoPause model to use.
+            language: Which language to use.
+            audio_config: The audio configuration to use.
+            dual_stream_config: The dual stream configuration to use.
+            api_key: The NoPause API key.
+            api_base: The base URL for the NoPause API.
+            api_version: The version of the NoPause API to use.
+        Returns:
+            A generator of AudioChunk objects.
+        """
         if inspect.isclass(cls_or_self):
             # stream called as classmethod
             synthesizer = cls_or_self(*args, **kwargs).connect()
@@ -264,41 +416,40 @@ class Synthesis(BaseAPI):
             synthesizer = cls_or_self
             synthesizer.set_used()
             terminate_always = False
-            synthesizer.connect()
-
-        class SendTextTask(threading.Thread):
-            def __init__(self, **kwargs):
-                super().__init__(**kwargs)
-                self.event = threading.Event()
-                self._done = False
-
-            def cancel(self):
-                self.event.set()
-
-            def done(self):
-                return self._done
-
-            def run(self):
-                # It could be still blocked in the 'for' grammar if the text_iter is blocked
-                for text in text_iter:
-                    if self.event.is_set():
-                        break
-                    synthesizer.ws.send(json.dumps({"content": TextChunk(text=text, is_end=False).dict()}))
-                if not self.event.is_set():
-                    synthesizer.ws.send(json.dumps(synthesizer.eos))
-                self._done = True
-
-        send_text_task = SendTextTask(daemon=True)
+            try:
+                synthesizer.connect()
+            except BaseException:
+                synthesizer.free_used()
+                raise
+
+        send_text_task = SendTextTask(synthesizer, text_iter)
         send_text_task.start()
 
         return SynthesisResultGenerator(synthesizer, send_text_task, terminate_always=terminate_always)
 
-    async def _astream(
+    @hybridmethod
+    async def astream(
         cls_or_self,
         text_iter: AsyncIterable[str],
         *args,
         **kwargs,
     ) -> AsyncIterable[AudioChunk]:
+        """
+        Create an async dual-stream synthesis.
+        It could be used as both classmethod and instance method, see the note of usage in the Synthesis.__init__.
+        Args:
+            text_iter: An async iterable of strings to be synthesized.
+            voice_id: The ID of the voice to use.
+            model_name: Which NoPause model to use.
+            language: Which language to use.
+            audio_config: The audio configuration to use.
+            dual_stream_config: The dual stream configuration to use.
+            api_key: The NoPause API key.
+            api_base: The base URL for the NoPause API.
+            api_version: The version of the NoPause API to use.
+        Returns:
+            An async generator of AudioChunk objects.
+        """
         if inspect.isclass(cls_or_self):
             # stream called as classmethod
             synthesizer = await cls_or_self(*args, **kwargs).aconnect()
@@ -309,71 +460,47 @@ class Synthesis(BaseAPI):
             synthesizer = cls_or_self
             await synthesizer.aset_used()
             terminate_always = False
-            await synthesizer.aconnect()
+            try:
+                await synthesizer.aconnect()
+            except BaseException:
+                await synthesizer.afree_used()
+                raise
+
+        ws = synthesizer.ws
 
         async def send_text():
             try:
                 async for text in text_iter:
-                    await synthesizer.ws.send(json.dumps({"content": TextChunk(text=text, is_end=False).dict()}))
-                await synthesizer.ws.send(json.dumps(synthesizer.eos))
-            except CancelledError:
+                    await synthesizer._asend(text_message(text), ws)
+                await synthesizer._asend(synthesizer.eos_message, ws)
+            except (CancelledError, ConnectionClosed):
                 pass
+            except Exception:
+                # the text iterator failed: wake up the receiver, which raises the error
+                await ws.close()
+                raise
 
         send_text_task = asyncio.create_task(send_text())
 
         return SynthesisResultGenerator(synthesizer, send_text_task, terminate_always=terminate_always)
 
-    @classmethod
-    def stream(
-        cls,
-        text_iter: Iterable[str],
-        *args,
-        **kwargs,
-    ) -> Iterable[AudioChunk]:
-        """
-        Create a dual-stream synthesis.
-        It could be used as both classmethod and instance method, see the note of usage in the Synthesis.__init__.
-        Args:
-            text_iter: An iterable of strings to be synthesized.
-            voice_id: The ID of the voice to use.
-            model_name: Which NoPause model to use.
-            language: Which language to use.
-            audio_config: The audio configuration to use.
-            dual_stream_config: The dual stream configuration to use.
-            api_key: The NoPause API key.
-            api_base: The base URL for the NoPause API.
-            api_version: The version of the NoPause API to use.
-        Returns:
-            A generator of AudioChunk objects.
-        """
-        return cls._stream(cls, text_iter, **kwargs)
+    def _send(self, message: str, ws: ClientConnection = None):
+        if self.recorder is not None:
+            self.recorder.send(self._recording_id, message)
+        (ws or self.ws).send(message)
 
-    @classmethod
-    async def astream(
-        cls,
-        text_iter: AsyncIterable[str],
-        *args,
-        **kwargs,
-    ) -> AsyncIterable[AudioChunk]:
-        """
-        Create an async dual-stream synthesis.
-        It could be used as both classmethod and instance method, see the note of usage in the Synthesis.__init__.
-        Args:
-            text_iter: An async iterable of strings to be synthesized.
-            voice_id: The ID of the voice to use.
-            model_name: Which NoPause model to use.
-            language: Which language to use.
-            audio_config: The audio configuration to use.
-            dual_stream_config: The dual stream configuration to use.
-            api_key: The NoPause API key.
-            api_base: The base URL for the NoPause API.
-            api_version: The version of the NoPause API to use.
-        Returns:
-            An async generator of AudioChunk objects.
-        """
-        return await cls._astream(cls, text_iter, *args, **kwargs)
+    async def _asend(self, message: str, ws: WebSocketClientProtocol = None):
+        if self.recorder is not None:
+            self.recorder.send(self._recording_id, message)
+        await (ws or self.ws).send(message)
+
+    def _record_close(self):
+        if self.recorder is not None and self._recording_id is not None:
+            self.recorder.close_connection(self._recording_id)
+            self._recording_id = None
 
     def close(self):
+        self._record_close()
         if self.ws is not None:
             try:
                 self.ws.close()
@@ -383,6 +510,7 @@ class Synthesis(BaseAPI):
         self.free_used()
 
     async def aclose(self):
+        self._record_close()
         if self.ws is not None:
             try:
                 await self.ws.close()
@@ -400,10 +528,68 @@ class Synthesis(BaseAPI):
         await self.aclose()
         await self.aconnect()
 
+    def __enter__(self):
+        return self.connect()
+
+    def __exit__(self, *exc):
+        self.close()
+
+    async def __aenter__(self):
+        return await self.aconnect()
+
+    async def __aexit__(self, *exc):
+        await self.aclose()
+
+
+class SendTextTask(threading.Thread):
+    """ Send the text of one stream from a daemon thread.
+
+    The thread may be blocked in the text iterator when the stream is cancelled, so nobody
+    waits for it: it is bound to the connection it started on, stops as soon as the iterator
+    returns, and never sends on a later connection of the synthesizer.
+    """
+    def __init__(self, synthesizer: Synthesis, text_iter: Iterable[str]):
+        super().__init__(daemon=True)
+        self.synthesizer = synthesizer
+        self.ws = synthesizer.ws
+        self.text_iter = text_iter
+        self.event = threading.Event()
+        self.error = None
+        self._done = False
+
+    def cancel(self):
+        self.event.set()
+
+    def done(self):
+        return self._done
+
+    def run(self):
+        try:
+            for text in self.text_iter:
+                if self.event.is_set():
+                    return
+                self.synthesizer._send(text_message(text), self.ws)
+            if not self.event.is_set():
+                self.synthesizer._send(self.synthesizer.eos_message, self.ws)
+        except ConnectionClosed:
+            pass # closed by terminate, or by the server which the receiver reports
+        except Exception as e:
+            self.error = e
+            if not self.event.is_set():
+                # the text iterator failed: wake up the receiver, which raises the error
+                self.ws.close()
+        finally:
+            self._done = True
+
 
 class SynthesisResultGenerator:
     """It is could be used as a generator or an async generator according to the websocket protocol.
     """
+    # seconds aterminate waits for a cancelled sender to finish
+    sender_timeout: float = 0.1
+    # seconds terminate waits for the closing handshake, which unread audio holds up on a sync connection
+    terminate_close_timeout: float = 0.1
+
     def __init__(
         self,
         synthesizer: Synthesis,
@@ -420,7 +606,39 @@ class SynthesisResultGenerator:
         self.send_text_task = send_text_task
         self.is_end = False # for receiving text
         self.terminated = False
+        # the synthesizer was freed at the end of the stream, it may carry another stream since
+        self.released = False
         self.terminate_always = terminate_always
+        # seconds from terminate() until the connection is closed and the synthesizer is free again
+        self.cancel_to_idle = None
+        # the part of the last chunk not read yet by readinto/areadinto
+        self._pending = memoryview(b'')
+        if leaks.detector is not None:
+            leaks.detector.track(self)
+
+    def _ended(self):
+        if leaks.detector is not None:
+            leaks.detector.ended(self)
+
+    def _release(self):
+        self.released = True
+        if not self.terminated:
+            # a terminated stream has freed the synthesizer, which may carry another stream since
+            self._synthesizer.free_used()
+        self._ended()
+
+    async def _arelease(self):
+        self.released = True
+        if not self.terminated:
+            await self._synthesizer.afree_used()
+        self._ended()
+
+    def sender_error(self):
+        """The error raised by the text iterator, if any."""
+        task = self.send_text_task
+        if isinstance(task, asyncio.Task):
+            return task.exception() if task.done() and not task.cancelled() else None
+        return task.error
 
     def parse_result(self, data):
         if data['code'] != 0:
@@ -445,16 +663,23 @@ class SynthesisResultGenerator:
             raise StopIteration
 
         if self.is_end:
-            if self.terminate_always:
-                self.terminate()
-            self._synthesizer.free_used()
+            if not self.released:
+                if self.terminate_always:
+                    self.terminate()
+                self._release()
             raise StopIteration
         try:
-            data = json.loads(self.ws.recv())
+            message = self.ws.recv()
+            if self._synthesizer.recorder is not None:
+                self._synthesizer.recorder.recv(self._synthesizer._recording_id, message)
+            data = get_codec().decode_response(message)
             chunk, is_end = self.parse_result(data)
         except Exception as e:
             if not self.terminated:
                 self.terminate()
+            error = self.sender_error()
+            if error is not None:
+                raise error from e
             if isinstance(e, WebSocketException):
                 raise InvalidRequestError(str(e))
             else:
@@ -465,7 +690,7 @@ class SynthesisResultGenerator:
             if chunk is None:
                 if self.terminate_always:
                     self.terminate()
-                self._synthesizer.free_used()
+                self._release()
                 raise StopIteration # todo: return a empty chunk to return a is_end signal?
             else:
                 return chunk
@@ -480,16 +705,23 @@ class SynthesisResultGenerator:
             raise StopAsyncIteration
 
         if self.is_end:
-            if self.terminate_always:
-                await self.aterminate()
-            await self._synthesizer.afree_used()
+            if not self.released:
+                if self.terminate_always:
+                    await self.aterminate()
+                await self._arelease()
             raise StopAsyncIteration
         try:
-            data = json.loads(await self.ws.recv())
+            message = await self.ws.recv()
+            if self._synthesizer.recorder is not None:
+                self._synthesizer.recorder.recv(self._synthesizer._recording_id, message)
+            data = get_codec().decode_response(message)
             chunk, is_end = self.parse_result(data)
         except Exception as e:
             if not self.terminated:
                 await self.aterminate()
+            error = self.sender_error()
+            if error is not None:
+                raise error from e
             if isinstance(e, WebSocketException):
                 raise InvalidRequestError(str(e))
             else:
@@ -499,7 +731,7 @@ class SynthesisResultGenerator:
             self.is_end = True
             if chunk is None:
                 if self.terminate_always: await self.aterminate()
-                await self._synthesizer.afree_used()
+                await self._arelease()
                 raise StopAsyncIteration # todo?: return a empty chunk to return a is_end signal?
             else:
                 return chunk
@@ -514,7 +746,78 @@ class SynthesisResultGenerator:
 
     def __aiter__(self):
         return self
-    
+
+    def _fill(self, target: memoryview, filled: int) -> int:
+        n = min(len(self._pending), len(target) - filled)
+        target[filled:filled + n] = self._pending[:n]
+        self._pending = self._pending[n:]
+        return filled + n
+
+    def readinto(self, buffer) -> int:
+        """
+        Copy the pcm of the next chunks straight into `buffer`, across chunk boundaries.
+        The buffer is filled completely unless the stream ends first, so its size sets the latency.
+        Do not mix with iterating the chunks, the rest of a partly read chunk would be skipped.
+        Args:
+            buffer: A writable buffer (bytearray, memoryview, numpy array, ...).
+        Returns:
+            The number of bytes written, 0 at the end of the stream.
+        """
+        target = memoryview(buffer).cast('B')
+        filled = self._fill(target, 0)
+        while filled < len(target):
+            try:
+                self._pending = memoryview(next(self).data)
+            except StopIteration:
+                break
+            filled = self._fill(target, filled)
+        return filled
+
+    async def areadinto(self, buffer) -> int:
+        """The async version of readinto."""
+        target = memoryview(buffer).cast('B')
+        filled = self._fill(target, 0)
+        while filled < len(target):
+            try:
+                self._pending = memoryview((await self.__anext__()).data)
+            except StopAsyncIteration:
+                break
+            filled = self._fill(target, filled)
+        return filled
+
+    def frames(self, frame_ms: float = 20, samples: int = None, pad_last: bool = True) -> Iterator[AudioFrame]:
+        """
+        Iterate the audio in frames of exactly `frame_ms` (or `samples`), e.g. 20 ms for WebRTC
+        or the blocksize of a sounddevice stream.
+        Args:
+            frame_ms: The duration of the frames.
+            samples: The number of samples of the frames, instead of frame_ms.
+            pad_last: Pad the last partial frame with silence, instead of yielding it shorter.
+        Returns:
+            A generator of AudioFrame objects with presentation timestamps.
+        """
+        splitter = FrameSplitter(self._synthesizer.audio_config.sample_rate, frame_ms, samples)
+        for chunk in self:
+            yield from splitter.push(chunk)
+        frame = splitter.flush(pad_last)
+        if frame is not None:
+            yield frame
+
+    async def aframes(self, frame_ms: float = 20, samples: int = None, pad_last: bool = True) -> AsyncIterator[AudioFrame]:
+        """The async version of frames."""
+        splitter = FrameSplitter(self._synthesizer.audio_config.sample_rate, frame_ms, samples)
+        async for chunk in self:
+            for frame in splitter.push(chunk):
+                yield frame
+        frame = splitter.flush(pad_last)
+        if frame is not None:
+            yield frame
+
+    def as_file(self) -> 'AudioReader':
+        """Return a read-only binary file of the pcm, for libraries that want a file object."""
+        assert not self.use_async
+        return AudioReader(self)
+
     def close(self):
         assert not self.use_async
         self._synthesizer.close()
@@ -524,25 +827,77 @@ class SynthesisResultGenerator:
         await self._synthesizer.aclose()
 
     def terminate(self):
-        """terminate every thing
+        """terminate every thing, without waiting for the text iterator
         """
         assert not self.use_async
+        start = time.perf_counter()
         self.terminate_always = True
+        self.terminated = True
         if not self.send_text_task.done():
             self.send_text_task.cancel()
+        if self.ws is not None:
+            # the audio still in flight is dropped anyway
+            self.ws.close_timeout = min(self.ws.close_timeout, self.terminate_close_timeout)
         self.close()
+        self.cancel_to_idle = time.perf_counter() - start
+        self._ended()
 
     async def aterminate(self):
-        """terminate every thing
+        """terminate every thing, waiting at most `sender_timeout` for the text iterator
         """
         assert self.use_async
+        start = time.perf_counter()
         self.terminate_always = True
-        if not self.send_text_task.done():
-            self.send_text_task.cancel()
-            await self.send_text_task
-        error = self.send_text_task.exception()
-        if error: raise error
+        self.terminated = True
+        task = self.send_text_task
+        if not task.done():
+            task.cancel()
+        # the connection is closed first, the sender may be stuck in the text iterator
         await self.aclose()
+        if not task.done():
+            await asyncio.wait({task}, timeout=self.sender_timeout)
+        elif not task.cancelled():
+            task.exception() # the error of a cancelled stream is not raised, but retrieved
+        self.cancel_to_idle = time.perf_counter() - start
+        self._ended()
+
+    def finish(self):
+        """Release the session: terminate it unless it was received to its end, nothing if it was released already."""
+        if self.terminated or self.released:
+            return
+        if self.is_end:
+            for _ in self: # only releases the synthesizer
+                pass
+        else:
+            self.terminate()
+
+    async def afinish(self):
+        """The async version of finish, it also cancels the sender task and waits for it (up to sender_timeout)."""
+        if self.terminated or self.released:
+            return
+        if self.is_end:
+            async for _ in self:
+                pass
+        else:
+            await self.aterminate()
+
+    def __enter__(self):
+        """
+        Usage:
+            with synthesizer.stream(text_iterator) as result:
+                for chunk in result: ...
+            # leaving the block, even on an exception, stops the sender and frees the synthesizer
+        """
+        return self
+
+    def __exit__(self, *exc):
+        self.finish()
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        await self.afinish()
 
     def interrupt(self):
         self.terminate()
@@ -552,3 +907,28 @@ class SynthesisResultGenerator:
         # drop the data by terminate the websocket and create a new connection soon
         await self.aterminate()
         await self._synthesizer.aconnect()
+
+
+class AudioReader(io.RawIOBase):
+    """ A read-only, unbuffered binary file of the pcm of a (sync) synthesis.
+
+    Usage:
+        ffmpeg = subprocess.Popen(['ffmpeg', '-f', 's16le', '-ar', '24000', '-i', '-', 'out.mp3'], stdin=subprocess.PIPE)
+        with synthesizer.stream(text_iterator).as_file() as audio:
+            shutil.copyfileobj(audio, ffmpeg.stdin)
+    """
+    def __init__(self, result_generator: SynthesisResultGenerator):
+        super().__init__()
+        self.result_generator = result_generator
+
+    def readable(self) -> bool:
+        return True
+
+    def readinto(self, buffer) -> int:
+        return self.result_generator.readinto(buffer)
+
+    def close(self):
+        """Terminate the synthesis if it has not been read to the end."""
+        if not self.closed:
+            self.result_generator.finish()
+        super().close()
@@ -1,5 +1,4 @@
 import os
-import json
 import requests
 import posixpath
 from pathlib import Path
@@ -8,6 +7,7 @@ from requests.exceptions import RequestException
 
 import nopause
 from nopause.core.base import NoPauseResponse
+from nopause.core.codec import get_codec
 from nopause.sdk.base import BaseAPI
 from nopause.sdk.error import InvalidRequestError, FormatError, NoPauseError
 
@@ -51,8 +51,8 @@ class Voice(BaseAPI):
         message = None
 
         try:
-            response = result.json()
-        except json.decoder.JSONDecodeError:
+            response = get_codec().loads(result.content)
+        except ValueError:
             message = result.content
             response = {}
 
@@ -79,7 +79,7 @@ class Voice(BaseAPI):
                 ("description", (None, description)),
                 ("gender", (None, gender)),
             ])
-            url = '{protocol}://{path}'.format(protocol=api.protocol, path=posixpath.join(api.parsed_api_base['value'], api.parsed_api_version['value'], api.name))
+            url = '{protocol}://{path}'.format(protocol=api.protocol, path=posixpath.join(api.split_api_base(api.parsed_api_base['value'])[0], api.parsed_api_version['value'], api.name))
             result = api.session.put(url, files=files)
         except RequestException as e:
             raise InvalidRequestError(cls.display_parsed_settings(api.parsed_api_base, api.parsed_api_version, url, error=str(e)))
@@ -94,7 +94,7 @@ class Voice(BaseAPI):
     def get_voices(cls, page: int = 1, page_size: int = 100, **kwargs):
         api = cls(**kwargs)
         try:
-            url = '{protocol}://{path}'.format(protocol=api.protocol, path=posixpath.join(api.parsed_api_base['value'], api.parsed_api_version['value'], api.name))
+            url = '{protocol}://{path}'.format(protocol=api.protocol, path=posixpath.join(api.split_api_base(api.parsed_api_base['value'])[0], api.parsed_api_version['value'], api.name))
             result = api.session.get(url, params=dict(page=page, page_size=page_size))
         except RequestException as e:
             raise InvalidRequestError(cls.display_parsed_settings(api.parsed_api_base, api.parsed_api_version, url, error=str(e)))
@@ -111,7 +111,7 @@ class Voice(BaseAPI):
     def delete(cls, voice_id: str, **kwargs):
         api = cls(**kwargs)
         try:
-            url = '{protocol}://{path}'.format(protocol=api.protocol, path=posixpath.join(api.parsed_api_base['value'], api.parsed_api_version['value'], api.name))
+            url = '{protocol}://{path}'.format(protocol=api.protocol, path=posixpath.join(api.split_api_base(api.parsed_api_base['value'])[0], api.parsed_api_version['value'], api.name))
             result = api.session.delete(url, json=dict(voice_id=voice_id))
         except RequestException as e:
             raise InvalidRequestError(cls.display_parsed_settings(api.parsed_api_base, api.parsed_api_version, url, error=str(e)))
@@ -0,0 +1,364 @@
+""" Hand the audio of a synthesis over to another process through shared memory.
+
+The writer copies each chunk once into a ring buffer in `multiprocessing.shared_memory`,
+and the reader in the other process gets the pcm as a memoryview of that buffer, so no
+chunk is pickled or copied again on the way:
+
+    # producer process
+    writer = SharedAudioWriter(capacity=1 << 20)
+    send_to_the_other_process(writer.name)
+    writer.consume(nopause.Synthesis.stream(text_iterator))   # marks the end of the stream
+    writer.close()
+
+    # consumer process
+    reader = SharedAudioReader(name)
+    for chunk in reader:                 # SharedChunk, chunk.data is a view of the buffer
+        rtp_sender.send(chunk.data)
+    reader.close()
+
+There is one writer and one reader per buffer. The writer waits when the reader lags a full
+buffer behind, or while the consumer still holds a chunk it was handed (e.g. as a numpy array).
+The write position is published after the data, but nothing orders the two stores for the other
+process on weakly ordered CPUs, so the reader does not rely on it: each metadata slot carries the
+sequence number of its chunk and a CRC32 of the slot and the pcm, and a chunk is only handed out
+once both match, like the re-check of a seqlock.
+"""
+import os
+import time
+import zlib
+import ctypes
+import struct
+import asyncio
+import weakref
+from collections import deque
+from multiprocessing import resource_tracker
+from multiprocessing.shared_memory import SharedMemory
+from typing import AsyncIterable, Iterable, NamedTuple, Optional, Union
+
+from nopause.core.audio import AudioChunk
+from nopause.sdk.error import NoPauseError
+
+MAGIC = b'NPSA'
+# magic, data capacity, metadata slots, sample rate, channels, flags,
+# write position, chunks written, read position, chunks read
+HEADER = struct.Struct('<4sQIIII4xQQQQ')
+FLAGS_OFFSET = 24
+WRITE_OFFSET = 32 # write position, chunks written
+READ_OFFSET = 48 # read position, chunks read
+POSITIONS = struct.Struct('<QQ')
+FLAGS = struct.Struct('<I')
+# sequence number, chunk id, position, size, rtf, chunk size (us)
+META_FIELDS = struct.Struct('<QqQIdq')
+# the fields, then the crc32 of the fields and the pcm
+META = struct.Struct('<QqQIdqI')
+CRC = struct.Struct('<I')
+
+END_OF_STREAM = 1
+ERROR = 2
+
+DEFAULT_POLL_INTERVAL = 0.001
+
+
+class SharedChunk(NamedTuple):
+    """
+    A chunk read from shared memory, `data` is a view of the buffer: the writer does not overwrite
+    it while the consumer holds an export of it (e.g. a numpy array), or it is valid until the next read.
+    """
+    chunk_id: int
+    data: memoryview
+    sample_rate: int
+    channels: int
+    rtf: float
+    chunk_size_us: int
+
+    def to_audio_chunk(self) -> AudioChunk:
+        """Copy the chunk out of the shared buffer."""
+        return AudioChunk(
+            data=bytes(self.data), chunk_id=self.chunk_id, sample_rate=self.sample_rate,
+            channels=self.channels, rtf=self.rtf, chunk_size_us=self.chunk_size_us,
+        )
+
+
+def _tracker_name(shm: SharedMemory) -> str:
+    # the name the segment is registered under with the resource tracker
+    return '/' + shm.name
+
+
+def _attach(name: str) -> SharedMemory:
+    try:
+        return SharedMemory(name=name, track=False) # python >= 3.13
+    except TypeError:
+        pass
+    # older versions register every attached segment with the resource tracker, which unlinks
+    # it when the process exits: only the creator may do that, so the segment is unregistered
+    # again (SharedAudioWriter.close registers it back before unlinking it, in case both sides
+    # share a tracker)
+    shm = SharedMemory(name=name)
+    if os.name == 'posix':
+        resource_tracker.unregister(_tracker_name(shm), 'shared_memory')
+    return shm
+
+
+class _SharedRing:
+    def __init__(self, shm: SharedMemory):
+        self.shm = shm
+        self.buf = shm.buf
+        magic, self.capacity, self.slots, self.sample_rate, self.channels, *_ = HEADER.unpack_from(self.buf)
+        if magic != MAGIC:
+            raise NoPauseError(f'{shm.name} is not a nopause shared audio buffer')
+        self.meta_start = HEADER.size
+        self.data_start = self.meta_start + self.slots * META.size
+
+    @property
+    def name(self) -> str:
+        return self.shm.name
+
+    def flags(self) -> int:
+        return FLAGS.unpack_from(self.buf, FLAGS_OFFSET)[0]
+
+    def written(self):
+        return POSITIONS.unpack_from(self.buf, WRITE_OFFSET)
+
+    def read(self):
+        return POSITIONS.unpack_from(self.buf, READ_OFFSET)
+
+    def release(self):
+        self.buf = None
+        self.shm.close()
+
+
+class SharedAudioWriter:
+    """ The producer side of a shared-memory audio buffer.
+    """
+    def __init__(
+        self,
+        name: Optional[str] = None,
+        capacity: int = 1 << 20,
+        slots: int = 256,
+        sample_rate: int = 24000,
+        channels: int = 1,
+        poll_interval: float = DEFAULT_POLL_INTERVAL,
+    ):
+        """
+        Args:
+            name: The name of the shared memory (default: a random one, see `name`).
+            capacity: The pcm bytes the buffer holds, larger than the largest chunk.
+            slots: The number of chunks the buffer holds.
+            sample_rate: The sample rate of the audio, for the reader.
+            channels: The number of channels of the audio, for the reader.
+            poll_interval: Seconds between two checks while waiting for the reader.
+        """
+        shm = SharedMemory(name=name, create=True, size=HEADER.size + slots * META.size + capacity)
+        HEADER.pack_into(shm.buf, 0, MAGIC, capacity, slots, sample_rate, channels, 0, 0, 0, 0, 0)
+        self.ring = _SharedRing(shm)
+        self.poll_interval = poll_interval
+        self.position, self.count = 0, 0
+
+    @property
+    def name(self) -> str:
+        return self.ring.name
+
+    def _reserve(self, size: int):
+        """Return the position of `size` bytes in the ring, or None while the reader is too far behind."""
+        ring = self.ring
+        if size > ring.capacity:
+            raise NoPauseError(f'A chunk of {size} bytes does not fit in a shared buffer of {ring.capacity} bytes.')
+        position = self.position
+        offset = position % ring.capacity
+        if offset + size > ring.capacity:
+            # chunks are kept contiguous so that the reader gets a single view
+            position += ring.capacity - offset
+        read_position, read_count = ring.read()
+        if position + size - read_position > ring.capacity or self.count - read_count >= ring.slots:
+            return None
+        return position
+
+    def _publish(self, chunk: AudioChunk, position: int):
+        ring = self.ring
+        size = len(chunk.data)
+        start = ring.data_start + position % ring.capacity
+        ring.buf[start:start + size] = chunk.data
+        fields = META_FIELDS.pack(self.count, chunk.chunk_id, position, size, chunk.rtf, chunk.chunk_size_us)
+        slot = ring.meta_start + self.count % ring.slots * META.size
+        ring.buf[slot:slot + META.size] = fields + CRC.pack(zlib.crc32(chunk.data, zlib.crc32(fields)))
+        self.position, self.count = position + size, self.count + 1
+        POSITIONS.pack_into(ring.buf, WRITE_OFFSET, self.position, self.count)
+
+    def write(self, chunk: AudioChunk):
+        """Copy the chunk into the buffer, waiting while the reader is a full buffer behind."""
+        while True:
+            position = self._reserve(len(chunk.data))
+            if position is not None:
+                return self._publish(chunk, position)
+            time.sleep(self.poll_interval)
+
+    async def awrite(self, chunk: AudioChunk):
+        while True:
+            position = self._reserve(len(chunk.data))
+            if position is not None:
+                return self._publish(chunk, position)
+            await asyncio.sleep(self.poll_interval)
+
+    def finish(self, error: bool = False):
+        """Signal the end of the stream to the reader."""
+        FLAGS.pack_into(self.ring.buf, FLAGS_OFFSET, self.ring.flags() | END_OF_STREAM | (ERROR if error else 0))
+
+    def consume(self, result_generator: Iterable[AudioChunk]):
+        """Write every chunk of a (sync) result generator, then signal the end of the stream."""
+        try:
+            for chunk in result_generator:
+                self.write(chunk)
+        except BaseException:
+            self.finish(error=True)
+            raise
+        self.finish()
+
+    async def aconsume(self, result_generator: AsyncIterable[AudioChunk]):
+        """Write every chunk of an async result generator, then signal the end of the stream."""
+        try:
+            async for chunk in result_generator:
+                await self.awrite(chunk)
+        except BaseException:
+            self.finish(error=True)
+            raise
+        self.finish()
+
+    def close(self, unlink: bool = True):
+        """Detach from the buffer, and remove it unless the reader is to attach later."""
+        shm = self.ring.shm
+        self.ring.release()
+        if unlink:
+            if os.name == 'posix':
+                # a reader sharing the resource tracker of this process has unregistered it
+                resource_tracker.register(_tracker_name(shm), 'shared_memory')
+            shm.unlink()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+class SharedAudioReader:
+    """ The consumer side of a shared-memory audio buffer, iterated like a result generator.
+    """
+    def __init__(self, name: str, poll_interval: float = DEFAULT_POLL_INTERVAL):
+        """
+        Args:
+            name: The name of the buffer (SharedAudioWriter.name).
+            poll_interval: Seconds between two checks while waiting for the writer.
+        """
+        self.ring = _SharedRing(_attach(name))
+        self.poll_interval = poll_interval
+        # the chunks handed out and not given back to the writer yet: the exporter of the view
+        # (alive while anything made from the view is), the view and the read position after it
+        self.views = deque()
+        self.position, self.count = self.ring.read()
+
+    @property
+    def sample_rate(self) -> int:
+        return self.ring.sample_rate
+
+    @property
+    def channels(self) -> int:
+        return self.ring.channels
+
+    def _advance(self):
+        # the chunks returned so far are handed back to the writer, up to the first one the
+        # consumer still exports (e.g. as a numpy array): the writer must not overwrite it yet
+        released = None
+        while self.views:
+            exporter, view, position, count = self.views[0]
+            try:
+                view.release()
+            except BufferError:
+                break
+            if exporter() is not None:
+                break
+            self.views.popleft()
+            released = position, count
+        if released is not None:
+            POSITIONS.pack_into(self.ring.buf, READ_OFFSET, *released)
+
+    def _take(self) -> Union[SharedChunk, bool, None]:
+        """Return the next chunk, False at the end of the stream, None while nothing is available yet."""
+        ring = self.ring
+        _, written = ring.written()
+        if written == self.count:
+            flags = ring.flags()
+            if flags & ERROR:
+                raise NoPauseError('The synthesis ended with an error in the writer process.')
+            return False if flags & END_OF_STREAM and ring.written()[1] == self.count else None
+        start = ring.meta_start + self.count % ring.slots * META.size
+        meta = bytes(ring.buf[start:start + META.size])
+        count, chunk_id, position, size, rtf, chunk_size_us, crc = META.unpack(meta)
+        if count != self.count or size > ring.capacity:
+            return None # the slot is not visible to this process yet
+        start = ring.data_start + position % ring.capacity
+        # the view is exported by an object of its own, so that a view or an array the consumer
+        # made from it keeps that object alive and tells that the chunk is still in use
+        exporter = (ctypes.c_char * size).from_buffer(ring.buf, start)
+        view = memoryview(exporter).cast('B')
+        if zlib.crc32(view, zlib.crc32(meta[:META_FIELDS.size])) != crc:
+            view.release()
+            return None # neither is all of its pcm
+        self.position, self.count = position + size, self.count + 1
+        self.views.append((weakref.ref(exporter), view, self.position, self.count))
+        return SharedChunk(chunk_id, view, ring.sample_rate, ring.channels, rtf, chunk_size_us)
+
+    def read(self, timeout: Optional[float] = None) -> Optional[SharedChunk]:
+        """
+        Return the next chunk, or None at the end of the stream.
+        Args:
+            timeout: Seconds to wait for the next chunk (default: forever), TimeoutError after it.
+        """
+        self._advance()
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            chunk = self._take()
+            if chunk is False:
+                return None
+            if chunk is not None:
+                return chunk
+            if deadline is not None and time.monotonic() > deadline:
+                raise TimeoutError('No audio from the shared buffer.')
+            time.sleep(self.poll_interval)
+
+    async def aread(self) -> Optional[SharedChunk]:
+        self._advance()
+        while True:
+            chunk = self._take()
+            if chunk is False:
+                return None
+            if chunk is not None:
+                return chunk
+            await asyncio.sleep(self.poll_interval)
+
+    def __next__(self) -> SharedChunk:
+        chunk = self.read()
+        if chunk is None:
+            raise StopIteration
+        return chunk
+
+    async def __anext__(self) -> SharedChunk:
+        chunk = await self.aread()
+        if chunk is None:
+            raise StopAsyncIteration
+        return chunk
+
+    def __iter__(self):
+        return self
+
+    def __aiter__(self):
+        return self
+
+    def close(self):
+        self._advance()
+        self.ring.release()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
@@ -0,0 +1,221 @@
+""" Streaming G.711 (μ-law / A-law) output for telephony media streams.
+
+Request 8 kHz audio from the server and re-frame the result generator into fixed
+packetization frames (20 ms = 160 bytes by default):
+
+    synthesizer = nopause.Synthesis(audio_config=nopause.AudioConfig(sample_rate=8000))
+    for frame in TelephonyStream(synthesizer.stream(text_iterator), encoding='mulaw'):
+        websocket.send(json.dumps(frame.media_message(stream_sid)))
+
+Encoding is a single lookup in a 64K-entry table per sample (built once with numpy).
+Audio at 16/24 kHz is decimated to 8 kHz by averaging, but 8 kHz from the server is preferred.
+
+Requires numpy: pip install nopause[audio]
+"""
+import base64
+from functools import lru_cache
+from typing import AsyncIterable, Iterable, List, NamedTuple, Optional, Union
+
+try:
+    import numpy as np
+except ImportError as e:
+    raise ImportError('nopause.telephony requires numpy, install it with: pip install nopause[audio]') from e
+
+from nopause.core.audio import AudioChunk
+from nopause.sdk.error import NoPauseError
+
+MULAW = 'mulaw'
+ALAW = 'alaw'
+TELEPHONY_SAMPLE_RATE = 8000
+
+_SEGMENT_END_MULAW = np.array([0x3F, 0x7F, 0xFF, 0x1FF, 0x3FF, 0x7FF, 0xFFF, 0x1FFF])
+_SEGMENT_END_ALAW = np.array([0x1F, 0x3F, 0x7F, 0xFF, 0x1FF, 0x3FF, 0x7FF, 0xFFF])
+
+
+def _mulaw_encode(pcm: np.ndarray) -> np.ndarray:
+    value = pcm.astype(np.int32) >> 2
+    mask = np.where(value < 0, 0x7F, 0xFF)
+    value = np.minimum(np.abs(value), 8159) + (0x84 >> 2)
+    segment = np.searchsorted(_SEGMENT_END_MULAW, value)
+    encoded = (segment << 4) | ((value >> (segment + 1)) & 0xF)
+    encoded = np.where(segment >= 8, 0x7F, encoded)
+    return (encoded ^ mask).astype(np.uint8)
+
+def _alaw_encode(pcm: np.ndarray) -> np.ndarray:
+    value = pcm.astype(np.int32) >> 3
+    mask = np.where(value >= 0, 0xD5, 0x55)
+    value = np.where(value >= 0, value, -value - 1)
+    segment = np.searchsorted(_SEGMENT_END_ALAW, value)
+    shift = np.where(segment < 2, 1, segment)
+    encoded = (segment << 4) | ((value >> shift) & 0xF)
+    encoded = np.where(segment >= 8, 0x7F, encoded)
+    return (encoded ^ mask).astype(np.uint8)
+
+def _mulaw_decode(encoded: np.ndarray) -> np.ndarray:
+    value = ~encoded.astype(np.int32) & 0xFF
+    t = (((value & 0x0F) << 3) + 0x84) << ((value & 0x70) >> 4)
+    return np.where(value & 0x80, 0x84 - t, t - 0x84).astype(np.int16)
+
+def _alaw_decode(encoded: np.ndarray) -> np.ndarray:
+    value = encoded.astype(np.int32) ^ 0x55
+    t = (value & 0x0F) << 4
+    segment = (value & 0x70) >> 4
+    t = np.where(segment == 0, t + 8, np.where(segment == 1, t + 0x108, (t + 0x108) << np.maximum(segment - 1, 0)))
+    return np.where(value & 0x80, t, -t).astype(np.int16)
+
+@lru_cache(maxsize=None)
+def encode_table(encoding: str) -> np.ndarray:
+    """The code of every int16 value, indexed by the value as uint16."""
+    pcm = np.arange(65536, dtype=np.uint16).view(np.int16)
+    if encoding == MULAW:
+        return _mulaw_encode(pcm)
+    if encoding == ALAW:
+        return _alaw_encode(pcm)
+    raise NoPauseError(f'Unknown telephony encoding: {encoding} (expected {MULAW} or {ALAW})')
+
+@lru_cache(maxsize=None)
+def decode_table(encoding: str) -> np.ndarray:
+    codes = np.arange(256, dtype=np.uint8)
+    if encoding == MULAW:
+        return _mulaw_decode(codes)
+    if encoding == ALAW:
+        return _alaw_decode(codes)
+    raise NoPauseError(f'Unknown telephony encoding: {encoding} (expected {MULAW} or {ALAW})')
+
+def encode(pcm: bytes, encoding: str = MULAW) -> bytes:
+    """Encode 16-bit little-endian pcm to G.711 bytes."""
+    return encode_table(encoding)[np.frombuffer(pcm, dtype='<u2')].tobytes()
+
+def decode(data: bytes, encoding: str = MULAW) -> bytes:
+    """Decode G.711 bytes to 16-bit little-endian pcm."""
+    return decode_table(encoding)[np.frombuffer(data, dtype=np.uint8)].astype('<i2').tobytes()
+
+
+class TelephonyFrame(NamedTuple):
+    """A fixed-size G.711 frame with its position in the stream."""
+    payload: bytes
+    sequence: int
+    timestamp: int # in samples at 8 kHz
+    encoding: str
+
+    def base64(self) -> str:
+        return base64.b64encode(self.payload).decode('ascii')
+
+    def media_message(self, stream_sid: str) -> dict:
+        """The media event of telephony media-stream websockets."""
+        return {'event': 'media', 'streamSid': stream_sid, 'media': {'payload': self.base64()}}
+
+
+class TelephonyEncoder:
+    """ Encode chunks to G.711 and cut them into frames of exactly `frame_ms`, carrying the rest over.
+    """
+    def __init__(self, encoding: str = MULAW, frame_ms: int = 20):
+        self.encoding = encoding
+        self.table = encode_table(encoding)
+        self.frame_bytes = TELEPHONY_SAMPLE_RATE * frame_ms // 1000
+        self.carry = b''
+        self.pcm_carry = np.empty(0, dtype=np.int16) # samples short of a whole group to average
+        self.sequence = 0
+        self.timestamp = 0
+
+    def _to_8k(self, chunk: AudioChunk) -> np.ndarray:
+        pcm = np.frombuffer(chunk.data, dtype='<i2')
+        if chunk.sample_rate == TELEPHONY_SAMPLE_RATE:
+            return pcm
+        factor, rest = divmod(chunk.sample_rate, TELEPHONY_SAMPLE_RATE)
+        if rest:
+            raise NoPauseError(f'Cannot convert {chunk.sample_rate} Hz to 8 kHz, request AudioConfig(sample_rate=8000) instead.')
+        if len(self.pcm_carry):
+            pcm = np.concatenate((self.pcm_carry, pcm))
+        n = len(pcm) // factor * factor
+        self.pcm_carry = pcm[n:].copy()
+        # the mean of each group is also the only low-pass filter before the decimation
+        return pcm[:n].reshape(-1, factor).mean(axis=1).astype(np.int16)
+
+    def _frame(self, payload: bytes) -> TelephonyFrame:
+        frame = TelephonyFrame(payload, self.sequence, self.timestamp, self.encoding)
+        self.sequence += 1
+        self.timestamp += len(payload)
+        return frame
+
+    def push(self, chunk: AudioChunk) -> List[TelephonyFrame]:
+        encoded = self.table[self._to_8k(chunk).view(np.uint16)].tobytes()
+        data = self.carry + encoded if self.carry else encoded
+        n_frames = len(data) // self.frame_bytes
+        frames = [self._frame(data[i * self.frame_bytes:(i + 1) * self.frame_bytes]) for i in range(n_frames)]
+        self.carry = data[n_frames * self.frame_bytes:]
+        return frames
+
+    def flush(self, pad: bool = True) -> Optional[TelephonyFrame]:
+        """Return the last partial frame (padded with encoded silence), if any."""
+        data, self.carry = self.carry, b''
+        if not data:
+            return None
+        if pad:
+            data += bytes([self.table[0]]) * (self.frame_bytes - len(data))
+        return self._frame(data)
+
+
+class TelephonyStream:
+    """ Iterate a (sync or async) result generator as G.711 TelephonyFrames.
+    """
+    def __init__(
+        self,
+        result_generator: Union[Iterable[AudioChunk], AsyncIterable[AudioChunk]],
+        encoding: str = MULAW,
+        frame_ms: int = 20,
+        pad_last: bool = True,
+    ):
+        self.result_generator = result_generator
+        self.use_async = hasattr(result_generator, '__anext__')
+        self.encoder = TelephonyEncoder(encoding, frame_ms)
+        self.pad_last = pad_last
+        self.pending: List[TelephonyFrame] = []
+        self.iterator = None
+        self.is_end = False
+
+    def _on_end(self):
+        self.is_end = True
+        frame = self.encoder.flush(self.pad_last)
+        if frame is not None:
+            self.pending.append(frame)
+
+    def __next__(self) -> TelephonyFrame:
+        if self.iterator is None:
+            self.iterator = iter(self.result_generator)
+        while not self.pending and not self.is_end:
+            try:
+                self.pending = self.encoder.push(next(self.iterator))
+            except StopIteration:
+                self._on_end()
+        if self.pending:
+            return self.pending.pop(0)
+        raise StopIteration
+
+    async def __anext__(self) -> TelephonyFrame:
+        while not self.pending and not self.is_end:
+            try:
+                self.pending = self.encoder.push(await self.result_generator.__anext__())
+            except StopAsyncIteration:
+                self._on_end()
+        if self.pending:
+            return self.pending.pop(0)
+        raise StopAsyncIteration
+
+    def __iter__(self):
+        return self
+
+    def __aiter__(self):
+        return self
+
+    def terminate(self):
+        self.is_end = True
+        self.pending = []
+        if hasattr(self.result_generator, 'terminate'):
+            self.result_generator.terminate()
+
+    async def aterminate(self):
+        self.is_end = True
+        self.pending = []
+        if hasattr(self.result_generator, 'aterminate'):
+            await self.result_generator.aterminate()
@@ -1,9 +1,10 @@
 
-import json
 import time
 from typing import Optional
 from pydantic import BaseModel
 
+from nopause.core.codec import get_codec
+
 class Event(BaseModel):
     group: str = 'default'
     group_index: Optional[int] = None
@@ -77,7 +78,7 @@ class EventTimeStamp():
 
 
         print(
-            json.dumps(export_data, ensure_ascii=False, indent=2),
+            get_codec().dumps_pretty(export_data),
             file=open(path, 'w')
         )
         print(f'Export data to {path}')
@@ -0,0 +1,116 @@
+import json
+import time
+import base64
+from typing import Sequence, Union
+import pytest
+from nopause.recording import FakeSynthesisServer, ReplayServer, SessionRecorder
+
+PCM = b'\x01\x00' * 240 # 10 ms at 24 kHz
+
+
+class Session:
+    """ One synthesis of a recorded connection: the texts the client sends, then the responses.
+    """
+    def __init__(
+        self,
+        chunks: Sequence[Union[bytes, str]] = (PCM,),
+        texts: Sequence[str] = ('Hello.',),
+        delay: float = 0.0,
+        end: bool = True,
+        sample_rate: int = 24000,
+    ):
+        """
+        Args:
+            chunks: The audio of each response chunk, or a raw response frame.
+            texts: The text frames sent before the first response.
+            delay: Seconds between the last text and the first response (replayed with speed=1.0).
+            end: Whether the client ends the session and the server answers the end frame.
+            sample_rate: The sample rate the chunk durations are computed with.
+        """
+        self.chunks = chunks
+        self.texts = texts
+        self.delay = delay
+        self.end = end
+        self.sample_rate = sample_rate
+
+    def record(self, recorder: SessionRecorder, connection: int):
+        for text in self.texts:
+            recorder.send(connection, json.dumps({'content': {'text': text, 'is_end': False}}))
+        if self.delay:
+            time.sleep(self.delay)
+        for chunk_id, chunk in enumerate(self.chunks):
+            if isinstance(chunk, str):
+                recorder.recv(connection, chunk)
+                continue
+            recorder.recv(connection, json.dumps({
+                'code': 0, 'status': 'ok', 'is_end': False, 'audio_content': base64.b64encode(chunk).decode(),
+                'tts_response_chunk_meta': {
+                    'chunk_id': chunk_id, 'rtf': 0.1, 'chunk_size_us': len(chunk) // 2 * 1000000 // self.sample_rate,
+                },
+            }))
+        if self.end:
+            recorder.send(connection, '{"content": {"text": "", "is_end": true}}')
+            recorder.recv(connection, json.dumps({'code': 0, 'status': 'ok', 'is_end': True, 'audio_content': ''}))
+
+
+def record(path: str, *connections: Sequence[Session]):
+    """Record each connection, a list of sessions, to a new file."""
+    recorder = SessionRecorder(path)
+    for sessions in connections:
+        connection = recorder.open('ws://localhost/v1/tts/dual-stream')
+        recorder.send(connection, '{"config": {}}')
+        for session in sessions:
+            session.record(recorder, connection)
+    recorder.close()
+
+
+@pytest.fixture
+def replay(tmp_path, monkeypatch):
+    """
+    Start a ReplayServer of recorded connections, and point the SDK at the first one started:
+        server = replay([Session(), Session()], [Session(delay=0.3)], speed=1.0)
+    Each new connection replays the next recorded one, in a cycle.
+    """
+    servers = []
+
+    def start(*connections: Sequence[Session], speed: float = None, handshake_delay: float = 0.0) -> ReplayServer:
+        path = str(tmp_path / f'session{len(servers)}.nprec')
+        record(path, *connections)
+        server = ReplayServer(path, speed=speed, handshake_delay=handshake_delay).start()
+        if not servers:
+            monkeypatch.setenv('NO_PAUSE_WS_PROTOCOL', 'ws')
+            monkeypatch.setenv('NO_PAUSE_API_BASE', server.api_base)
+            monkeypatch.setenv('NO_PAUSE_API_KEY', 'replay')
+        servers.append(server)
+        return server
+
+    yield start
+    for server in servers:
+        server.stop()
+
+
+@pytest.fixture
+def server(replay):
+    """Connections synthesizing 'Hello.' into a 10 ms chunk."""
+    return replay([Session()])
+
+
+@pytest.fixture
+def fake_server(monkeypatch):
+    """
+    Start a FakeSynthesisServer, answering every text with audio of its length,
+    and point the SDK at it: server = fake_server(rtf=1.0, ms_per_char=2).
+    """
+    servers = []
+
+    def start(**kwargs) -> FakeSynthesisServer:
+        server = FakeSynthesisServer(**kwargs).start()
+        servers.append(server)
+        monkeypatch.setenv('NO_PAUSE_WS_PROTOCOL', 'ws')
+        monkeypatch.setenv('NO_PAUSE_API_BASE', server.api_base)
+        monkeypatch.setenv('NO_PAUSE_API_KEY', 'fake')
+        return server
+
+    yield start
+    for server in servers:
+        server.stop()
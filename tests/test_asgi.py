@@ -0,0 +1,107 @@
+import gc
+import asyncio
+from nopause.asgi import create_app
+from nopause.sdk.synthesis import Synthesis
+from nopause.core.audio import wav_header
+from conftest import PCM, Session
+
+async def call(app, body_parts, method='POST', query=b'', headers=()):
+    scope = {'type': 'http', 'method': method, 'path': '/', 'query_string': query, 'headers': list(headers)}
+    messages = [{'type': 'http.request', 'body': part, 'more_body': i < len(body_parts) - 1} for i, part in enumerate(body_parts)]
+    done = asyncio.Event()
+    sent = []
+
+    async def receive():
+        if messages:
+            return messages.pop(0)
+        await done.wait()
+        return {'type': 'http.disconnect'}
+
+    async def send(message):
+        sent.append(message)
+        if message['type'] == 'http.response.body' and not message.get('more_body', False):
+            done.set()
+
+    await app(scope, receive, send)
+    return sent[0], b''.join(message.get('body', b'') for message in sent[1:]), sent[-1]
+
+def test_stream_wav_then_pcm_on_the_pooled_connection(replay):
+    server = replay([Session(texts=['Caf', 'é.']), Session()])
+    app = create_app()
+
+    async def run():
+        # a multi-byte character split across two body messages
+        start, body, last = await call(app, [b'Caf\xc3', b'\xa9.'])
+        assert start['status'] == 200, body
+        assert (b'content-type', b'audio/wav') in start['headers']
+        assert body == wav_header(24000) + PCM and last['more_body'] is False
+        start, body, _ = await call(app, [b'{"text": "Hello.", "format": "pcm"}'], headers=[(b'content-type', b'application/json')])
+        assert (b'x-sample-rate', b'24000') in start['headers'] and body == PCM
+        await app.aclose()
+    asyncio.run(run())
+    assert server.replayed == 1
+
+def test_bad_requests(monkeypatch):
+    app = create_app(api_key='test')
+
+    async def run():
+        start, _, _ = await call(app, [b''], method='GET')
+        assert start['status'] == 405
+        start, body, _ = await call(app, [b'Hello.'], query=b'format=mp3')
+        assert start['status'] == 400 and b'mp3' in body
+    asyncio.run(run())
+
+def test_synthesis_error_before_audio(monkeypatch):
+    monkeypatch.setenv('NO_PAUSE_WS_PROTOCOL', 'ws')
+    monkeypatch.setenv('NO_PAUSE_API_BASE', 'localhost:1')
+    app = create_app(api_key='test')
+    start, _, _ = asyncio.run(call(app, [b'Hello.']))
+    assert start['status'] == 502
+
+def test_disconnect_terminates_the_synthesis(server):
+    app = create_app()
+    sent = []
+    received = []
+
+    async def receive():
+        if not received:
+            received.append(True)
+            # the body never ends, like a client relaying an llm
+            return {'type': 'http.request', 'body': b'Hello.', 'more_body': True}
+        while not any(message.get('body') == PCM for message in sent):
+            await asyncio.sleep(0.01)
+        return {'type': 'http.disconnect'}
+
+    async def send(message):
+        sent.append(message)
+
+    scope = {'type': 'http', 'method': 'POST', 'path': '/', 'query_string': b'format=pcm', 'headers': []}
+    asyncio.run(asyncio.wait_for(app(scope, receive, send), 5))
+    assert sent[-1]['more_body'] is True # the response was not completed
+    assert not any(app._idle.values()) # the terminated connection is not reused
+
+def test_dropped_connections_are_closed(server, monkeypatch):
+    app = create_app(max_idle_connections=0)
+    closed = []
+    original_aclose = Synthesis.aclose
+
+    async def aclose(synthesizer):
+        await asyncio.sleep(0.05)
+        await original_aclose(synthesizer)
+        closed.append(synthesizer)
+        raise ConnectionError('the close failed')
+
+    monkeypatch.setattr(Synthesis, 'aclose', aclose)
+    errors = []
+
+    async def run():
+        asyncio.get_running_loop().set_exception_handler(lambda loop, context: errors.append(context))
+        start, body, _ = await call(app, [b'Hello.'], query=b'format=pcm')
+        assert start['status'] == 200 and body == PCM
+        # the connection is not kept: it is being closed, referenced by the app until then
+        assert not any(app._idle.values()) and len(app._closing) == 1
+        await app.aclose()
+        assert len(closed) == 1 and not app._closing
+        gc.collect()
+    asyncio.run(run())
+    assert errors == [] # the error of the close was retrieved
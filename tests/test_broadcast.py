@@ -0,0 +1,93 @@
+import time
+import asyncio
+import threading
+import pytest
+from nopause.core.audio import AudioChunk
+from nopause.broadcast import Broadcast
+from nopause.sdk.error import NoPauseError, SlowConsumerError
+
+def make_chunks(n_chunks):
+    for i in range(n_chunks):
+        yield AudioChunk(data=bytes(480), chunk_id=i, sample_rate=24000, channels=1, rtf=0.1, chunk_size_us=10000)
+
+def test_broadcast_policies():
+    broadcast = Broadcast(make_chunks(50), max_lag=4)
+    fast = broadcast.subscribe()
+    dropping = broadcast.subscribe(policy='drop')
+    slow = broadcast.subscribe(policy='disconnect')
+    results = {}
+
+    def consume(name, subscription, delay):
+        chunks = []
+        try:
+            for chunk in subscription:
+                chunks.append(chunk)
+                time.sleep(delay)
+        except SlowConsumerError:
+            chunks.append(None)
+        results[name] = chunks
+
+    threads = [
+        threading.Thread(target=consume, args=('fast', fast, 0.0)),
+        threading.Thread(target=consume, args=('dropping', dropping, 0.005)),
+        threading.Thread(target=consume, args=('slow', slow, 0.05)),
+    ]
+    for thread in threads:
+        thread.start()
+    broadcast.start()
+    for thread in threads:
+        thread.join()
+
+    assert [chunk.chunk_id for chunk in results['fast']] == list(range(50))
+    assert results['slow'][-1] is None
+    assert len(results['dropping']) + dropping.dropped == 50
+    # the very same chunk objects are shared
+    assert results['dropping'][-1] is results['fast'][-1]
+    assert len(broadcast.chunks) == 0
+
+def test_broadcast_async_block():
+    async def source():
+        for chunk in make_chunks(20):
+            yield chunk
+
+    async def main():
+        broadcast = Broadcast(source(), max_lag=2)
+        a, b = broadcast.subscribe(), broadcast.subscribe()
+        broadcast.start()
+
+        async def consume(subscription, delay):
+            ids = []
+            async for chunk in subscription:
+                ids.append(chunk.chunk_id)
+                await asyncio.sleep(delay)
+            return ids
+
+        return await asyncio.gather(consume(a, 0), consume(b, 0.001))
+
+    a, b = asyncio.run(main())
+    assert a == b == list(range(20))
+
+def test_closed_subscription_ends():
+    broadcast = Broadcast(make_chunks(10), max_lag=16)
+    closed, other = broadcast.subscribe(), broadcast.subscribe()
+    broadcast.run()
+    closed.close()
+    assert [chunk.chunk_id for chunk in other] == list(range(10))
+    assert list(closed) == [] and len(broadcast.chunks) == 0
+
+def test_terminate_wakes_a_blocked_pump():
+    broadcast = Broadcast(make_chunks(50), max_lag=2)
+    stalled = broadcast.subscribe()
+    broadcast.start()
+    time.sleep(0.05)
+    broadcast.terminate()
+    broadcast._pump.join(1.0)
+    assert not broadcast._pump.is_alive()
+    # the window published before the end is still delivered
+    assert [chunk.chunk_id for chunk in stalled] == [0, 1]
+
+def test_explicit_max_lag():
+    broadcast = Broadcast(make_chunks(1), max_lag=4)
+    assert broadcast.subscribe(max_lag=1).max_lag == 1 and broadcast.subscribe().max_lag == 4
+    with pytest.raises(NoPauseError):
+        broadcast.subscribe(max_lag=0)
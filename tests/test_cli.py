@@ -0,0 +1,45 @@
+import io
+import os
+import wave
+import argparse
+import pytest
+from nopause.cli import SayStats, read_text, say
+from nopause.core.audio import wav_header
+from conftest import Session
+
+@pytest.fixture
+def server(replay):
+    return replay([Session([b'\x01\x00' * 1600] * 2, sample_rate=16000)])
+
+def say_args(**kwargs):
+    defaults = dict(voice='Zoe', rate=16000, format='pcm', model='nopause-en-beta', language='en',
+                    api_key=None, api_base=None, api_version=None)
+    return argparse.Namespace(**{**defaults, **kwargs})
+
+def test_read_text_keeps_characters_split_across_reads():
+    read_fd, write_fd = os.pipe()
+    os.write(write_fd, 'héllo'.encode())
+    os.close(write_fd)
+    stats = SayStats()
+    assert ''.join(read_text(read_fd, stats, read_size=2)) == 'héllo'
+    assert stats.chars == 5 and stats.end_of_text is not None
+    os.close(read_fd)
+
+def test_wav_header_is_readable():
+    pcm = b'\x01\x00' * 100
+    with wave.open(io.BytesIO(wav_header(16000, n_bytes=len(pcm)) + pcm)) as w:
+        assert (w.getframerate(), w.getnchannels(), w.getsampwidth(), w.getnframes()) == (16000, 1, 2, 100)
+
+def test_say_writes_a_wav_file(server, tmp_path):
+    read_fd, write_fd = os.pipe()
+    os.write(write_fd, b'Hello.')
+    os.close(write_fd)
+    path = str(tmp_path / 'out.wav')
+    out_fd = os.open(path, os.O_WRONLY | os.O_CREAT)
+    stats = say(say_args(format='wav'), stdin_fd=read_fd, stdout_fd=out_fd)
+    os.close(out_fd)
+    os.close(read_fd)
+    assert stats.chunks == 2 and stats.first_audio is not None
+    # the header of a seekable output is patched with the real length
+    with wave.open(path) as w:
+        assert w.getnframes() == 3200
@@ -0,0 +1,55 @@
+import json
+import base64
+import pytest
+import nopause
+from nopause.core import codec
+from nopause.core.codec import JSONCodec, available_codecs, create_codec, get_codec, set_codec
+from conftest import Session
+
+RESPONSE = json.dumps({
+    'code': 0, 'status': 'ok', 'audio_content': base64.b64encode(b'\x01\x00' * 240).decode(),
+    'tts_response_chunk_meta': {'chunk_id': 3, 'rtf': 0.1, 'chunk_size_us': 10000}, 'is_end': False,
+})
+
+@pytest.fixture(autouse=True)
+def restore_codec():
+    selected = codec._codec
+    yield
+    codec._codec = selected
+
+@pytest.mark.parametrize('name', available_codecs())
+def test_backends_agree(name):
+    backend = create_codec(name)
+    obj = {'content': {'text': 'Café ☕', 'is_end': False}, 'n': [1, 2.5, None]}
+    assert json.loads(backend.dumps(obj)) == obj
+    assert backend.loads(backend.dumps(obj)) == obj
+    assert json.loads(backend.dumps_pretty(obj)) == obj and '☕' in backend.dumps_pretty(obj)
+    response = backend.decode_response(RESPONSE)
+    assert response['code'] == 0 and response['tts_response_chunk_meta']['chunk_id'] == 3
+    with pytest.raises(ValueError):
+        backend.loads('{"code": ')
+
+def test_selection(monkeypatch):
+    assert available_codecs()[-1] == 'json'
+    monkeypatch.delenv('NO_PAUSE_JSON_CODEC', raising=False)
+    codec._codec = None
+    assert get_codec().name == available_codecs()[0]
+    monkeypatch.setenv('NO_PAUSE_JSON_CODEC', 'json')
+    assert set_codec(None).name == 'json'
+    assert set_codec('ujson').name == 'ujson'
+    with pytest.raises(ValueError):
+        create_codec('simplejson')
+
+def test_synthesis_uses_the_codec(replay):
+    class CountingCodec(JSONCodec):
+        responses = 0
+
+        def decode_response(self, data):
+            CountingCodec.responses += 1
+            return super().decode_response(data)
+
+    replay([Session([RESPONSE])])
+    set_codec(CountingCodec())
+    chunks = list(nopause.Synthesis.stream(iter(['Hello.'])))
+    assert [chunk.chunk_id for chunk in chunks] == [3]
+    assert CountingCodec.responses == 2
@@ -0,0 +1,154 @@
+import time
+import asyncio
+import threading
+import pytest
+from nopause.daemon import DaemonSynthesis, SynthesisDaemon
+from nopause.sdk.error import NoPauseError
+from conftest import Session
+
+TEXTS = ['Hello there. ', 'A second sentence.']
+KEY = SynthesisDaemon.session_key({})
+
+def audio_bytes(texts, ms_per_char=2):
+    return sum(len(text) for text in texts) * ms_per_char * 24 * 2
+
+def pooled(daemon, n, timeout=2):
+    """The pool of the default config once it has n connections (the daemon pools after DONE is sent)."""
+    deadline = time.monotonic() + timeout
+    while len(daemon._pools.get(KEY, [])) != n and time.monotonic() < deadline:
+        time.sleep(0.01)
+    return daemon._pools.get(KEY, [])
+
+@pytest.fixture
+def daemon(tmp_path):
+    """A daemon on a tmp unix socket, served by an event loop in a background thread."""
+    loop = asyncio.new_event_loop()
+    thread = threading.Thread(target=loop.run_forever, daemon=True)
+    thread.start()
+    daemon = SynthesisDaemon(str(tmp_path / 'nopause.sock'), pool_size=2)
+    daemon.run = lambda coroutine: asyncio.run_coroutine_threadsafe(coroutine, loop).result(5)
+    daemon.run(daemon.start())
+    yield daemon
+    daemon.run(daemon.close())
+    loop.call_soon_threadsafe(loop.stop)
+    thread.join()
+    loop.close()
+
+def test_stream(fake_server, daemon):
+    fake_server(ms_per_char=2)
+    chunks = list(DaemonSynthesis.stream(iter(TEXTS), socket_path=daemon.socket_path))
+    assert sum(len(chunk.data) for chunk in chunks) == audio_bytes(TEXTS)
+    assert [chunk.chunk_id for chunk in chunks] == list(range(len(TEXTS)))
+    # the upstream connection went back to the pool
+    assert len(pooled(daemon, 1)) == 1
+
+def test_astream(fake_server, daemon):
+    fake_server(ms_per_char=2)
+
+    async def run():
+        async def texts():
+            for text in TEXTS:
+                yield text
+        synthesizer = DaemonSynthesis(socket_path=daemon.socket_path)
+        return [chunk async for chunk in await synthesizer.astream(texts())]
+
+    assert sum(len(chunk.data) for chunk in asyncio.run(run())) == audio_bytes(TEXTS)
+
+def test_cancel_then_reuse_the_pooled_connection(fake_server, daemon):
+    server = fake_server(rtf=1.0, ms_per_char=10)
+    daemon.run(daemon.warmup(1))
+    connection = daemon._pools[KEY][0]
+    result = DaemonSynthesis.stream(iter(TEXTS), socket_path=daemon.socket_path)
+    next(result)
+    assert daemon._pools[KEY] == []
+    result.terminate()
+    # the cancelled connection is reconnected in the background, and pooled again
+    assert pooled(daemon, 1) == [connection]
+    chunks = list(DaemonSynthesis.stream(iter(['Hello.']), socket_path=daemon.socket_path))
+    assert sum(len(chunk.data) for chunk in chunks) == audio_bytes(['Hello.'], ms_per_char=10)
+    assert pooled(daemon, 1) == [connection] and server.sessions == 2
+
+def test_upstream_error_is_relayed(replay, daemon):
+    replay([Session(['{"code": 1002, "status": "voice not found", "audio_content": "", "is_end": false}'], end=False)])
+    with pytest.raises(NoPauseError) as error:
+        list(DaemonSynthesis.stream(iter(['Hello.']), socket_path=daemon.socket_path))
+    assert error.value.code == 1002 and 'voice not found' in str(error.value)
+
+def test_daemon_failure_is_relayed(daemon, monkeypatch):
+    async def acquire(key):
+        raise RuntimeError('the pool is broken')
+    monkeypatch.setattr(daemon, 'acquire', acquire)
+    with pytest.raises(NoPauseError, match='RuntimeError: the pool is broken'):
+        list(DaemonSynthesis.stream(iter(['Hello.']), socket_path=daemon.socket_path))
+
+def run_in_thread(target, timeout=5):
+    """Run target in a thread and return what it returned or raised, failing if it hangs."""
+    outcome = []
+
+    def run():
+        try:
+            outcome.append(target())
+        except BaseException as e:
+            outcome.append(e)
+
+    thread = threading.Thread(target=run, daemon=True)
+    thread.start()
+    thread.join(timeout)
+    assert outcome, 'the stream hangs'
+    return outcome[0]
+
+def test_failing_text_iterator(fake_server, daemon):
+    fake_server(ms_per_char=2)
+
+    def texts():
+        yield 'Hello.'
+        raise ValueError('the llm failed')
+
+    async def atexts():
+        yield 'Hello.'
+        raise ValueError('the llm failed')
+
+    async def arun():
+        return [chunk async for chunk in await DaemonSynthesis.astream(atexts(), socket_path=daemon.socket_path)]
+
+    sync_error = run_in_thread(lambda: list(DaemonSynthesis.stream(texts(), socket_path=daemon.socket_path)))
+    async_error = run_in_thread(lambda: asyncio.run(arun()))
+    for error in (sync_error, async_error):
+        assert isinstance(error, ValueError) and str(error) == 'the llm failed'
+
+def test_terminate_with_a_blocked_text_iterator(fake_server, daemon):
+    fake_server(ms_per_char=2)
+    release = threading.Event()
+
+    def texts():
+        yield 'Hello.'
+        release.wait()
+
+    result = DaemonSynthesis.stream(texts(), socket_path=daemon.socket_path)
+    next(result)
+    start = time.monotonic()
+    result.terminate()
+    assert time.monotonic() - start < 0.5
+    release.set()
+
+    async def arun():
+        never = asyncio.Event()
+
+        async def atexts():
+            yield 'Hello.'
+            upstream = asyncio.ensure_future(never.wait())
+            try:
+                await asyncio.shield(upstream)
+            except asyncio.CancelledError:
+                await upstream # an upstream that does not stop on cancellation
+
+        result = await DaemonSynthesis.astream(atexts(), socket_path=daemon.socket_path)
+        await result.__anext__()
+        start = time.monotonic()
+        await result.aterminate()
+        return time.monotonic() - start
+
+    # the sender is not waited for beyond sender_timeout
+    assert run_in_thread(lambda: asyncio.run(arun())) < 0.5
+    # the daemon gets the cancelled connections back
+    assert len(pooled(daemon, 2)) == 2
@@ -0,0 +1,51 @@
+import asyncio
+import numpy as np
+import pytest
+from nopause.dialogue import DialogueMixer, DialogueRenderer, Turn
+from conftest import Session
+
+def test_mixer_places_turns_completed_out_of_order():
+    turns = [Turn('a', 'one'), Turn('b', 'two', overlap=2), Turn('a', 'three', overlap=-1), Turn('c', 'late', start=20)]
+    mixer = DialogueMixer(turns, sample_rate=1, block_samples=4)
+    mixer.complete(1, np.full(4, 20000, dtype=np.int16))
+    assert mixer.take() == [] # the first turn is not finished, nothing is final
+    mixer.complete(0, np.full(6, 20000, dtype=np.int16))
+    # turn 1 starts at 6 - 2 = 4, turn 2 one second after it ends
+    assert mixer.starts[:3] == [0, 4, 9]
+    blocks = mixer.take()
+    assert np.concatenate(blocks).tolist() == [20000] * 4 + [32767] * 2 + [20000] * 2 # clipped overlap
+    mixer.complete(3, np.full(2, 1, dtype=np.int16))
+    mixer.complete(2, np.full(3, 7, dtype=np.int16))
+    rest = np.concatenate(mixer.take(final=True)).tolist()
+    assert rest == [0] + [7] * 3 + [0] * 8 + [1] * 2 # the pause of turn 2, then the fixed start of turn 3
+
+@pytest.fixture
+def server(replay):
+    """One connection rendering two turns, of constant samples 10000 then 20000."""
+    return replay([Session([np.full(2400, value, dtype='<i2').tobytes()], texts=['turn']) for value in [10000, 20000]])
+
+SCRIPT = [('host', 'Hi.'), ('guest', 'Hello.', None, 0.05), ('host', 'Bye.'), ('guest', 'Bye!', None, -0.1)]
+
+def expected_mix():
+    timeline = np.zeros(10800, dtype=np.int32)
+    timeline[0:2400] += 10000     # host, first session of its connection
+    timeline[1200:3600] += 10000  # guest, 50 ms before the host ends
+    timeline[3600:6000] += 20000  # host
+    timeline[8400:10800] += 20000 # guest, after 100 ms of silence
+    return np.clip(timeline, -32768, 32767).astype('<i2').tobytes()
+
+def test_render(server):
+    renderer = DialogueRenderer(voices={'host': 'Zoe', 'guest': 'Adam'}, block_ms=50)
+    chunks = list(renderer.render(SCRIPT))
+    renderer.close()
+    assert [chunk.chunk_id for chunk in chunks] == list(range(len(chunks)))
+    assert b''.join(chunk.data for chunk in chunks) == expected_mix()
+
+def test_arender(server):
+    async def render():
+        renderer = DialogueRenderer(voices={'host': 'Zoe', 'guest': 'Adam'}, block_ms=50)
+        data = b''.join([chunk.data async for chunk in await renderer.arender(SCRIPT)])
+        await renderer.aclose()
+        return data
+
+    assert asyncio.run(render()) == expected_mix()
@@ -0,0 +1,95 @@
+import asyncio
+import numpy as np
+import pytest
+from nopause.core.audio import AudioChunk
+from nopause.dsp import Chain, DCBlocker, Fade, Limiter, LoudnessNormalizer, Processor, SilenceTrimmer
+
+def make_chunks(samples, chunk_samples=240, sample_rate=24000):
+    data = (np.asarray(samples) * 32767).astype('<i2').tobytes()
+    step = chunk_samples * 2
+    return [
+        AudioChunk(data=data[i:i + step], chunk_id=i // step, sample_rate=sample_rate, channels=1, rtf=0.1, chunk_size_us=10000)
+        for i in range(0, len(data), step)
+    ]
+
+def to_samples(chunks):
+    return np.frombuffer(b''.join(chunk.data for chunk in chunks), dtype='<i2') / 32768
+
+SPEECH = np.concatenate([np.zeros(2400), 0.5 * np.ones(1200), np.zeros(2400), 0.5 * np.ones(1200), np.zeros(4800)])
+
+def sine(seconds, amplitude, frequency=200, sample_rate=24000):
+    return amplitude * np.sin(2 * np.pi * frequency * np.arange(int(seconds * sample_rate)) / sample_rate)
+
+def rms(samples):
+    return float(np.sqrt(np.mean(np.square(samples))))
+
+def test_silence_trimmer_across_chunks():
+    signal = SPEECH
+    out = to_samples(Chain(SilenceTrimmer(keep_ms=10)).attach(iter(make_chunks(signal))))
+    # 10 ms = 240 samples are kept before the speech and after it, inner silence is untouched
+    assert len(out) == 240 + 1200 + 2400 + 1200 + 240
+
+def test_limiter_and_fade_out_on_interrupt():
+    chain = Chain(Limiter(threshold_dbfs=-6), Fade(in_ms=0, out_ms=20))
+    processed = chain.attach(iter(make_chunks(np.ones(4800) * 0.99)))
+    out = [next(processed) for _ in range(5)]
+    tail = processed.terminate()
+    assert np.abs(to_samples(out)).max() <= 10 ** (-6 / 20) + 1e-3
+    tail_samples = to_samples([tail])
+    assert len(tail_samples) == 480 and abs(tail_samples[-1]) < 1e-3
+
+def test_loudness_normalizer_reaches_the_target_across_chunks():
+    signal = sine(3, amplitude=0.05) # -29 dBFS
+    out = to_samples(Chain(LoudnessNormalizer(target_dbfs=-20)).attach(iter(make_chunks(signal))))
+    # the lookahead is released at the end
+    assert len(out) == len(signal)
+    assert abs(20 * np.log10(rms(out[-24000:])) + 20) < 0.5
+    # the gain is ramped, no step at the chunk boundaries
+    assert np.abs(np.diff(out)).max() < 0.01
+
+def test_loudness_normalizer_limits_the_gain():
+    signal = sine(2, amplitude=0.01) # 23 dB under the target
+    out = to_samples(Chain(LoudnessNormalizer(target_dbfs=-20, max_gain_db=12)).attach(iter(make_chunks(signal))))
+    assert abs(rms(out[-24000:]) / rms(signal[-24000:]) - 10 ** (12 / 20)) < 0.1
+
+def test_dc_blocker():
+    signal = 0.3 + sine(2, amplitude=0.1)
+    out = to_samples(Chain(DCBlocker()).attach(iter(make_chunks(signal))))
+    assert abs(out[-24000:].mean()) < 0.005
+    assert abs(rms(out[-24000:]) - 0.1 / np.sqrt(2)) < 0.005
+
+def test_async_processed_result_generator():
+    async def chunks(samples):
+        for chunk in make_chunks(samples):
+            yield chunk
+
+    async def run():
+        chain = Chain(SilenceTrimmer(keep_ms=10))
+        trimmed = [chunk async for chunk in chain.attach(chunks(SPEECH))]
+        chain = Chain(Fade(in_ms=0, out_ms=20))
+        processed = chain.attach(chunks(np.ones(4800) * 0.5))
+        head = [await processed.__anext__() for _ in range(2)]
+        tail = await processed.aterminate()
+        with_end = [chunk async for chunk in processed]
+        return trimmed, head, tail, with_end
+
+    trimmed, head, tail, with_end = asyncio.run(run())
+    assert len(to_samples(trimmed)) == 240 + 1200 + 2400 + 1200 + 240
+    assert [chunk.chunk_id for chunk in trimmed] == list(range(len(trimmed)))
+    # the 20 ms held back by the fade are returned faded out on terminate, and nothing after it
+    assert len(to_samples(head)) == 480 and len(to_samples([tail])) == 480
+    assert abs(to_samples([tail])[-1]) < 1e-3
+    assert with_end == []
+
+def test_attach_resets_the_chain():
+    chain = Chain(Limiter(threshold_dbfs=-6, release_ms=1000))
+    loud = chain.attach(iter(make_chunks(np.ones(2400) * 0.99)))
+    assert [chunk.chunk_id for chunk in loud] == list(range(10))
+    # the second stream starts with the limiter released and the chunk ids from 0
+    quiet = list(chain.attach(iter(make_chunks(np.ones(480) * 0.25))))
+    assert [chunk.chunk_id for chunk in quiet] == [0, 1]
+    assert np.allclose(to_samples(quiet), 0.25, atol=1e-3)
+
+def test_processor_requires_process():
+    with pytest.raises(TypeError):
+        Processor()
@@ -0,0 +1,90 @@
+import gc
+import time
+import socket
+import pytest
+import nopause
+from nopause.sdk.error import NoPauseError
+from nopause.sdk.endpoints import EndpointSelector
+from conftest import Session
+
+def test_ranking_by_health_then_rtt():
+    selector = EndpointSelector(['ws://a', 'ws://b', 'ws://c'], probe_interval=None, cooldown=60)
+    # nothing measured: the order of the list
+    assert selector.ranked() == ['ws://a', 'ws://b', 'ws://c']
+    selector.succeeded('ws://a', 0.080)
+    selector.succeeded('ws://b', 0.020)
+    assert selector.ranked() == ['ws://b', 'ws://a', 'ws://c']
+    # a failure puts an endpoint behind every healthy one, even unmeasured
+    selector.failed('ws://b')
+    assert selector.ranked() == ['ws://a', 'ws://c', 'ws://b']
+    assert [stats['healthy'] for stats in selector.stats()] == [True, False, True]
+    # after the cooldown, a high recent error rate still keeps it away
+    selector.endpoints[1].down_until = 0
+    selector.failed('ws://b')
+    selector.endpoints[1].down_until = 0
+    assert selector.endpoints[1].error_rate == pytest.approx(2 / 3)
+    assert selector.ranked()[-1] == 'ws://b'
+    selector.succeeded('ws://b', 0.020)
+    selector.succeeded('ws://b', 0.020)
+    assert selector.ranked()[0] == 'ws://b'
+
+@pytest.fixture
+def servers(replay):
+    # a distant, a near and a middle endpoint
+    return [replay([Session()], handshake_delay=delay) for delay in (0.2, 0.0, 0.05)]
+
+def test_connects_to_the_fastest_endpoint(servers):
+    synthesizer = nopause.Synthesis(api_base=[server.api_base for server in servers])
+    synthesizer.endpoints.stop()
+    synthesizer.endpoints.probe()
+    rtts = [stats['rtt_ms'] for stats in synthesizer.endpoints.stats()]
+    assert rtts[1] < rtts[2] < rtts[0]
+    assert len(list(synthesizer.stream(iter(['Hello.'])))) == 1
+    assert servers[1].api_base in synthesizer.api_url
+    synthesizer.close()
+
+def test_fails_over(servers, monkeypatch):
+    # a comma separated list works from the environment too
+    monkeypatch.setenv('NO_PAUSE_API_BASE', f'localhost:1, {servers[0].api_base}')
+    synthesizer = nopause.Synthesis()
+    synthesizer.endpoints.stop()
+    assert len(list(synthesizer.stream(iter(['Hello.'])))) == 1
+    assert servers[0].api_base in synthesizer.api_url
+    assert [stats['healthy'] for stats in synthesizer.endpoints.stats()] == [False, True]
+    synthesizer.close()
+
+def test_fails_over_from_a_black_holed_endpoint(servers):
+    # accepts connections, never answers the handshake
+    black_hole = socket.socket()
+    black_hole.bind(('localhost', 0))
+    black_hole.listen(8)
+    synthesizer = nopause.Synthesis(api_base=[f'localhost:{black_hole.getsockname()[1]}', servers[1].api_base])
+    synthesizer.endpoints.stop()
+    synthesizer.endpoints.probe_timeout = 0.2
+    start = time.perf_counter()
+    synthesizer.connect()
+    assert time.perf_counter() - start < 1.0
+    assert servers[1].api_base in synthesizer.api_url
+    assert not synthesizer.endpoints.stats()[0]['healthy']
+    synthesizer.close()
+    black_hole.close()
+
+def test_probing_ends_with_the_last_synthesis(servers):
+    api_base = [server.api_base for server in servers]
+    synthesizers = [nopause.Synthesis(api_base=api_base) for _ in range(2)]
+    selector = synthesizers[0].endpoints
+    selector.ranked()
+    assert selector._prober is not None
+    synthesizers.pop()
+    gc.collect()
+    assert selector._prober is not None
+    synthesizers.pop()
+    gc.collect()
+    assert selector._prober is None
+    # and resumes with the next one
+    assert nopause.Synthesis(api_base=api_base).endpoints.ranked() and selector._prober is not None
+    selector.stop()
+
+def test_empty_endpoint_list():
+    with pytest.raises(NoPauseError):
+        nopause.Synthesis(api_key='test', api_base=' , ')
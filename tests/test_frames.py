@@ -0,0 +1,50 @@
+import asyncio
+import pytest
+import nopause
+from nopause.core.audio import AudioChunk, FrameSplitter
+from conftest import Session
+
+def chunk(n_samples, first, sample_rate=1000):
+    data = b''.join((first + i).to_bytes(2, 'little') for i in range(n_samples))
+    return AudioChunk(data=data, chunk_id=0, sample_rate=sample_rate, channels=1, rtf=0.1,
+                      chunk_size_us=n_samples * 1000000 // sample_rate)
+
+def samples(frame):
+    return [int.from_bytes(frame.data[i:i + 2], 'little') for i in range(0, len(frame.data), 2)]
+
+def test_frames_across_chunks_with_timestamps():
+    splitter = FrameSplitter(sample_rate=1000, frame_ms=4)
+    frames = splitter.push(chunk(3, 0)) + splitter.push(chunk(7, 3)) + splitter.push(chunk(1, 10))
+    frames.append(splitter.flush(pad=True))
+    assert [samples(frame) for frame in frames] == [[0, 1, 2, 3], [4, 5, 6, 7], [8, 9, 10, 0]]
+    assert [frame.pts_us for frame in frames] == [0, 4000, 8000]
+    assert [frame.index for frame in frames] == [0, 1, 2]
+    assert frames[-1].padding == 1 and frames[-1].duration_us == 4000
+    assert splitter.flush() is None
+
+def test_unpadded_last_frame_and_sample_count():
+    splitter = FrameSplitter(sample_rate=1000, samples=3)
+    frames = splitter.push(chunk(4, 0))
+    last = splitter.flush(pad=False)
+    assert [samples(frame) for frame in frames + [last]] == [[0, 1, 2], [3]]
+    assert (last.pts_us, last.duration_us, last.padding) == (3000, 1000, 0)
+
+@pytest.fixture
+def server(replay):
+    return replay([Session([b'\x01\x00' * 700, b'\x01\x00' * 300])])
+
+def test_result_generator_frames(server):
+    frames = list(nopause.Synthesis.stream(iter(['Hello.'])).frames(frame_ms=10))
+    # 1000 samples at 24 kHz in frames of 240
+    assert [frame.n_samples for frame in frames] == [240] * 5
+    assert [frame.pts_us for frame in frames] == [0, 10000, 20000, 29999, 39999] # 29166 us for the first chunk, then 20 samples into the second
+    assert frames[-1].padding == 200
+
+def test_result_generator_aframes(server):
+    async def collect():
+        async def text():
+            yield 'Hello.'
+        result = await nopause.Synthesis.astream(text())
+        return [frame async for frame in result.aframes(samples=480, pad_last=False)]
+
+    assert [frame.n_samples for frame in asyncio.run(collect())] == [480, 480, 40]
@@ -0,0 +1,82 @@
+import time
+import asyncio
+import pytest
+import nopause
+from nopause.sdk.synthesis import SynthesisResultGenerator
+from conftest import Session
+
+SLOW, FAST = b'\x01\x00' * 240, b'\x02\x00' * 240
+
+@pytest.fixture
+def server(replay):
+    """The first connection answers after 0.3 s, the second one at once."""
+    return replay([Session([SLOW], delay=0.3)], [Session([FAST])], speed=1.0)
+
+def test_the_hedge_wins_a_slow_first_audio(server, monkeypatch):
+    terminated = []
+    terminate = SynthesisResultGenerator.terminate
+
+    def record_terminate(result):
+        terminated.append(result)
+        terminate(result)
+    monkeypatch.setattr(SynthesisResultGenerator, 'terminate', record_terminate)
+    synthesizer = nopause.HedgedSynthesis(hedge_after=0.05).connect()
+    primary, backup = synthesizer.synthesizers
+    start = time.perf_counter()
+    chunks = list(synthesizer.stream(iter(['Hello.'])))
+    assert time.perf_counter() - start < 0.25
+    assert [chunk.data for chunk in chunks] == [FAST]
+    assert (synthesizer.requests, synthesizer.hedged, synthesizer.hedge_wins) == (1, 1, 1)
+    assert synthesizer.hedge_rate == 1.0 and synthesizer.win_rate == 1.0
+    # the winner is the primary connection of the next request
+    assert synthesizer.synthesizers == [backup, primary]
+    synthesizer.close()
+    assert not primary.in_use() and not backup.in_use()
+    # only the losing stream is terminated, and only once
+    assert len(terminated) == 1
+
+def test_next_request_does_not_wait_for_a_stalled_loser(replay):
+    # the losing connection is still waiting for its first audio when the next request starts
+    replay([Session([SLOW], delay=0.6)], [Session([FAST]), Session([FAST])], speed=1.0)
+    synthesizer = nopause.HedgedSynthesis(hedge_after=0.05).connect()
+    primary, backup = synthesizer.synthesizers
+    assert [chunk.data for chunk in synthesizer.stream(iter(['Hello.']))] == [FAST]
+    start = time.perf_counter()
+    assert [chunk.data for chunk in synthesizer.stream(iter(['Hello.']))] == [FAST]
+    assert time.perf_counter() - start < 0.25
+    assert synthesizer.requests == 2 and synthesizer.synthesizers == [backup, primary]
+    synthesizer.close()
+    assert not primary.in_use() and not backup.in_use()
+
+def test_no_hedge_before_the_delay(server):
+    synthesizer = nopause.HedgedSynthesis(hedge_after=2.0).connect()
+    chunks = list(synthesizer.stream(iter(['Hello.'])))
+    assert [chunk.data for chunk in chunks] == [SLOW]
+    assert synthesizer.hedged == 0 and len(synthesizer.ttfas) == 1
+    synthesizer.close()
+
+def test_adaptive_delay():
+    synthesizer = nopause.HedgedSynthesis(percentile=0.9, initial_hedge_after=0.3, min_samples=10, api_key='test')
+    assert synthesizer.hedge_delay() == 0.3
+    synthesizer.ttfas.extend([0.1] * 18 + [1.0] * 2)
+    assert synthesizer.hedge_delay() == 1.0
+    synthesizer.ttfas.extend([0.1] * 20)
+    assert synthesizer.hedge_delay() == 0.1
+
+def test_astream_hedge(server):
+    async def run():
+        synthesizer = nopause.HedgedSynthesis(hedge_after=0.05)
+        # connected one after the other, so that the slow recording is the primary
+        for connection in synthesizer.synthesizers:
+            await connection.aconnect()
+
+        async def text():
+            yield 'Hello.'
+
+        chunks = [chunk async for chunk in await synthesizer.astream(text())]
+        await synthesizer.aclose()
+        return chunks, synthesizer
+
+    chunks, synthesizer = asyncio.run(run())
+    assert [chunk.data for chunk in chunks] == [FAST]
+    assert (synthesizer.hedged, synthesizer.hedge_wins) == (1, 1)
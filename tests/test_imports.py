@@ -0,0 +1,25 @@
+import sys
+import importlib
+import subprocess
+import pytest
+
+@pytest.mark.parametrize('module', ['nopause', 'nopause.sdk', 'nopause.core'])
+def test_import_does_not_load_the_dependencies(module):
+    code = (
+        f'import sys, {module}\n'
+        "print(' '.join(name for name in ('websockets', 'requests', 'pydantic') if name in sys.modules))"
+    )
+    loaded = subprocess.run([sys.executable, '-c', code], capture_output=True, text=True, check=True).stdout
+    assert loaded.strip() == ''
+
+@pytest.mark.parametrize('module', ['nopause', 'nopause.sdk', 'nopause.core', 'nopause.daemon', 'nopause.recording'])
+def test_lazy_attributes_resolve(module):
+    module = importlib.import_module(module)
+    names = dir(module)
+    for name, submodule in module._LAZY_ATTRS.items():
+        assert name in names
+        value = getattr(module, name)
+        assert value is getattr(importlib.import_module(submodule, module.__name__), name)
+    assert set(module.__all__) <= set(names)
+    with pytest.raises(AttributeError):
+        module.NotAName
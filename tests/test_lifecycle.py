@@ -0,0 +1,107 @@
+import gc
+import asyncio
+import threading
+import pytest
+import nopause
+from nopause.sdk import leaks
+from conftest import Session
+
+@pytest.fixture
+def detector():
+    detector = leaks.enable_leak_detection(grace=0)
+    yield detector
+    leaks.disable_leak_detection()
+
+def test_sync_context_managers(server, detector):
+    release = threading.Event()
+
+    def texts():
+        yield 'Hello.'
+        release.wait()
+
+    with nopause.Synthesis() as synthesizer:
+        with pytest.raises(KeyError):
+            with synthesizer.stream(texts()) as result:
+                next(result)
+                raise KeyError('the consumer failed')
+        assert result.terminated and not synthesizer.in_use()
+        # the sender thread is stuck in the text iterator: reported, until the iterator returns
+        with pytest.warns(ResourceWarning, match='sender is still running'):
+            assert len(detector.check()) == 1
+        release.set()
+        result.send_text_task.join(1)
+        # a stream consumed to its end releases everything by itself
+        with synthesizer.stream(iter(['Hello.'])) as result:
+            assert len(list(result)) == 1
+    assert synthesizer.ws is None
+    assert detector.check() == [] and detector.active() == 0
+
+def test_async_context_managers(server, detector):
+    async def run():
+        never = asyncio.Event()
+
+        async def texts():
+            yield 'Hello.'
+            await never.wait()
+
+        async with nopause.Synthesis() as synthesizer:
+            with pytest.raises(KeyError):
+                async with await synthesizer.astream(texts()) as result:
+                    await result.__anext__()
+                    raise KeyError('the consumer failed')
+            # the sender task is owned by the stream: cancelled with it
+            assert result.send_text_task.done() and not await synthesizer.ain_use()
+        assert synthesizer.ws is None
+    asyncio.run(run())
+    assert detector.check() == []
+
+def test_abandoned_stream_is_reported(server, detector):
+    result = nopause.Synthesis.stream(iter(['Hello.']))
+    ws = result.ws
+    next(result)
+    del result
+    gc.collect()
+    with pytest.warns(ResourceWarning) as warned:
+        found = detector.check()
+    assert len(found) == 1 and 'garbage collected' in found[0] and 'websocket is still open' in found[0]
+    assert __file__ in found[0] # where the stream was created
+    assert len(warned) == 1
+    ws.close()
+
+def test_failed_connect_frees_the_synthesizer(monkeypatch):
+    monkeypatch.setenv('NO_PAUSE_WS_PROTOCOL', 'ws')
+    synthesizer = nopause.Synthesis(api_key='test', api_base='localhost:1')
+    with pytest.raises(OSError):
+        synthesizer.stream(iter(['Hello.']))
+    assert not synthesizer.in_use()
+
+def test_finishing_a_released_stream_leaves_the_next_one_alone(replay):
+    replay([Session(), Session(), Session()])
+    with nopause.Synthesis() as synthesizer:
+        with synthesizer.stream(iter(['Hello.'])) as first:
+            assert len(list(first)) == 1 and first.released
+            second = synthesizer.stream(iter(['Hello.']))
+        # leaving the block of the first stream does not free the synthesizer of the second
+        assert synthesizer.in_use()
+        audio = second.as_file()
+        assert len(audio.read()) == 480
+        third = synthesizer.stream(iter(['Hello.']))
+        audio.close()
+        assert synthesizer.in_use()
+        assert len(list(third)) == 1 and not synthesizer.in_use()
+
+def test_afinish_after_the_end(replay):
+    replay([Session(), Session()])
+
+    async def texts():
+        yield 'Hello.'
+
+    async def run():
+        async with nopause.Synthesis() as synthesizer:
+            first = await synthesizer.astream(texts())
+            assert len([chunk async for chunk in first]) == 1
+            second = await synthesizer.astream(texts())
+            await first.afinish()
+            assert await synthesizer.ain_use()
+            assert len([chunk async for chunk in second]) == 1
+    asyncio.run(run())
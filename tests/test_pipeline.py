@@ -0,0 +1,53 @@
+import gc
+import time
+import nopause
+from nopause.core.audio import AudioChunk
+from nopause.sdk.pipeline import SentenceSegmenter, SeamJoiner
+
+def test_segmenter():
+    segmenter = SentenceSegmenter(min_chars=8, max_chars=40)
+    segments = []
+    for char in 'Hi. It costs 3.14 dollars. Next one! ' + 'word ' * 12:
+        segments.extend(segmenter.feed(char))
+    segments.extend(segmenter.flush())
+    assert segments[0] == 'Hi. It costs 3.14 dollars.'
+    assert segments[1] == 'Next one!'
+    assert all(len(segment) <= 40 for segment in segments)
+    assert ' '.join(segments).split() == ('Hi. It costs 3.14 dollars. Next one! ' + 'word ' * 12).split()
+
+def test_seam_joiner():
+    def chunk(n_samples, value):
+        return AudioChunk(data=value.to_bytes(2, 'little', signed=True) * n_samples, chunk_id=0,
+                          sample_rate=1000, channels=1, rtf=0.1, chunk_size_us=n_samples * 1000)
+
+    joiner = SeamJoiner(crossfade_ms=10)
+    outputs = [joiner.push(chunk(100, 1000), True), joiner.push(chunk(100, -1000), True), joiner.flush()]
+    data = b''.join(output.data for output in outputs if output is not None)
+    # the 10 samples of the seam overlap
+    assert len(data) == (200 - 10) * 2
+    assert [output.chunk_id for output in outputs] == [0, 1, 2]
+
+SENTENCES = ['A fairly long first sentence, slow to synthesize. ', 'Short. ', 'A middle length one. ', 'Tiny. ', 'The end']
+
+def test_stream_reassembles_segments_in_order(fake_server):
+    # the audio of a segment lasts, and takes, 2 ms per character: the later short segments are ready first
+    fake_server(rtf=1.0, ms_per_char=2)
+    synthesizer = nopause.PipelinedSynthesis(n_connections=3, min_segment_chars=1, crossfade_ms=0)
+    chunks = list(synthesizer.stream(iter(SENTENCES)))
+    assert [len(chunk.data) for chunk in chunks] == [len(text.strip()) * 2 * 24 * 2 for text in SENTENCES]
+    assert [chunk.chunk_id for chunk in chunks] == list(range(len(SENTENCES)))
+    synthesizer.close()
+
+def test_stream_stops_the_connections_on_early_exit(fake_server):
+    server = fake_server(rtf=1.0, ms_per_char=2)
+    synthesizer = nopause.PipelinedSynthesis(n_connections=3, min_segment_chars=1, crossfade_ms=0)
+    result = synthesizer.stream(iter(SENTENCES * 20))
+    for _ in result:
+        break
+    del result # the consumer went away without terminating
+    gc.collect()
+    assert not any(connection.in_use() for connection in synthesizer.synthesizers)
+    sessions = server.sessions
+    time.sleep(0.2)
+    assert server.sessions == sessions < len(SENTENCES) * 20
+    synthesizer.close()
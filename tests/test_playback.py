@@ -0,0 +1,118 @@
+import sys
+import types
+import wave
+import asyncio
+import pytest
+from nopause.core.audio import AudioChunk
+from nopause.playback import JitterBuffer, RingBuffer, NullSink, PyAudioSink, Sink, WavFileSink, play
+
+def make_chunks(n_chunks, n_samples=480, sample_rate=24000):
+    for i in range(n_chunks):
+        yield AudioChunk(data=bytes([i % 256, 0]) * n_samples, chunk_id=i, sample_rate=sample_rate,
+                         channels=1, rtf=0.1, chunk_size_us=n_samples * 1000000 // sample_rate)
+
+def test_ring_buffer_wraps():
+    ring = RingBuffer(8)
+    out = bytearray(8)
+    assert ring.write(b'abcdef') == 6
+    assert ring.read_into(memoryview(out)[:4]) == 4
+    assert ring.write(b'ghijkl') == 6
+    assert ring.write(b'x') == 0
+    assert ring.read_into(memoryview(out)) == 8
+    assert bytes(out) == b'efghijkl'
+
+def test_ring_buffer_is_cleared_by_the_reader():
+    ring = RingBuffer(8)
+    out = bytearray(8)
+    ring.write(b'abcd')
+    ring.clear()
+    # the writer only publishes the clear, the data written after it is kept
+    assert ring.available() == 0 and ring._read == 0
+    ring.write(b'ef')
+    assert ring.read_into(memoryview(out)) == 2 and bytes(out[:2]) == b'ef'
+    with pytest.raises(TypeError):
+        Sink()
+
+def test_play_to_wav(tmp_path):
+    path = str(tmp_path / 'out.wav')
+    sink = play(make_chunks(10), sink=lambda **kwargs: WavFileSink(path, **kwargs))
+    with wave.open(path) as wav:
+        assert wav.getnframes() == 4800
+    assert sink.overruns == 0
+
+def test_play_async_realtime():
+    async def chunks():
+        for chunk in make_chunks(5):
+            yield chunk
+
+    sink = asyncio.run(play(chunks(), sink=NullSink))
+    assert sink.played_bytes >= 5 * 960
+
+def test_jitter_buffer_adapts():
+    jitter_buffer = JitterBuffer(min_seconds=0.01, steady_seconds=1.0)
+    chunk = next(make_chunks(1, n_samples=4800)) # 200 ms
+    chunk.rtf = 0.5
+    jitter_buffer.on_chunk(chunk, arrival=0.0)
+    # the next chunk is predicted after rtf * duration = 100 ms
+    assert abs(jitter_buffer.target_seconds() - 0.1 * jitter_buffer.safety) < 1e-6
+    assert jitter_buffer.ready(0.2)
+
+    jitter_buffer.on_chunk(chunk, arrival=0.1)
+    jitter_buffer.on_underrun(now=0.1)
+    grown = jitter_buffer.target_seconds()
+    assert grown > 0.1 * jitter_buffer.safety
+
+    for i in range(2, 40):
+        jitter_buffer.on_chunk(chunk, arrival=0.1 * i)
+    assert jitter_buffer.target_seconds() < grown
+
+def test_failed_synthesis_stops_the_sink():
+    sinks = []
+
+    def factory(**kwargs):
+        sinks.append(NullSink(**kwargs))
+        return sinks[-1]
+
+    def chunks():
+        yield from make_chunks(3)
+        raise ConnectionError('the synthesis failed')
+
+    async def achunks():
+        for chunk in chunks():
+            yield chunk
+
+    with pytest.raises(ConnectionError):
+        play(chunks(), sink=factory, prebuffer_chunks=1)
+    with pytest.raises(ConnectionError):
+        asyncio.run(play(achunks(), sink=factory, prebuffer_chunks=1))
+    for sink in sinks:
+        # the playback thread is stopped and joined
+        assert sink.started and sink._closed.is_set() and sink._thread is None
+
+def test_fill_a_block_larger_than_blocksize():
+    sink = NullSink(blocksize=4)
+    sink.ring.write(b'\x01\x02')
+    out = bytearray(b'\xff' * 40)
+    assert sink.fill(out) == 2
+    assert out == b'\x01\x02' + bytes(38) and sink.underruns == 1
+
+def test_pyaudio_callback_serves_any_frame_count(monkeypatch):
+    streams = []
+
+    class PyAudio:
+        def open(self, stream_callback, **kwargs):
+            streams.append(stream_callback)
+            return types.SimpleNamespace(start_stream=lambda: None, stop_stream=lambda: None, close=lambda: None)
+
+        def terminate(self):
+            pass
+
+    monkeypatch.setitem(sys.modules, 'pyaudio', types.SimpleNamespace(PyAudio=PyAudio, paInt16=8, paContinue=0))
+    sink = PyAudioSink(blocksize=4)
+    sink.write(b'\x01\x00' * 10)
+    sink.start()
+    data, _ = streams[0](None, 8, None, 0)
+    assert data == b'\x01\x00' * 8
+    data, _ = streams[0](None, 4, None, 0)
+    assert data == b'\x01\x00' * 2 + bytes(4)
+    sink.close()
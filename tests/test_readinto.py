@@ -0,0 +1,47 @@
+import io
+import asyncio
+import pytest
+import nopause
+from conftest import Session
+
+CHUNKS = [bytes([i]) * 1000 for i in range(1, 4)]
+
+@pytest.fixture
+def server(replay):
+    return replay([Session(CHUNKS)])
+
+def test_readinto_crosses_chunk_boundaries(server):
+    result = nopause.Synthesis.stream(iter(['Hello.']))
+    buffer = bytearray(700)
+    parts = []
+    while True:
+        n = result.readinto(buffer)
+        if n == 0:
+            break
+        parts.append(bytes(buffer[:n]))
+    assert [len(part) for part in parts] == [700, 700, 700, 700, 200]
+    assert b''.join(parts) == b''.join(CHUNKS)
+
+def test_as_file_reads_like_a_file(server):
+    synthesizer = nopause.Synthesis().connect()
+    with io.BufferedReader(synthesizer.stream(iter(['Hello.'])).as_file()) as audio:
+        assert audio.read(10) == CHUNKS[0][:10]
+        assert audio.read() == b''.join(CHUNKS)[10:]
+    assert not synthesizer.in_use()
+    synthesizer.close()
+
+def test_areadinto(server):
+    async def read_all():
+        async def text():
+            yield 'Hello.'
+        result = await nopause.Synthesis.astream(text())
+        buffer = memoryview(bytearray(1200))
+        data = bytearray()
+        while True:
+            n = await result.areadinto(buffer)
+            if n == 0:
+                break
+            data += buffer[:n]
+        return bytes(data)
+
+    assert asyncio.run(read_all()) == b''.join(CHUNKS)
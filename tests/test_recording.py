@@ -0,0 +1,29 @@
+import json
+import base64
+import nopause
+from nopause.recording import ReplayServer, SessionRecorder, read_recording
+from nopause.recording.recorder import OPEN, SEND, RECV, CLOSE
+
+def audio_frame(chunk_id, n_samples, is_end=False):
+    return json.dumps({
+        'code': 0, 'status': 'ok', 'is_end': is_end,
+        'audio_content': base64.b64encode(b'\x01\x00' * n_samples).decode() if n_samples else '',
+        'tts_response_chunk_meta': {'chunk_id': chunk_id, 'rtf': 0.1, 'chunk_size_us': n_samples * 1000000 // 24000},
+    })
+
+def test_record_and_replay(tmp_path, monkeypatch):
+    path = str(tmp_path / 'session.nprec')
+    recorder = SessionRecorder(path)
+    connection = recorder.open('ws://localhost/v1/tts/dual-stream')
+    for message in ['{"config": {}}', '{"content": {"text": "Hi.", "is_end": false}}', '{"content": {"text": "", "is_end": true}}']:
+        recorder.send(connection, message)
+    for message in [audio_frame(0, 2400), audio_frame(1, 1200), audio_frame(2, 0, is_end=True)]:
+        recorder.recv(connection, message)
+    recorder.close_connection(connection)
+    recorder.close()
+    assert [frame.kind for frame in read_recording(path)] == [OPEN] + [SEND] * 3 + [RECV] * 3 + [CLOSE]
+
+    with ReplayServer(path, speed=None) as server:
+        monkeypatch.setenv('NO_PAUSE_WS_PROTOCOL', 'ws')
+        chunks = list(nopause.Synthesis.stream(iter(['Hi.']), api_key='replay', api_base=server.api_base))
+    assert [chunk.n_samples for chunk in chunks] == [2400, 1200]
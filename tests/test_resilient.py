@@ -0,0 +1,84 @@
+import asyncio
+from http import HTTPStatus
+import pytest
+from websockets.exceptions import ConnectionClosedError
+from nopause.core.audio import AudioChunk
+from nopause.sdk.error import InvalidRequestError
+from nopause.sdk.resilient import ResilientSynthesis, SegmentProgress
+from nopause.recording import FakeSynthesisServer
+
+TEXTS = ['First one. ', 'Second one. ', 'Third one.']
+
+def make_chunk(n_samples, chunk_id, value=1):
+    return AudioChunk(data=value.to_bytes(2, 'little') * n_samples, chunk_id=chunk_id,
+                      sample_rate=1000, channels=1, rtf=0.1, chunk_size_us=n_samples * 1000)
+
+class FlakyResult:
+    """Yields the chunks and fails after `fail_after` of them, like a dropped websocket."""
+    def __init__(self, chunks, fail_after=None):
+        self.chunks = iter(chunks)
+        self.fail_after = fail_after
+        self.terminated = False
+
+    def __iter__(self):
+        for i, chunk in enumerate(self.chunks):
+            if i == self.fail_after:
+                raise InvalidRequestError('connection lost') from ConnectionClosedError(None, None)
+            yield chunk
+
+def test_segment_progress_skips_delivered_audio():
+    progress = SegmentProgress('Hello there.')
+    assert len(progress.accept(make_chunk(30, 0))) == 60
+    progress.restart()
+    # the resent segment is chunked differently, only the new part comes through
+    assert progress.accept(make_chunk(20, 0)) == b''
+    assert len(progress.accept(make_chunk(20, 1))) == 20
+    assert progress.delivered_bytes == 80
+
+def test_resume_after_drop():
+    synthesizer = ResilientSynthesis(retry_backoff=0, min_segment_chars=5, api_key='test')
+    attempts = []
+
+    def stream(text_iter):
+        text = ''.join(text_iter)
+        attempts.append(text)
+        chunks = [make_chunk(10, i, value=len(attempts)) for i in range(3)]
+        # the first attempt of the second sentence drops after one chunk
+        return FlakyResult(chunks, fail_after=1 if len(attempts) == 2 else None)
+
+    synthesizer.synthesizer.stream = stream
+    chunks = list(synthesizer.stream(iter(TEXTS)))
+    assert attempts == ['First one.', 'Second one.', 'Second one.', 'Third one.']
+    assert [chunk.chunk_id for chunk in chunks] == list(range(len(chunks)))
+    # 3 sentences of 30 samples each, the replayed first chunk of the second one is skipped
+    assert sum(chunk.n_samples for chunk in chunks) == 90
+    assert synthesizer.reconnects == 1 and synthesizer.resent_chars == len('Second one.')
+
+def test_resume_after_a_dropped_connection(fake_server):
+    # the connection is aborted, without a close frame, during the second sentence
+    server = fake_server(ms_per_char=10, drop_after_ms=150)
+    synthesizer = ResilientSynthesis(retry_backoff=0, min_segment_chars=5)
+    chunks = list(synthesizer.stream(iter(TEXTS)))
+    assert server.dropped and synthesizer.reconnects == 1
+    assert [chunk.chunk_id for chunk in chunks] == list(range(len(chunks)))
+    # 10 ms of 24 kHz audio per character of each sentence, nothing lost or replayed twice
+    assert sum(len(chunk.data) for chunk in chunks) == sum(len(text.strip()) for text in TEXTS) * 10 * 24 * 2
+    synthesizer.close()
+
+def test_rejected_handshake_is_not_retried(fake_server, monkeypatch):
+    async def forbidden(self, path, request_headers):
+        return HTTPStatus.FORBIDDEN, [], b''
+    monkeypatch.setattr(FakeSynthesisServer, 'delay_handshake', forbidden)
+    fake_server()
+    synthesizer = ResilientSynthesis(retry_backoff=10, min_segment_chars=5)
+    with pytest.raises(InvalidRequestError, match='403'):
+        list(synthesizer.stream(iter(TEXTS)))
+
+    async def run():
+        async def texts():
+            yield TEXTS[0]
+        return [chunk async for chunk in await synthesizer.astream(texts())]
+
+    with pytest.raises(InvalidRequestError, match='403'):
+        asyncio.run(run())
+    assert synthesizer.reconnects == 0
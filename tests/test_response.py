@@ -0,0 +1,24 @@
+from nopause.core.base import NoPauseResponse
+
+def test_lazy_response():
+    data = {'voices': [{'voice_id': 'Zoe', 'meta': {'gender': 'female'}}], 'total': 1, 'info': {'page': 1}}
+    response = NoPauseResponse.create(data, name='Voices')
+
+    assert type(response).__name__ == 'VoicesResponse'
+    assert response.total == 1
+    assert response.voices[0].voice_id == 'Zoe'
+    assert response.voices[0].meta.gender == 'female'
+    assert response.info.page == 1
+    assert response.voices is response.voices
+    # types are shared instead of being re-created per response
+    assert type(NoPauseResponse.create(data, name='Voices')) is type(response)
+    assert type(NoPauseResponse.create(data, name='Voices').info) is type(response.info)
+
+    # to_dict is a copy, writes go into the dict the response was created from
+    copied = response.to_dict()
+    assert copied == data and copied is not data and copied['info'] is not data['info']
+    copied['info']['page'] = 3
+    assert response.info.page == 1
+    response.total = 2
+    response.info.page = 2
+    assert data['total'] == 2 and data['info']['page'] == 2 and response.to_dict()['info']['page'] == 2
@@ -0,0 +1,146 @@
+import asyncio
+import pytest
+import nopause
+from nopause.sdk.scheduler import SynthesisScheduler, Ticket, TokenBucket
+from conftest import Session
+
+def test_priority_then_round_robin_across_tenants():
+    scheduler = SynthesisScheduler(max_streams=1, api_key='test')
+    running = Ticket('batch', 'a')
+    scheduler._enqueue(running)
+    scheduler._dispatch()
+    assert running.admitted
+    queued = [Ticket('batch', 'a'), Ticket('batch', 'a'), Ticket('batch', 'a'), Ticket('batch', 'b'), Ticket('interactive', 'c')]
+    for ticket in queued:
+        scheduler._enqueue(ticket)
+    scheduler._dispatch()
+    assert scheduler.queued() == {'interactive': 1, 'batch': 4}
+    order = []
+    while running is not None:
+        scheduler._release(running.synthesizer, False)
+        admitted = [ticket for ticket in queued if ticket.admitted and ticket not in order]
+        assert len(admitted) <= 1
+        running = admitted[0] if admitted else None
+        if running is not None:
+            order.append(running)
+    assert [(ticket.priority, ticket.tenant) for ticket in order] == [
+        ('interactive', 'c'), ('batch', 'a'), ('batch', 'b'), ('batch', 'a'), ('batch', 'a'),
+    ]
+    stats = scheduler.wait_stats()
+    assert stats['interactive']['requests'] == 1 and stats['batch']['requests'] == 5
+
+def test_token_bucket():
+    bucket = TokenBucket(rate=10, burst=2)
+    assert bucket.take() == 0 and bucket.take() == 0
+    assert 0 < bucket.take() <= 0.1
+
+def test_wait_timeout():
+    scheduler = SynthesisScheduler(max_streams=0, api_key='test')
+    with pytest.raises(TimeoutError):
+        scheduler.stream(iter(['Hello.']), timeout=0.01)
+    assert scheduler.queued() == {'interactive': 0, 'batch': 0}
+
+def test_admission_right_at_the_timeout(monkeypatch):
+    scheduler = SynthesisScheduler(max_streams=1, api_key='test')
+    running = Ticket('batch', 'a')
+    scheduler._enqueue(running)
+    scheduler._dispatch()
+    holder = [running]
+    remove = scheduler._remove
+
+    def release_then_remove(ticket):
+        # the only slot frees between the timeout and the withdrawal, and goes to the ticket
+        scheduler._release(holder[0].synthesizer, holder[0].loop is not None)
+        return remove(ticket)
+    monkeypatch.setattr(scheduler, '_remove', release_then_remove)
+
+    waiting = Ticket('interactive', 'b')
+    scheduler._enqueue(waiting)
+    scheduler._wait(waiting, 0.01)
+    # the admitted ticket keeps its slot, and its connection is not pooled as well
+    assert waiting.admitted and scheduler._running == 1 and scheduler._idle[False] == []
+
+    async def run():
+        holder[0] = waiting
+        awaiting = Ticket('interactive', 'c', asyncio.get_running_loop())
+        scheduler._enqueue(awaiting)
+        await scheduler._await(awaiting, 0.01)
+        return awaiting
+    assert asyncio.run(run()).admitted
+    assert scheduler._running == 1 and scheduler._idle[True] == []
+
+def test_interrupted_wait_gives_the_ticket_back():
+    scheduler = SynthesisScheduler(max_streams=1, api_key='test')
+    running = Ticket('batch', 'a')
+    scheduler._enqueue(running)
+    scheduler._dispatch()
+
+    class InterruptedEvent:
+        def __init__(self, before=None):
+            self.before = before
+
+        def wait(self, timeout=None):
+            if self.before is not None:
+                self.before()
+            raise KeyboardInterrupt
+
+        def set(self):
+            pass
+
+    # interrupted while queued: the ticket is withdrawn
+    queued = Ticket('interactive', 'b')
+    queued.event = InterruptedEvent()
+    scheduler._enqueue(queued)
+    with pytest.raises(KeyboardInterrupt):
+        scheduler._wait(queued, None)
+    assert scheduler.queued() == {'interactive': 0, 'batch': 0}
+
+    # admitted right before the interrupt: its slot is released
+    admitted = Ticket('interactive', 'c')
+    admitted.event = InterruptedEvent(lambda: scheduler._release(running.synthesizer, False))
+    scheduler._enqueue(admitted)
+    with pytest.raises(KeyboardInterrupt):
+        scheduler._wait(admitted, None)
+    assert admitted.admitted and scheduler._running == 0 and len(scheduler._idle[False]) == 1
+
+@pytest.fixture
+def server(replay):
+    return replay([Session(), Session()])
+
+def test_streams_reuse_the_pooled_connection(server):
+    scheduler = nopause.SynthesisScheduler(max_streams=1)
+    for priority in ['batch', 'interactive']:
+        assert len(list(scheduler.stream(iter(['Hello.']), priority=priority))) == 1
+    assert server.replayed == 1
+    # a stream terminated before its first chunk frees its slot too
+    scheduler.stream(iter(['Hello.'])).terminate()
+    assert scheduler._running == 0
+    scheduler.close()
+
+def test_astream(server):
+    async def run():
+        async def text():
+            yield 'Hello.'
+        scheduler = SynthesisScheduler(max_streams=1)
+        results = await asyncio.gather(*[
+            collect(scheduler, text(), priority) for priority in ['batch', 'interactive']
+        ])
+        await scheduler.aclose()
+        return results
+
+    async def collect(scheduler, text, priority):
+        return [chunk async for chunk in await scheduler.astream(text, priority=priority)]
+
+    assert [len(chunks) for chunks in asyncio.run(run())] == [1, 1]
+
+def test_reserved_streams_are_kept_for_higher_classes():
+    scheduler = SynthesisScheduler(max_streams=2, reserved_streams={'interactive': 1}, api_key='test')
+    batch = [Ticket('batch', 'a'), Ticket('batch', 'a')]
+    for ticket in batch:
+        scheduler._enqueue(ticket)
+    scheduler._dispatch()
+    assert [ticket.admitted for ticket in batch] == [True, False]
+    interactive = Ticket('interactive', 'b')
+    scheduler._enqueue(interactive)
+    scheduler._dispatch()
+    assert interactive.admitted
@@ -0,0 +1,41 @@
+import threading
+import pytest
+from nopause.core.audio import AudioChunk
+from nopause.shm import SharedAudioReader, SharedAudioWriter
+
+def make_chunks(n, size):
+    for i in range(n):
+        yield AudioChunk(data=bytes([i % 256]) * size, chunk_id=i, sample_rate=24000, channels=1,
+                         rtf=0.1, chunk_size_us=size // 2 * 1000000 // 24000)
+
+def test_shared_ring_wraps_and_ends():
+    # the buffer holds less than 4 chunks: the writer wraps around and waits for the reader
+    writer = SharedAudioWriter(capacity=10000, slots=8)
+    producer = threading.Thread(target=writer.consume, args=(make_chunks(50, 3000),))
+    producer.start()
+    received = []
+    with SharedAudioReader(writer.name) as reader:
+        for chunk in reader:
+            assert isinstance(chunk.data, memoryview)
+            assert chunk.data == bytes([chunk.chunk_id % 256]) * 3000
+            received.append(chunk.chunk_id)
+    producer.join()
+    writer.close()
+    assert received == list(range(50))
+
+def test_exported_chunk_is_not_overwritten():
+    np = pytest.importorskip('numpy')
+    writer = SharedAudioWriter(capacity=10000, slots=8)
+    producer = threading.Thread(target=writer.consume, args=(make_chunks(6, 3000),))
+    producer.start()
+    with SharedAudioReader(writer.name) as reader:
+        held = np.frombuffer(reader.read().data, dtype=np.uint8)
+        assert [reader.read().chunk_id for _ in range(2)] == [1, 2]
+        # the buffer is full up to the first chunk, which the writer waits for
+        with pytest.raises(TimeoutError):
+            reader.read(timeout=0.2)
+        assert not held.any()
+        del held
+        assert [chunk.chunk_id for chunk in reader] == [3, 4, 5]
+    producer.join()
+    writer.close()
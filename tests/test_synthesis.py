@@ -0,0 +1,62 @@
+import pytest
+import nopause
+from nopause.sdk.base import hybridmethod
+from nopause.sdk.config import AudioConfig, DualStreamConfig
+from nopause.sdk.synthesis import DEFAULT_AUDIO_CONFIG, Synthesis
+
+def test_stream_is_bound_to_the_class_or_the_instance(server):
+    assert isinstance(Synthesis.__dict__['stream'], hybridmethod)
+    assert isinstance(Synthesis.__dict__['astream'], hybridmethod)
+    synthesizer = Synthesis()
+    assert Synthesis.stream.__self__ is Synthesis and synthesizer.stream.__self__ is synthesizer
+    assert synthesizer.astream.__self__ is synthesizer
+    assert Synthesis.stream.__doc__ == Synthesis.__dict__['stream'].__func__.__doc__
+    # one-step synthesis from the class, then a synthesis on a connected instance
+    assert len(b''.join(chunk.data for chunk in Synthesis.stream(iter(['Hello.'])))) == 480
+    with synthesizer.connect():
+        assert len(b''.join(chunk.data for chunk in synthesizer.stream(iter(['Hello.'])))) == 480
+
+def test_configs_are_frozen_and_hashable():
+    config = AudioConfig(sample_rate=16000)
+    with pytest.raises(TypeError):
+        config.sample_rate = 24000
+    with pytest.raises(TypeError):
+        DualStreamConfig().stream_in = False
+    assert config.sample_rate == 16000 and config.dict(by_alias=True) == {'sample_rate_hertz': 16000}
+    assert hash(config) == hash(AudioConfig(sample_rate_hertz=16000))
+    assert {DualStreamConfig(), DualStreamConfig()} == {DualStreamConfig()}
+    # instances without a config of their own share the default one
+    assert Synthesis(api_key='key', api_base='localhost').audio_config is DEFAULT_AUDIO_CONFIG
+
+def test_bos_and_eos_are_shared_by_equal_configs():
+    first = Synthesis(api_key='key', api_base='localhost', audio_config=AudioConfig(sample_rate=16000))
+    same = Synthesis(api_key='other', api_base='localhost', audio_config=AudioConfig(sample_rate=16000))
+    other = Synthesis(api_key='key', api_base='localhost', voice_id='Bob')
+    assert same.bos_message is first.bos_message and same.eos_message is first.eos_message
+    assert first.bos['audio_config'] == {'sample_rate_hertz': 16000}
+    assert other.bos != first.bos and other.bos['config']['voice_id'] == 'Bob'
+    assert other.bos['audio_config'] == {'sample_rate_hertz': 24000}
+    assert first.eos == {'content': {'text': '', 'is_end': True}}
+
+def test_settings_follow_the_environment(monkeypatch):
+    monkeypatch.setenv('NO_PAUSE_API_KEY', 'first')
+    monkeypatch.setenv('NO_PAUSE_API_BASE', 'localhost:1')
+    monkeypatch.delenv('NO_PAUSE_WS_PROTOCOL', raising=False)
+    first = Synthesis()
+    # resolved once, but every instance owns its settings
+    again = Synthesis()
+    assert again.parsed_api_key == first.parsed_api_key and again.parsed_api_key is not first.parsed_api_key
+    again.headers['X-Request-Id'] = '1'
+    again.parsed_api_key['value'] = 'changed'
+    assert 'X-Request-Id' not in Synthesis().headers and Synthesis().parsed_api_key['value'] == 'first'
+    assert first.api_url.startswith('wss://localhost:1/') and first.headers['X-API-KEY'] == 'first'
+    monkeypatch.setenv('NO_PAUSE_API_KEY', 'second')
+    monkeypatch.setenv('NO_PAUSE_WS_PROTOCOL', 'ws')
+    second = Synthesis()
+    assert second.api_url.startswith('ws://localhost:1/') and second.headers['X-API-KEY'] == 'second'
+    monkeypatch.delenv('NO_PAUSE_API_KEY')
+    monkeypatch.setattr(nopause, 'api_key', 'module')
+    assert Synthesis().headers['X-API-KEY'] == 'module'
+    # the arguments come first, a list of endpoints included
+    assert Synthesis(api_key='argument').headers['X-API-KEY'] == 'argument'
+    assert Synthesis(api_base=['localhost:2']).api_url.startswith('ws://localhost:2/')
@@ -0,0 +1,39 @@
+import base64
+import numpy as np
+from nopause.core.audio import AudioChunk
+from nopause.telephony import ALAW, MULAW, TelephonyStream, decode, encode
+
+def make_chunk(samples, chunk_id=0, sample_rate=8000):
+    return AudioChunk(
+        data=np.asarray(samples, dtype='<i2').tobytes(), chunk_id=chunk_id, sample_rate=sample_rate,
+        channels=1, rtf=0.1, chunk_size_us=len(samples) * 1000000 // sample_rate,
+    )
+
+def test_g711_roundtrip():
+    pcm = np.linspace(-32768, 32767, 4096).astype('<i2')
+    for encoding in (MULAW, ALAW):
+        decoded = np.frombuffer(decode(encode(pcm.tobytes(), encoding), encoding), dtype='<i2')
+        # G.711 keeps a roughly constant relative error (about 3% at worst)
+        assert np.all(np.abs(decoded.astype(int) - pcm) <= np.abs(pcm.astype(int)) * 0.07 + 16)
+    assert encode(b'\x00\x00', MULAW) == b'\xff' and encode(b'\x00\x00', ALAW) == b'\xd5'
+
+def test_reframing_to_20ms():
+    # 7 chunks of 50 ms at 16 kHz = 350 ms at 8 kHz = 17 full frames + a padded one
+    chunks = [make_chunk(np.full(800, 1000), i, sample_rate=16000) for i in range(7)]
+    frames = list(TelephonyStream(iter(chunks), encoding=MULAW))
+    assert len(frames) == 18
+    assert all(len(frame.payload) == 160 for frame in frames)
+    assert [frame.timestamp for frame in frames[:3]] == [0, 160, 320]
+    assert frames[-1].payload[80:] == b'\xff' * 80
+    message = frames[0].media_message('MZ123')
+    assert base64.b64decode(message['media']['payload']) == frames[0].payload
+
+def test_decimation_carries_partial_groups():
+    # 24 kHz chunks of 100 samples, not multiples of 3: no sample is lost between the chunks
+    pcm = np.arange(3000) % 300 * 10
+    chunks = [make_chunk(pcm[i:i + 100], i // 100, sample_rate=24000) for i in range(0, 3000, 100)]
+    frames = list(TelephonyStream(iter(chunks), encoding=MULAW, pad_last=False))
+    payload = b''.join(frame.payload for frame in frames)
+    assert len(payload) == 1000
+    expected = pcm.reshape(-1, 3).mean(axis=1).astype('<i2')
+    assert payload == encode(expected.tobytes(), MULAW)
@@ -0,0 +1,50 @@
+import time
+import threading
+import pytest
+import nopause
+from conftest import Session
+
+@pytest.fixture
+def server(replay):
+    """One connection answering its first text with an audio chunk, and never ending."""
+    return replay([Session([b'\x01\x00' * 2400], end=False)])
+
+def test_terminate_while_the_text_iterator_is_blocked(server):
+    release = threading.Event()
+
+    def text():
+        yield 'Hello.'
+        release.wait()
+        yield 'Too late.'
+
+    synthesizer = nopause.Synthesis().connect()
+    result = synthesizer.stream(text())
+    next(result)
+    result.terminate()
+    assert result.cancel_to_idle < 0.5
+    assert not synthesizer.in_use() and synthesizer.ws is None
+    # the stale sender does not send anything once its iterator returns
+    release.set()
+    result.send_text_task.join(timeout=1)
+    assert not result.send_text_task.is_alive() and result.send_text_task.error is None
+
+def test_text_iterator_error_is_raised(server):
+    def text():
+        yield 'Hello.'
+        raise ValueError('LLM failed')
+
+    result = nopause.Synthesis.stream(text())
+    with pytest.raises(ValueError):
+        for _ in result:
+            pass
+
+def test_terminate_with_unread_audio(replay):
+    replay([Session([b'\x01\x00' * 2400] * 3, end=False)])
+    synthesizer = nopause.Synthesis().connect()
+    result = synthesizer.stream(iter(['Hello.']))
+    next(result)
+    time.sleep(0.1) # the other chunks arrive, unread
+    result.terminate()
+    # unread messages hold the closing handshake of a sync connection up to its close timeout
+    assert result.cancel_to_idle < 0.5
+    assert not synthesizer.in_use() and synthesizer.ws is None